@@ -0,0 +1,14 @@
+"""
+Reproducible benchmarks for the wmata2 request, parse and lookup hot paths.
+
+Every benchmark runs against deterministic local fixtures (see fixtures.py) and, for
+the end-to-end cases, a stand-in HTTP server on localhost (see server.py), so no API
+key or network access is needed.
+
+Usage:
+    python -m benchmarks                          # run everything, print JSON
+    python -m benchmarks --output bench.json      # write the JSON report to a file
+    python -m benchmarks --only parse lookups     # run a subset of the suites
+
+The JSON report is meant to be diffed between releases to catch regressions.
+"""
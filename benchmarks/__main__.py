@@ -0,0 +1,44 @@
+"""Command line entry point: python -m benchmarks [--output PATH] [--only SUITE ...]"""
+
+import argparse, logging
+
+from . import (
+    bench_analytics,
+    bench_end_to_end,
+    bench_imports,
+    bench_lookups,
+    bench_parse,
+    bench_static,
+)
+from .harness import Runner
+
+SUITES = {
+    "parse": bench_parse.run,
+    "lookups": bench_lookups.run,
+    "end_to_end": bench_end_to_end.run,
+    "analytics": bench_analytics.run,
+    "imports": bench_imports.run,
+    "static": bench_static.run,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    parser.add_argument("--output", help="write the JSON report here (default stdout)")
+    parser.add_argument(
+        "--only", nargs="+", choices=sorted(SUITES), help="suites to run"
+    )
+    parser.add_argument("--repeat", type=int, default=7, help="timed repeats per case")
+    args = parser.parse_args()
+
+    # The client logs every request at info level; keep the report output clean.
+    logging.getLogger("wmata2").setLevel(logging.ERROR)
+
+    runner = Runner(repeat=args.repeat)
+    for name in args.only or SUITES:
+        SUITES[name](runner)
+    runner.write(args.output)
+
+
+if __name__ == "__main__":
+    main()
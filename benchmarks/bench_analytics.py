@@ -0,0 +1,104 @@
+"""
+Streaming analytics benchmarks: per-snapshot update cost of the rail headway tracker,
+and append, query and memory cost of the train position history store, in memory and
+spilled to disk.
+"""
+
+import json, tempfile, tracemalloc
+
+from wmata2.rail.headways import HeadwayTracker
+from wmata2.rail.position_history import PositionHistory
+
+from . import fixtures
+from .harness import Runner
+
+
+def run(runner: Runner) -> None:
+    """Runs the streaming analytics benchmarks."""
+    routes = fixtures.standard_routes()
+    positions = fixtures.train_positions()
+    tracker = HeadwayTracker(routes)
+    clock = [1_700_000_000.0]
+
+    def update() -> None:
+        clock[0] += 10.0
+        tracker.update_positions(positions, now=clock[0])
+
+    runner.bench(
+        "analytics.headways.update_positions",
+        update,
+        trains=len(positions["TrainPositions"]),
+    )
+    runner.bench(
+        "analytics.headways.headway_stats",
+        lambda: tracker.headway_stats("RD", "A01", 1),
+    )
+
+    _bench_position_history(runner, positions)
+
+
+def _bench_position_history(
+    runner: Runner, positions: dict, snapshots: int = 360
+) -> None:
+    """Compares an hour of 10 second snapshots kept as dicts against PositionHistory."""
+    payload = json.dumps(positions)
+    start = 1_700_000_000
+
+    tracemalloc.start()
+    as_dicts = [
+        {"time": start + 10 * i, **json.loads(payload)} for i in range(snapshots)
+    ]
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    history = PositionHistory()
+    for i in range(snapshots):
+        history.append_snapshot(positions, now=start + 10 * i)
+    columnar_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del as_dicts
+
+    rows = len(history)
+    runner.record(
+        "analytics.position_history.memory",
+        rows=rows,
+        dict_bytes=dict_bytes,
+        columnar_bytes=columnar_bytes,
+        dict_bytes_per_row=dict_bytes / rows,
+        columnar_bytes_per_row=columnar_bytes / rows,
+        reduction=dict_bytes / columnar_bytes,
+    )
+
+    clock = [start + 10 * snapshots]
+
+    def append() -> None:
+        clock[0] += 10
+        history.append_snapshot(positions, now=clock[0])
+
+    runner.bench(
+        "analytics.position_history.append_snapshot",
+        append,
+        trains=len(positions["TrainPositions"]),
+    )
+    train_id = positions["TrainPositions"][0]["TrainId"]
+    runner.bench(
+        "analytics.position_history.trajectory",
+        lambda: history.trajectory(train_id),
+    )
+    runner.bench(
+        "analytics.position_history.time_slice_5min",
+        lambda: history.time_slice(start + 1800, start + 2100),
+    )
+
+    with tempfile.TemporaryDirectory() as directory:
+        spilled = PositionHistory(
+            spill_dir=directory, spill_rows=20 * len(positions["TrainPositions"])
+        )
+        for i in range(snapshots):
+            spilled.append_snapshot(positions, now=start + 10 * i)
+        runner.bench(
+            "analytics.position_history.trajectory_spilled",
+            lambda: spilled.trajectory(train_id),
+            segments=len(spilled._segments),
+        )
@@ -0,0 +1,204 @@
+"""
+End-to-end benchmarks: full client calls (connect, request, read, decode) against the
+stand-in server, including WMATA.get_next_departures and full bus feed refreshes, with
+plain and gzip responses, the streaming item iterators, calls answered from the
+cross-process disk cache, and request throughput against a per-key rate limit with one
+key versus a pool of keys.
+"""
+
+import gzip, os, tempfile, threading, time
+
+from wmata2 import disk_cache, metrics, policies
+from wmata2.key_pool import APIKeyPool
+from wmata2.alerts import get_rail_alerts
+from wmata2.bus.gtfs_rt import get_bus_rt_trip_updates, get_bus_rt_vehicle_positions
+from wmata2.rail.gtfs_rt import get_rail_rt_trip_updates
+from wmata2.rail.positions import get_standard_routes, iter_standard_routes
+from wmata2.rail.predictions import get_next_trains, iter_next_trains
+from wmata2.rail.station_info import get_station_entrances
+from wmata2.wmata import WMATA
+
+from . import fixtures
+from .harness import Runner
+from .server import StandInServer
+
+API_KEY = "benchmark"
+JSON = "application/json"
+PROTOBUF = "application/octet-stream"
+
+
+def _routes() -> dict:
+    all_predictions = fixtures.predictions()
+    k08_predictions = {
+        "Trains": [
+            train
+            for train in all_predictions["Trains"]
+            if train["LocationCode"] == "K08"
+        ][:8]
+    }
+    return {
+        "/StationPrediction.svc/json/GetPrediction/All": (
+            JSON,
+            fixtures.encode_json(all_predictions),
+        ),
+        "/StationPrediction.svc/json/GetPrediction/K08": (
+            JSON,
+            fixtures.encode_json(k08_predictions),
+        ),
+        "/TrainPositions/StandardRoutes": (
+            JSON,
+            fixtures.encode_json(fixtures.standard_routes()),
+        ),
+        "/Rail.svc/json/jStationEntrances": (
+            JSON,
+            fixtures.encode_json(fixtures.station_entrances()),
+        ),
+        "/Rail.svc/json/jSrcStationToDstStationInfo": (
+            JSON,
+            fixtures.encode_json(fixtures.station_to_station("K08", "C08")),
+        ),
+        "/gtfs/rail-gtfsrt-tripupdates.pb": (PROTOBUF, fixtures.trip_updates_feed()),
+        "/gtfs/rail-gtfsrt-alerts.pb": (PROTOBUF, b""),
+        "/gtfs/bus-gtfsrt-tripupdates.pb": (
+            PROTOBUF,
+            fixtures.bus_trip_updates_feed(),
+        ),
+        "/gtfs/bus-gtfsrt-vehiclepositions.pb": (
+            PROTOBUF,
+            fixtures.bus_vehicle_positions_feed(),
+        ),
+    }
+
+
+def run(runner: Runner) -> None:
+    """Runs the end-to-end benchmarks against a stand-in server."""
+    with StandInServer(_routes()):
+        wmata = WMATA(API_KEY)
+        runner.bench("end_to_end.get_next_trains.all", lambda: get_next_trains(API_KEY))
+        runner.bench(
+            "end_to_end.get_next_trains.station",
+            lambda: get_next_trains(API_KEY, "K08"),
+        )
+        runner.bench(
+            "end_to_end.get_standard_routes", lambda: get_standard_routes(API_KEY)
+        )
+        runner.bench(
+            "end_to_end.get_station_entrances.all",
+            lambda: get_station_entrances(API_KEY),
+        )
+        runner.bench(
+            "end_to_end.get_rail_rt_trip_updates",
+            lambda: get_rail_rt_trip_updates(API_KEY),
+        )
+        runner.bench("end_to_end.get_rail_alerts", lambda: get_rail_alerts(API_KEY))
+        runner.bench(
+            "end_to_end.get_bus_rt_trip_updates",
+            lambda: get_bus_rt_trip_updates(API_KEY),
+        )
+        runner.bench(
+            "end_to_end.get_bus_rt_vehicle_positions",
+            lambda: get_bus_rt_vehicle_positions(API_KEY),
+        )
+        runner.bench(
+            "end_to_end.wmata.get_next_departures",
+            lambda: wmata.get_next_departures("K08", "C08", num_trips=5),
+        )
+
+    with StandInServer(_routes(), compress=True):
+        runner.bench(
+            "end_to_end.gzip.get_next_trains.all", lambda: get_next_trains(API_KEY)
+        )
+        runner.bench(
+            "end_to_end.gzip.get_standard_routes",
+            lambda: get_standard_routes(API_KEY),
+        )
+        runner.bench(
+            "end_to_end.gzip.iter_next_trains.all",
+            lambda: sum(1 for _ in iter_next_trains(API_KEY)),
+        )
+        runner.bench(
+            "end_to_end.gzip.iter_standard_routes",
+            lambda: sum(1 for _ in iter_standard_routes(API_KEY)),
+        )
+
+    routes = _routes()
+    for path in (
+        "/StationPrediction.svc/json/GetPrediction/All",
+        "/TrainPositions/StandardRoutes",
+        "/Rail.svc/json/jStationEntrances",
+    ):
+        body = routes[path][1]
+        runner.record(
+            f"end_to_end.gzip.payload{path}",
+            bytes=len(body),
+            gzip_bytes=len(gzip.compress(body)),
+        )
+
+    _bench_disk_cache(runner)
+    _bench_key_pool(runner)
+
+    record = metrics.RequestRecord("/benchmark", "Benchmark")
+    record.connect = record.ttfb = record.download = record.parse = 0.001
+    record.total, record.bytes = 0.004, 4096
+    runner.bench("metrics.observe", lambda: metrics.get_registry().observe(record))
+    runner.bench("metrics.export_openmetrics", metrics.export_openmetrics)
+
+
+def _bench_disk_cache(runner: Runner) -> None:
+    saved = disk_cache.CACHE_FILE
+    with tempfile.TemporaryDirectory() as directory:
+        disk_cache.CACHE_FILE = os.path.join(directory, "responses.sqlite3")
+        try:
+            with StandInServer(_routes()):
+                policies.enable_disk_cache()
+                get_station_entrances(API_KEY)
+                get_standard_routes(API_KEY)
+            runner.bench(
+                "end_to_end.disk_cache.get_station_entrances.all",
+                lambda: get_station_entrances(API_KEY),
+            )
+            runner.bench(
+                "end_to_end.disk_cache.get_standard_routes",
+                lambda: get_standard_routes(API_KEY),
+            )
+        finally:
+            policies.clear_endpoint_policies()
+            disk_cache.CACHE_FILE = saved
+
+
+def _bench_key_pool(
+    runner: Runner,
+    calls_per_second: int = 20,
+    threads: int = 8,
+    duration_s: float = 1.5,
+) -> None:
+    cases = {
+        "single_key": API_KEY,
+        "pool_1_key": APIKeyPool([API_KEY], calls_per_second=calls_per_second),
+        "pool_4_keys": APIKeyPool(
+            [f"{API_KEY}-{i}" for i in range(4)], calls_per_second=calls_per_second
+        ),
+    }
+    for name, key in cases.items():
+        with StandInServer(_routes(), calls_per_second=calls_per_second) as server:
+            stop = time.monotonic() + duration_s
+
+            def client() -> None:
+                while time.monotonic() < stop:
+                    get_next_trains(key, "K08")
+
+            workers = [threading.Thread(target=client) for _ in range(threads)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            runner.record(
+                f"end_to_end.key_pool.{name}",
+                calls_per_second_per_key=calls_per_second,
+                threads=threads,
+                elapsed_s=elapsed,
+                ok_per_s=server.statuses[200] / elapsed,
+                throttled=server.statuses[429],
+            )
@@ -0,0 +1,80 @@
+"""
+Import-time benchmarks: cold-start cost of the main entry points, measured with
+``python -X importtime`` in fresh interpreters.
+
+For each entry point the suite records the median total import time attributable to
+it (top-level imports not already made by interpreter startup) and whether the heavy
+optional dependencies were pulled in.
+"""
+
+import os, statistics, subprocess, sys
+from typing import Dict, Set
+
+from .harness import Runner
+
+ENTRY_POINTS = (
+    "wmata2",
+    "wmata2.utilities",
+    "wmata2.wmata",
+    "wmata2.alerts",
+    "wmata2.rail.station_info",
+    "wmata2.rail.predictions",
+    "wmata2.rail.gtfs_rt",
+)
+
+HEAVY_MODULES = ("google.protobuf", "numpy", "gps_time", "http.client", "csv")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _top_level_imports(code: str) -> Dict[str, int]:
+    """Runs code under -X importtime and returns top-level module -> cumulative us."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        if name.startswith("  ") or not cumulative.strip().isdigit():
+            continue  # nested import, or the header line
+        result[name.strip()] = int(cumulative)
+    return result
+
+
+def _loaded_modules(module: str) -> Set[str]:
+    code = f"import sys, {module}; print('\\n'.join(sys.modules))"
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return set(completed.stdout.split())
+
+
+def run(runner: Runner) -> None:
+    """Runs the import-time benchmarks."""
+    startup = set(_top_level_imports("pass"))
+    for module in ENTRY_POINTS:
+        totals = []
+        for _ in range(runner.repeat):
+            imports = _top_level_imports(f"import {module}")
+            totals.append(
+                sum(us for name, us in imports.items() if name not in startup) / 1e6
+            )
+        totals.sort()
+        loaded = _loaded_modules(module)
+        runner.record(
+            f"imports.{module}",
+            repeat=runner.repeat,
+            min_s=totals[0],
+            median_s=statistics.median(totals),
+            loads={name: name in loaded for name in HEAVY_MODULES},
+        )
@@ -0,0 +1,114 @@
+"""
+Lookup benchmarks: station code and station name resolution against a fixture
+stops.txt, building and querying the system-wide arrival board, reading predictions
+through the typed rail models versus the raw response dicts, and building and querying
+the offline rail network graph.
+"""
+
+import tempfile
+
+from google.protobuf.json_format import MessageToDict
+
+from wmata2 import gtfs_realtime_pb2, utilities
+from wmata2.arrival_board import ArrivalBoard
+from wmata2.rail.models import Predictions
+from wmata2.rail.network import RailNetwork
+
+from . import fixtures
+from .harness import Runner
+
+
+def run(runner: Runner) -> None:
+    """Runs the station lookup benchmarks."""
+    saved = utilities.STOPS_FILE
+    with tempfile.TemporaryDirectory() as directory:
+        utilities.STOPS_FILE = fixtures.write_rail_stops(directory)
+        try:
+            codes = fixtures.rail_station_codes()
+            code = codes[len(codes) // 2]
+            name = utilities.get_station_name(code)
+
+            runner.bench(
+                "lookups.get_station_name",
+                lambda: utilities.get_station_name(code),
+                stations=len(codes),
+            )
+            runner.bench(
+                "lookups.get_station_code.exact",
+                lambda: utilities.get_station_code(name),
+                stations=len(codes),
+            )
+            runner.bench(
+                "lookups.get_station_code.fuzzy",
+                lambda: utilities.get_station_code(name[:-3] + "Stret"),
+                stations=len(codes),
+            )
+
+            feed = gtfs_realtime_pb2.FeedMessage()  # type: ignore
+            feed.ParseFromString(fixtures.trip_updates_feed())
+            trip_updates = MessageToDict(feed)
+            now = feed.header.timestamp + 600
+            board = ArrivalBoard(trip_updates)
+            runner.bench(
+                "lookups.arrival_board.build",
+                lambda: ArrivalBoard(trip_updates),
+                entities=len(feed.entity),
+                stops=len(board),
+            )
+            runner.bench(
+                "lookups.arrival_board.next_arrivals",
+                lambda: board.next_arrivals(f"PF_{code}_1", 5, now),
+            )
+            runner.bench(
+                "lookups.arrival_board.next_station_arrivals",
+                lambda: board.next_station_arrivals(code, 5, now),
+            )
+        finally:
+            utilities.STOPS_FILE = saved
+
+    _bench_models(runner)
+    _bench_network(runner)
+
+
+def _bench_models(runner: Runner) -> None:
+    response = fixtures.predictions()
+    station = response["Trains"][0]["LocationCode"]
+
+    def raw_station_minutes() -> float:
+        return sum(
+            float(train["Min"])
+            for train in response["Trains"]
+            if train["LocationCode"] == station
+        )
+
+    predictions = Predictions.from_response(response)
+    predictions.all(station)
+
+    runner.bench(
+        "lookups.models.predictions_from_response",
+        lambda: Predictions.from_response(response),
+        trains=len(predictions),
+    )
+    runner.bench("lookups.models.station_minutes.raw", raw_station_minutes)
+    runner.bench(
+        "lookups.models.station_minutes.models",
+        lambda: sum(p.minutes for p in predictions.all(station)),
+    )
+
+
+def _bench_network(runner: Runner) -> None:
+    routes = fixtures.standard_routes()
+    network = RailNetwork.from_standard_routes(routes)
+    runner.bench(
+        "lookups.network.build",
+        lambda: RailNetwork.from_standard_routes(routes),
+        nodes=len(network.nodes),
+    )
+    # A two-transfer trip across the network.
+    runner.bench(
+        "lookups.network.path",
+        lambda: network.path("N12", "E10"),
+        stations=network.stops("N12", "E10"),
+    )
+    runner.bench("lookups.network.legs", lambda: network.legs("N12", "E10"))
+    runner.bench("lookups.network.transfers", lambda: network.transfers("N12", "E10"))
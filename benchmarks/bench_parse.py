@@ -0,0 +1,123 @@
+"""
+Decode benchmarks: GTFS-RT protobuf parsing versus MessageToDict conversion, decoding
+bus-network-sized feeds straight into the array-backed wmata2.bus.feeds, and JSON
+decoding of the largest JSON responses: the original str-based json.loads, the client's
+bytes decoder (orjson when installed), the streaming item iterator and gzip
+decompression.
+"""
+
+import gzip, json
+
+from google.protobuf.json_format import MessageToDict
+
+from wmata2 import gtfs_realtime_pb2, utilities
+from wmata2.bus.feeds import TripUpdates, VehiclePositions
+
+from . import fixtures
+from .harness import Runner
+
+
+def _bench_protobuf(runner: Runner, name: str, payload: bytes) -> None:
+    def parse():
+        feed = gtfs_realtime_pb2.FeedMessage()  # type: ignore
+        feed.ParseFromString(payload)
+        return feed
+
+    feed = parse()
+    runner.bench(
+        f"parse.{name}.protobuf_parse",
+        parse,
+        payload_bytes=len(payload),
+        entities=len(feed.entity),
+    )
+    runner.bench(
+        f"parse.{name}.message_to_dict",
+        lambda: MessageToDict(feed),
+        entities=len(feed.entity),
+    )
+
+
+def _bench_json(runner: Runner, name: str, payload: bytes, key: str) -> None:
+    runner.bench(
+        f"parse.{name}.json_decode",
+        lambda: json.loads(payload.decode("utf-8")),
+        payload_bytes=len(payload),
+    )
+    runner.bench(
+        f"parse.{name}.client_decode",
+        lambda: utilities._decode_json(payload),
+        backend=utilities._json_loads().__module__,
+    )
+    chunks = [
+        payload[i : i + utilities._READ_CHUNK_BYTES]
+        for i in range(0, len(payload), utilities._READ_CHUNK_BYTES)
+    ]
+    runner.bench(
+        f"parse.{name}.iter_items",
+        lambda: sum(1 for _ in utilities._iter_array_items(chunks, key)),
+    )
+    compressed = gzip.compress(payload)
+    runner.bench(
+        f"parse.{name}.gzip_decompress",
+        lambda: utilities._decompressor("gzip").decompress(compressed),
+        gzip_bytes=len(compressed),
+    )
+
+
+def _bench_bus(runner: Runner) -> None:
+    trip_updates = fixtures.bus_trip_updates_feed()
+    vehicle_positions = fixtures.bus_vehicle_positions_feed()
+    _bench_protobuf(runner, "bus_trip_updates", trip_updates)
+    _bench_protobuf(runner, "bus_vehicle_positions", vehicle_positions)
+
+    updates = TripUpdates.from_bytes(trip_updates)
+    runner.bench(
+        "parse.bus_trip_updates.array_decode",
+        lambda: TripUpdates.from_bytes(trip_updates),
+        trips=len(updates),
+        stop_time_updates=len(updates.stop_ids),
+        stops=len(updates.by_stop),
+    )
+    positions = VehiclePositions.from_bytes(vehicle_positions)
+    runner.bench(
+        "parse.bus_vehicle_positions.array_decode",
+        lambda: VehiclePositions.from_bytes(vehicle_positions),
+        vehicles=len(positions),
+        routes=len(positions.by_route),
+    )
+    stop_id = next(iter(updates.by_stop))
+    runner.bench(
+        "parse.bus_trip_updates.next_arrivals",
+        lambda: updates.next_arrivals(stop_id, 5, updates.timestamp),
+    )
+    route_id = next(iter(positions.by_route))
+    runner.bench(
+        "parse.bus_vehicle_positions.for_route",
+        lambda: positions.for_route(route_id),
+    )
+
+
+def run(runner: Runner) -> None:
+    """Runs the decode benchmarks."""
+    _bench_protobuf(runner, "trip_updates", fixtures.trip_updates_feed())
+    _bench_protobuf(runner, "vehicle_positions", fixtures.vehicle_positions_feed())
+    _bench_bus(runner)
+
+    _bench_json(
+        runner,
+        "predictions_all",
+        fixtures.encode_json(fixtures.predictions()),
+        "Trains",
+    )
+    _bench_json(
+        runner,
+        "standard_routes",
+        fixtures.encode_json(fixtures.standard_routes()),
+        "StandardRoutes",
+    )
+    _bench_json(
+        runner,
+        "station_entrances_all",
+        fixtures.encode_json(fixtures.station_entrances()),
+        "Entrances",
+    )
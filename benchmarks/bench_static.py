@@ -0,0 +1,217 @@
+"""
+Static GTFS compile benchmarks: compiling a bus-network-sized feed with 1, 2, 4 and up
+to os.cpu_count() worker processes, to track per-table timings, multi-core scaling and
+the share of the time spent in the serial merge, index and write steps, then
+querying the service calendar of the compiled feed, enriching a realtime feed with its
+trip, route and stop attributes and projecting vehicle positions onto its shapes.
+"""
+
+import math, os, tempfile, time
+from datetime import date
+
+from wmata2.gtfs_static import compile_static_feed
+from wmata2.gtfs_static import load_table
+from wmata2.service_calendar import ServiceCalendar
+from wmata2.shape_geometry import ShapeGeometry
+from wmata2.static_index import StaticIndex
+
+from . import fixtures
+from .harness import Runner
+
+
+def _worker_counts() -> list:
+    # At least 1, 2 and 4 workers even on smaller machines, so that every report
+    # shows how the compile scales; the speedup is capped by the CPU count.
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= max(cpus, 4):
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus and cpus > 4:
+        counts.append(cpus)
+    return counts
+
+
+def run(runner: Runner) -> None:
+    """Runs the static compile benchmarks."""
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, "bus_gtfs_static")
+        os.mkdir(source)
+        rows = fixtures.write_bus_gtfs(source)
+
+        baseline = None
+        for workers in _worker_counts():
+            totals = []
+            tables = {}
+            for _ in range(max(1, runner.repeat // 3)):
+                output = os.path.join(directory, f"compiled_{workers}")
+                start = time.perf_counter()
+                tables = compile_static_feed(source, output, workers=workers)
+                totals.append(time.perf_counter() - start)
+            best = min(totals)
+            baseline = baseline or best
+            serial_s = sum(
+                timings[stage]
+                for timings in tables.values()
+                for stage in ("merge_s", "index_s", "write_s")
+            )
+            runner.record(
+                f"static.compile_bus.workers_{workers}",
+                workers=workers,
+                cpus=os.cpu_count(),
+                min_s=best,
+                speedup=baseline / best,
+                serial_fraction=serial_s / best,
+                rows=rows,
+                tables={
+                    name: {k: v for k, v in timings.items() if k.endswith("_s")}
+                    for name, timings in tables.items()
+                },
+            )
+
+        _bench_service_calendar(runner, output)
+        _bench_static_index(runner, output)
+        _bench_shape_geometry(runner, output)
+
+
+def _bench_service_calendar(runner: Runner, compiled: str) -> None:
+    day = date(2024, 3, 6)
+    runner.bench(
+        "static.service_calendar.build", lambda: ServiceCalendar("bus", compiled)
+    )
+    calendar = ServiceCalendar("bus", compiled)
+    runner.bench(
+        "static.service_calendar.active_trip_rows.uncached",
+        lambda: (calendar._trips_by_day.clear(), calendar.active_trip_rows(day)),
+        trips=len(calendar.active_trip_rows(day)),
+    )
+    runner.bench(
+        "static.service_calendar.active_trip_rows.cached",
+        lambda: calendar.active_trip_rows(day),
+    )
+    calendar.departures("1000000", day)
+    runner.bench(
+        "static.service_calendar.departures",
+        lambda: calendar.departures("1000000", day, after_s=8 * 3600),
+    )
+
+
+def _bus_trip_updates(compiled: str, num_trips: int = 1000) -> dict:
+    """A TripUpdates feed in MessageToDict form for trips of the compiled bus feed."""
+    trips = load_table("bus", "trips", compiled)
+    stop_times = load_table("bus", "stop_times", compiled)
+    stop_ids = stop_times.column("stop_id")
+    entities = []
+    for trip_id in trips.column("trip_id")[:num_trips]:
+        rows = stop_times.rows_for("trip_id", trip_id)
+        entities.append(
+            {
+                "id": trip_id,
+                "tripUpdate": {
+                    "trip": {"tripId": trip_id},
+                    "stopTimeUpdate": [{"stopId": stop_ids[row]} for row in rows],
+                },
+            }
+        )
+    return {"header": {"gtfsRealtimeVersion": "2.0"}, "entity": entities}
+
+
+def _bench_static_index(runner: Runner, compiled: str) -> None:
+    feed = _bus_trip_updates(compiled)
+    updates = sum(len(e["tripUpdate"]["stopTimeUpdate"]) for e in feed["entity"])
+    trips = load_table("bus", "trips", compiled)
+    routes = load_table("bus", "routes", compiled)
+    stops = load_table("bus", "stops", compiled)
+
+    def per_entity_lookups() -> None:
+        # Resolving each reference through the tables' row lookups.
+        for entity in feed["entity"]:
+            trip = entity["tripUpdate"]["trip"]
+            row = trips.lookup("trip_id", trip["tripId"])
+            route = routes.lookup("route_id", row["route_id"])
+            trip["routeShortName"] = route["route_short_name"]
+            trip["tripHeadsign"] = row["trip_headsign"]
+            for update in entity["tripUpdate"]["stopTimeUpdate"]:
+                update["stopName"] = stops.lookup("stop_id", update["stopId"])[
+                    "stop_name"
+                ]
+
+    runner.bench("static.static_index.build", lambda: StaticIndex("bus", compiled))
+    index = StaticIndex("bus", compiled)
+    runner.bench(
+        "static.static_index.per_entity_lookups",
+        per_entity_lookups,
+        entities=len(feed["entity"]),
+        stop_time_updates=updates,
+    )
+    runner.bench(
+        "static.static_index.enrich",
+        lambda: index.enrich(feed),
+        entities=len(feed["entity"]),
+        stop_time_updates=updates,
+    )
+
+
+def _bus_vehicle_positions(compiled: str, num_vehicles: int = 1000) -> dict:
+    """A VehiclePositions feed in MessageToDict form, vehicles part-way along trips."""
+    trips = load_table("bus", "trips", compiled)
+    shapes = load_table("bus", "shapes", compiled)
+    lat, lon = shapes.column("shape_pt_lat"), shapes.column("shape_pt_lon")
+    shape_ids = trips.column("shape_id")
+    step = max(1, len(trips) // num_vehicles)
+    entities = []
+    for i, trip_id in enumerate(trips.column("trip_id")[::step][:num_vehicles]):
+        points = shapes.rows_for("shape_id", shape_ids[i * step])
+        row = points[(i * 37) % len(points)]
+        entities.append(
+            {
+                "id": str(i),
+                "vehicle": {
+                    "trip": {"tripId": trip_id},
+                    "vehicle": {"id": str(i)},
+                    "position": {"latitude": lat[row], "longitude": lon[row]},
+                },
+            }
+        )
+    return {"header": {"gtfsRealtimeVersion": "2.0"}, "entity": entities}
+
+
+def _bench_shape_geometry(runner: Runner, compiled: str) -> None:
+    feed = _bus_vehicle_positions(compiled)
+    trips = load_table("bus", "trips", compiled)
+    shapes = load_table("bus", "shapes", compiled)
+    lat, lon = shapes.column("shape_pt_lat"), shapes.column("shape_pt_lon")
+
+    def per_vehicle_segment_loop() -> None:
+        # Scanning every segment of each vehicle's shape in Python.
+        for entity in feed["entity"]:
+            vehicle = entity["vehicle"]
+            row = trips.unique["trip_id"][vehicle["trip"]["tripId"]]
+            points = shapes.rows_for("shape_id", trips.column("shape_id")[row])
+            y = vehicle["position"]["latitude"] * 111_195.0
+            x = vehicle["position"]["longitude"] * 86_500.0
+            best, along, travelled = math.inf, 0.0, 0.0
+            for a, b in zip(points, points[1:]):
+                ax, ay = lon[a] * 86_500.0, lat[a] * 111_195.0
+                dx, dy = lon[b] * 86_500.0 - ax, lat[b] * 111_195.0 - ay
+                length2 = dx * dx + dy * dy
+                t = min(1.0, max(0.0, ((x - ax) * dx + (y - ay) * dy) / length2))
+                squared = (x - ax - t * dx) ** 2 + (y - ay - t * dy) ** 2
+                if squared < best:
+                    best, along = squared, travelled + t * length2**0.5
+                travelled += length2**0.5
+
+    runner.bench("static.shape_geometry.build", lambda: ShapeGeometry("bus", compiled))
+    geometry = ShapeGeometry("bus", compiled)
+    geometry.project_snapshot(feed)
+    runner.bench(
+        "static.shape_geometry.per_vehicle_segment_loop",
+        per_vehicle_segment_loop,
+        vehicles=len(feed["entity"]),
+        segments=len(geometry.seg_len),
+    )
+    runner.bench(
+        "static.shape_geometry.project_snapshot",
+        lambda: geometry.project_snapshot(feed),
+        vehicles=len(feed["entity"]),
+        segments=len(geometry.seg_len),
+    )
@@ -0,0 +1,477 @@
+"""
+Deterministic synthetic fixtures shaped like WMATA API responses.
+
+The payloads mirror the structure (field names, nesting and rough sizes) of the real
+JSON and GTFS-RT endpoints, built from a fixed-seed random generator so every run of
+the benchmarks sees byte-identical inputs.
+"""
+
+import csv, json, os, random
+from typing import Dict, List
+
+SEED = 20230401
+
+# Rough shape of the Metrorail network: line code -> ordered station codes.
+LINE_STATIONS: Dict[str, List[str]] = {
+    "RD": [f"A{i:02d}" for i in range(15, 0, -1)] + [f"B{i:02d}" for i in range(1, 12)],
+    "OR": [f"K{i:02d}" for i in range(8, 0, -1)]
+    + [f"C{i:02d}" for i in range(5, 0, -1)]
+    + [f"D{i:02d}" for i in range(1, 14)],
+    "SV": [f"N{i:02d}" for i in range(12, 0, -1)]
+    + [f"K{i:02d}" for i in range(5, 0, -1)]
+    + [f"C{i:02d}" for i in range(5, 0, -1)]
+    + [f"D{i:02d}" for i in range(1, 9)]
+    + [f"G{i:02d}" for i in range(1, 6)],
+    "BL": ["J03", "J02"]
+    + [f"C{i:02d}" for i in range(13, 0, -1)]
+    + [f"D{i:02d}" for i in range(1, 9)]
+    + [f"G{i:02d}" for i in range(1, 6)],
+    "YL": [f"C{i:02d}" for i in range(15, 6, -1)] + ["F03", "F02", "F01", "E01"],
+    "GR": [f"E{i:02d}" for i in range(10, 0, -1)] + [f"F{i:02d}" for i in range(1, 12)],
+}
+
+
+def rail_station_codes() -> List[str]:
+    """Returns every station code in the fixture network, in first-seen order."""
+    codes: Dict[str, None] = {}
+    for stations in LINE_STATIONS.values():
+        for code in stations:
+            codes.setdefault(code, None)
+    return list(codes)
+
+
+def _station_name(code: str) -> str:
+    return f"Station {code} - {code[0]} Street"
+
+
+def write_rail_stops(directory: str) -> str:
+    """
+    Writes a GTFS stops.txt for the fixture network with station, platform and
+    entrance rows, like the rail static feed.
+
+    Args:
+        directory (str): Directory to write stops.txt into.
+
+    Returns:
+        str: Path of the written file.
+    """
+    rng = random.Random(SEED)
+    path = os.path.join(directory, "stops.txt")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            [
+                "stop_id",
+                "stop_name",
+                "stop_lat",
+                "stop_lon",
+                "location_type",
+                "parent_station",
+            ]
+        )
+        for code in rail_station_codes():
+            lat = 38.9 + rng.uniform(-0.15, 0.15)
+            lon = -77.03 + rng.uniform(-0.2, 0.2)
+            name = _station_name(code)
+            writer.writerow([f"STN_{code}", name, lat, lon, 1, ""])
+            for track in (1, 2):
+                writer.writerow(
+                    [f"PF_{code}_{track}", name, lat, lon, 0, f"STN_{code}"]
+                )
+            for entrance in range(3):
+                writer.writerow(
+                    [
+                        f"ENT_{code}_{entrance}",
+                        f"{name} Entrance {entrance}",
+                        lat + rng.uniform(-0.001, 0.001),
+                        lon + rng.uniform(-0.001, 0.001),
+                        2,
+                        f"STN_{code}",
+                    ]
+                )
+    return path
+
+
+def predictions(num_trains: int = 600) -> dict:
+    """Returns a GetPrediction/All style document with the given number of trains."""
+    rng = random.Random(SEED)
+    trains = []
+    lines = list(LINE_STATIONS)
+    for _ in range(num_trains):
+        line = rng.choice(lines)
+        stations = LINE_STATIONS[line]
+        location = rng.choice(stations)
+        destination = rng.choice((stations[0], stations[-1]))
+        trains.append(
+            {
+                "Car": rng.choice(("6", "8")),
+                "Destination": _station_name(destination)[:12],
+                "DestinationCode": destination,
+                "DestinationName": _station_name(destination),
+                "Group": rng.choice(("1", "2")),
+                "Line": line,
+                "LocationCode": location,
+                "LocationName": _station_name(location),
+                "Min": str(rng.randint(1, 30)),
+            }
+        )
+    return {"Trains": trains}
+
+
+def standard_routes() -> dict:
+    """Returns a StandardRoutes style document covering the fixture network."""
+    routes = []
+    circuit_id = 1
+    for line, stations in LINE_STATIONS.items():
+        for track, ordered in ((1, stations), (2, stations[::-1])):
+            circuits = []
+            seq = 0
+            for code in ordered:
+                for offset in range(12):
+                    circuits.append(
+                        {
+                            "SeqNum": seq,
+                            "CircuitId": circuit_id,
+                            "StationCode": code if offset == 0 else None,
+                        }
+                    )
+                    seq += 1
+                    circuit_id += 1
+            routes.append(
+                {"LineCode": line, "TrackNum": track, "TrackCircuits": circuits}
+            )
+    return {"StandardRoutes": routes}
+
+
+def train_positions(num_trains: int = 250) -> dict:
+    """Returns a TrainPositions style document placing trains on standard routes."""
+    rng = random.Random(SEED)
+    routes = standard_routes()["StandardRoutes"]
+    trains = []
+    for i in range(num_trains):
+        route = rng.choice(routes)
+        circuit = rng.choice(route["TrackCircuits"])
+        trains.append(
+            {
+                "TrainId": f"{100 + i:03d}",
+                "TrainNumber": f"{300 + i:03d}",
+                "CarCount": rng.choice((6, 8)),
+                "DirectionNum": route["TrackNum"],
+                "CircuitId": circuit["CircuitId"],
+                "DestinationStationCode": LINE_STATIONS[route["LineCode"]][-1],
+                "LineCode": route["LineCode"],
+                "SecondsAtLocation": rng.randint(0, 120),
+                "ServiceType": "Normal",
+            }
+        )
+    return {"TrainPositions": trains}
+
+
+def station_entrances(per_station: int = 4) -> dict:
+    """Returns a jStationEntrances style document for every fixture station."""
+    rng = random.Random(SEED)
+    entrances = []
+    for code in rail_station_codes():
+        for i in range(per_station):
+            entrances.append(
+                {
+                    "Description": f"Building entrance on {code} corner {i}, "
+                    "elevator and escalator to mezzanine",
+                    "ID": f"{code}-{i}",
+                    "Lat": 38.9 + rng.uniform(-0.15, 0.15),
+                    "Lon": -77.03 + rng.uniform(-0.2, 0.2),
+                    "Name": f"{_station_name(code)} entrance {i}",
+                    "StationCode1": code,
+                    "StationCode2": "",
+                }
+            )
+    return {"Entrances": entrances}
+
+
+def station_to_station(start: str, end: str) -> dict:
+    """Returns a jSrcStationToDstStationInfo style document for one pair."""
+    return {
+        "StationToStationInfos": [
+            {
+                "CompositeMiles": 6.18,
+                "DestinationStation": end,
+                "RailFare": {
+                    "OffPeakTime": 2.25,
+                    "PeakTime": 3.25,
+                    "SeniorDisabled": 1.10,
+                },
+                "RailTime": 17,
+                "SourceStation": start,
+            }
+        ]
+    }
+
+
+def encode_json(document: dict) -> bytes:
+    """Encodes a document the way the API serves it."""
+    return json.dumps(document).encode("utf-8")
+
+
+def trip_updates_feed(num_trips: int = 300, timestamp: int = 1_700_000_000) -> bytes:
+    """
+    Returns a serialized GTFS-RT TripUpdates FeedMessage with one stop_time_update per
+    remaining station of each trip.
+    """
+    from wmata2 import gtfs_realtime_pb2
+
+    rng = random.Random(SEED)
+    feed = gtfs_realtime_pb2.FeedMessage()  # type: ignore
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = timestamp
+    lines = list(LINE_STATIONS)
+    for i in range(num_trips):
+        line = rng.choice(lines)
+        stations = LINE_STATIONS[line]
+        track = rng.choice((1, 2))
+        ordered = stations if track == 1 else stations[::-1]
+        start = rng.randrange(len(ordered))
+        entity = feed.entity.add()
+        entity.id = str(i)
+        entity.trip_update.trip.trip_id = f"{line}_{i:05d}"
+        entity.trip_update.trip.route_id = line
+        entity.trip_update.vehicle.id = f"{100 + i:03d}"
+        when = timestamp + rng.randint(0, 300)
+        for code in ordered[start:]:
+            update = entity.trip_update.stop_time_update.add()
+            update.stop_id = f"PF_{code}_{track}"
+            update.arrival.time = when
+            update.arrival.delay = rng.randint(-60, 240)
+            when += rng.randint(90, 180)
+    return feed.SerializeToString()
+
+
+def vehicle_positions_feed(
+    num_vehicles: int = 250, timestamp: int = 1_700_000_000
+) -> bytes:
+    """Returns a serialized GTFS-RT VehiclePositions FeedMessage."""
+    from wmata2 import gtfs_realtime_pb2
+
+    rng = random.Random(SEED)
+    feed = gtfs_realtime_pb2.FeedMessage()  # type: ignore
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = timestamp
+    lines = list(LINE_STATIONS)
+    for i in range(num_vehicles):
+        line = rng.choice(lines)
+        entity = feed.entity.add()
+        entity.id = str(i)
+        vehicle = entity.vehicle
+        vehicle.trip.trip_id = f"{line}_{i:05d}"
+        vehicle.trip.route_id = line
+        vehicle.vehicle.id = f"{100 + i:03d}"
+        vehicle.position.latitude = 38.9 + rng.uniform(-0.15, 0.15)
+        vehicle.position.longitude = -77.03 + rng.uniform(-0.2, 0.2)
+        vehicle.position.bearing = rng.uniform(0, 360)
+        vehicle.stop_id = f"PF_{rng.choice(LINE_STATIONS[line])}_1"
+        vehicle.timestamp = timestamp - rng.randint(0, 30)
+    return feed.SerializeToString()
+
+
+def bus_trip_updates_feed(
+    num_trips: int = 2000,
+    updates_per_trip: int = 30,
+    num_stops: int = 10_000,
+    timestamp: int = 1_700_000_000,
+) -> bytes:
+    """
+    Returns a serialized bus-network-sized GTFS-RT TripUpdates FeedMessage: each trip
+    runs along a consecutive block of stop ids, with a few departure-only updates and
+    negative delays.
+    """
+    from wmata2 import gtfs_realtime_pb2
+
+    rng = random.Random(SEED)
+    feed = gtfs_realtime_pb2.FeedMessage()  # type: ignore
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = timestamp
+    for i in range(num_trips):
+        route = f"{rng.randrange(300):03d}"
+        entity = feed.entity.add()
+        entity.id = str(i)
+        trip_update = entity.trip_update
+        trip_update.trip.trip_id = f"{route}_{i:06d}"
+        trip_update.trip.route_id = route
+        trip_update.trip.start_date = "20231114"
+        trip_update.vehicle.id = f"{2000 + i}"
+        trip_update.timestamp = timestamp - rng.randint(0, 60)
+        first_stop = rng.randrange(num_stops - updates_per_trip)
+        when = timestamp + rng.randint(-120, 600)
+        for sequence in range(updates_per_trip):
+            update = trip_update.stop_time_update.add()
+            update.stop_sequence = sequence + 1
+            update.stop_id = str(1_000_000 + first_stop + sequence)
+            event = update.departure if sequence == 0 else update.arrival
+            event.time = when
+            event.delay = rng.randint(-90, 400)
+            when += rng.randint(40, 150)
+    return feed.SerializeToString()
+
+
+def bus_vehicle_positions_feed(
+    num_vehicles: int = 2000, num_stops: int = 10_000, timestamp: int = 1_700_000_000
+) -> bytes:
+    """Returns a serialized bus-network-sized GTFS-RT VehiclePositions FeedMessage."""
+    from wmata2 import gtfs_realtime_pb2
+
+    rng = random.Random(SEED)
+    feed = gtfs_realtime_pb2.FeedMessage()  # type: ignore
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = timestamp
+    for i in range(num_vehicles):
+        route = f"{rng.randrange(300):03d}"
+        entity = feed.entity.add()
+        entity.id = str(i)
+        vehicle = entity.vehicle
+        vehicle.trip.trip_id = f"{route}_{i:06d}"
+        vehicle.trip.route_id = route
+        vehicle.vehicle.id = f"{2000 + i}"
+        vehicle.position.latitude = 38.9 + rng.uniform(-0.2, 0.2)
+        vehicle.position.longitude = -77.03 + rng.uniform(-0.25, 0.25)
+        vehicle.position.bearing = rng.uniform(0, 360)
+        vehicle.position.speed = rng.uniform(0, 15)
+        vehicle.current_stop_sequence = rng.randint(1, 40)
+        vehicle.current_status = rng.randint(0, 2)
+        vehicle.stop_id = str(1_000_000 + rng.randrange(num_stops))
+        vehicle.timestamp = timestamp - rng.randint(0, 30)
+    return feed.SerializeToString()
+
+
+def write_bus_gtfs(
+    directory: str,
+    num_routes: int = 150,
+    stops_per_pattern: int = 40,
+    trips_per_pattern: int = 40,
+    points_per_stop: int = 5,
+) -> Dict[str, int]:
+    """
+    Writes a bus-network-sized static GTFS feed (routes, stops, shapes, trips,
+    stop_times, calendar, calendar_dates) into a directory.
+
+    Each route has one pattern per direction: a random-walk shape with a stop every
+    points_per_stop shape points, served by trips_per_pattern trips spread over the
+    service day. Defaults give about 12,000 stops and 480,000 stop_times rows.
+
+    Returns:
+        dict: Row counts per table.
+    """
+    rng = random.Random(SEED)
+    counts = {
+        "routes": 0,
+        "stops": 0,
+        "shapes": 0,
+        "trips": 0,
+        "stop_times": 0,
+    }
+    services = ("WEEKDAY", "SATURDAY", "SUNDAY")
+
+    def open_table(name: str, header: List[str]):
+        f = open(os.path.join(directory, f"{name}.txt"), "w", newline="")
+        writer = csv.writer(f)
+        writer.writerow(header)
+        return f, writer
+
+    with open(os.path.join(directory, "calendar.txt"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(
+            ["service_id", "monday", "tuesday", "wednesday", "thursday", "friday"]
+            + ["saturday", "sunday", "start_date", "end_date"]
+        )
+        writer.writerow(["WEEKDAY", 1, 1, 1, 1, 1, 0, 0, 20231001, 20241231])
+        writer.writerow(["SATURDAY", 0, 0, 0, 0, 0, 1, 0, 20231001, 20241231])
+        writer.writerow(["SUNDAY", 0, 0, 0, 0, 0, 0, 1, 20231001, 20241231])
+    with open(os.path.join(directory, "calendar_dates.txt"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["service_id", "date", "exception_type"])
+        for holiday in (20231123, 20231225, 20240101, 20240704):
+            writer.writerow(["WEEKDAY", holiday, 2])
+            writer.writerow(["SUNDAY", holiday, 1])
+
+    routes_f, routes = open_table(
+        "routes", ["route_id", "route_short_name", "route_long_name", "route_type"]
+    )
+    stops_f, stops = open_table(
+        "stops", ["stop_id", "stop_name", "stop_lat", "stop_lon"]
+    )
+    shapes_f, shapes = open_table(
+        "shapes",
+        ["shape_id", "shape_pt_lat", "shape_pt_lon", "shape_pt_sequence"]
+        + ["shape_dist_traveled"],
+    )
+    trips_f, trips = open_table(
+        "trips",
+        ["route_id", "service_id", "trip_id", "trip_headsign", "direction_id"]
+        + ["shape_id"],
+    )
+    times_f, stop_times = open_table(
+        "stop_times",
+        ["trip_id", "arrival_time", "departure_time", "stop_id", "stop_sequence"]
+        + ["shape_dist_traveled"],
+    )
+    try:
+        stop_number = 1000000
+        for r in range(num_routes):
+            route_id = f"R{r:03d}"
+            routes.writerow([route_id, route_id[1:], f"Route {r} Crosstown", 3])
+            counts["routes"] += 1
+            for direction in (0, 1):
+                shape_id = f"{route_id}_S{direction}"
+                lat = 38.9 + rng.uniform(-0.12, 0.12)
+                lon = -77.03 + rng.uniform(-0.15, 0.15)
+                heading_lat, heading_lon = rng.uniform(-1, 1), rng.uniform(-1, 1)
+                distance = 0.0
+                pattern_stops = []
+                for p in range(stops_per_pattern * points_per_stop):
+                    if p:
+                        step_lat = 0.0009 * heading_lat + rng.uniform(-0.0003, 0.0003)
+                        step_lon = 0.0011 * heading_lon + rng.uniform(-0.0003, 0.0003)
+                        lat += step_lat
+                        lon += step_lon
+                        distance += (
+                            111_000 * (step_lat**2 + (0.78 * step_lon) ** 2) ** 0.5
+                        )
+                    shapes.writerow(
+                        [shape_id, f"{lat:.6f}", f"{lon:.6f}", p, f"{distance:.1f}"]
+                    )
+                    counts["shapes"] += 1
+                    if p % points_per_stop == 0:
+                        stop_id = str(stop_number)
+                        stop_number += 1
+                        stops.writerow(
+                            [
+                                stop_id,
+                                f"{route_id} stop {p}",
+                                f"{lat:.6f}",
+                                f"{lon:.6f}",
+                            ]
+                        )
+                        counts["stops"] += 1
+                        pattern_stops.append((stop_id, distance))
+
+                for t in range(trips_per_pattern):
+                    trip_id = f"{shape_id}_T{t:03d}"
+                    service = services[t % len(services)]
+                    trips.writerow(
+                        [route_id, service, trip_id, f"{route_id} to end {direction}"]
+                        + [direction, shape_id]
+                    )
+                    counts["trips"] += 1
+                    when = 5 * 3600 + t * (20 * 3600 // trips_per_pattern)
+                    for sequence, (stop_id, dist) in enumerate(pattern_stops, 1):
+                        hms = (
+                            f"{when // 3600:02d}:{when // 60 % 60:02d}:{when % 60:02d}"
+                        )
+                        stop_times.writerow(
+                            [trip_id, hms, hms, stop_id, sequence, f"{dist:.1f}"]
+                        )
+                        counts["stop_times"] += 1
+                        when += rng.randint(45, 150)
+    finally:
+        for f in (routes_f, stops_f, shapes_f, trips_f, times_f):
+            f.close()
+
+    return counts
@@ -0,0 +1,131 @@
+"""
+Timing helpers shared by the benchmark suites.
+
+A Runner collects one result per benchmark. Each result records per-call timings in
+seconds (min, median, mean, p95 and stdev over the repeats) so reports from different
+machines or releases can be compared field by field.
+"""
+
+import gc, json, os, platform, statistics, subprocess, sys, time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Returns the nearest-rank percentile of an already sorted list."""
+    index = min(
+        len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1)
+    )
+    return sorted_values[index]
+
+
+def _git_revision() -> Optional[str]:
+    """Returns the current git revision of the repository, if available."""
+    try:
+        return (
+            subprocess.check_output(
+                ["git", "rev-parse", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stderr=subprocess.DEVNULL,
+            )
+            .decode("ascii")
+            .strip()
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Runner:
+    """
+    Runs benchmark callables and accumulates their results.
+
+    Args:
+        repeat (int, optional): Number of timed repeats per benchmark. Defaults to 7.
+        min_time_s (float, optional): Each repeat loops the callable until at least this
+            much time has elapsed, to keep very fast callables measurable. Defaults to
+            0.05.
+    """
+
+    def __init__(self, repeat: int = 7, min_time_s: float = 0.05) -> None:
+        self.repeat = repeat
+        self.min_time_s = min_time_s
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def _calibrate(self, func: Callable[[], Any]) -> int:
+        """Finds a loop count so that one repeat lasts at least min_time_s."""
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.min_time_s or number >= 1_000_000:
+                return number
+            number *= 10 if elapsed < self.min_time_s / 10 else 2
+
+    def bench(self, name: str, func: Callable[[], Any], **extra: Any) -> Dict[str, Any]:
+        """
+        Times a callable and stores the result under the given name.
+
+        Args:
+            name (str): Dotted benchmark name, e.g. "parse.protobuf_parse".
+            func (Callable[[], Any]): The zero-argument callable to time.
+            **extra: Additional fields (payload sizes, item counts, ...) recorded
+                alongside the timings.
+
+        Returns:
+            dict: The recorded result.
+        """
+        number = self._calibrate(func)
+        timings = []
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for _ in range(self.repeat):
+                start = time.perf_counter()
+                for _ in range(number):
+                    func()
+                timings.append((time.perf_counter() - start) / number)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        timings.sort()
+        result = {
+            "loops": number,
+            "repeat": self.repeat,
+            "min_s": timings[0],
+            "median_s": statistics.median(timings),
+            "mean_s": statistics.fmean(timings),
+            "p95_s": _percentile(timings, 0.95),
+            "stdev_s": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        }
+        result.update(extra)
+        self.results[name] = result
+        return result
+
+    def record(self, name: str, **fields: Any) -> Dict[str, Any]:
+        """Stores a result measured by the suite itself (e.g. in a subprocess)."""
+        self.results[name] = dict(fields)
+        return self.results[name]
+
+    def report(self) -> Dict[str, Any]:
+        """Returns the machine-readable report for all results collected so far."""
+        return {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "git_revision": _git_revision(),
+            "python": sys.version,
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "benchmarks": self.results,
+        }
+
+    def write(self, path: Optional[str] = None) -> None:
+        """Writes the report as JSON to the given path, or to stdout."""
+        text = json.dumps(self.report(), indent=2, sort_keys=True)
+        if path is None:
+            print(text)
+        else:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
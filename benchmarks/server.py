@@ -0,0 +1,145 @@
+"""
+A stand-in for api.wmata.com serving canned fixture responses on localhost.
+
+Used as a context manager, the server points wmata2.utilities at itself for the
+duration of the block so the regular client code paths (connection, request, read,
+decode) are exercised without a network or API key.
+
+Like the real API it can rate limit each API key, answering HTTP 429 once a key has
+made calls_per_second calls within the current second.
+"""
+
+import gzip, threading, time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple, Union
+
+from wmata2 import utilities
+
+# (content type, body), or (content type, body, HTTP status) for an error response.
+Route = Union[Tuple[str, bytes], Tuple[str, bytes, int]]
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_Server"
+
+    def do_GET(self) -> None:
+        # The client sends a placeholder body with its GET requests; drain it so the
+        # connection is not reset under the client.
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        path = self.path.split("?", 1)[0]
+        route = self.server.routes.get(path)
+        if route is None:
+            self._respond(404)
+            return
+        if self.server.throttled(self.headers.get("api_key", "")):
+            self.send_response(429)
+            self.send_header("Retry-After", "1")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            self.server.count(429)
+            return
+        content_type, body, *rest = route
+        status = rest[0] if rest else 200
+        self.server.count(status)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        if self.server.compress and "gzip" in self.headers.get("Accept-Encoding", ""):
+            body = self.server.compressed(path, body)
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _respond(self, status: int) -> None:
+        self.server.count(status)
+        self.send_error(status)
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    routes: Dict[str, Route]
+    compress: bool
+    calls_per_second: Optional[int]
+    statuses: Counter
+    _compressed: Dict[str, bytes]
+    _windows: Dict[str, Tuple[int, int]]
+    _lock: threading.Lock
+
+    def count(self, status: int) -> None:
+        with self._lock:
+            self.statuses[status] += 1
+
+    def throttled(self, key: str) -> bool:
+        """Counts a call against the key, True if it is over this second's limit."""
+        if self.calls_per_second is None:
+            return False
+        second = int(time.monotonic())
+        with self._lock:
+            window, calls = self._windows.get(key, (second, 0))
+            calls = calls + 1 if window == second else 1
+            self._windows[key] = (second, calls)
+        return calls > self.calls_per_second
+
+    def compressed(self, path: str, body: bytes) -> bytes:
+        """Returns the gzip encoding of a route's body, compressing it only once."""
+        if path not in self._compressed:
+            self._compressed[path] = gzip.compress(body)
+        return self._compressed[path]
+
+
+class StandInServer:
+    """
+    Serves fixture payloads keyed by URL path (query strings are ignored).
+
+    Args:
+        routes (Dict[str, Route]): Maps a URL path such as
+            "/StationPrediction.svc/json/GetPrediction/All" to a
+            (content type, body) pair, or a (content type, body, status) triple to
+            answer with an HTTP error.
+        compress (bool, optional): Gzip responses for clients that accept it.
+            Defaults to False.
+        calls_per_second (int, optional): Calls each API key may make per second
+            before getting HTTP 429. Defaults to no limit.
+    """
+
+    def __init__(
+        self,
+        routes: Dict[str, Route],
+        compress: bool = False,
+        calls_per_second: Optional[int] = None,
+    ) -> None:
+        self._server = _Server(("127.0.0.1", 0), _Handler)
+        self._server.routes = dict(routes)
+        self._server.compress = compress
+        self._server.calls_per_second = calls_per_second
+        self._server.statuses = Counter()
+        self._server._compressed = {}
+        self._server._windows = {}
+        self._server._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._saved = (utilities.API_HOST, utilities.API_HTTPS)
+
+    @property
+    def host(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"{host}:{port}"
+
+    @property
+    def statuses(self) -> Counter:
+        """Responses sent so far, by HTTP status."""
+        return self._server.statuses
+
+    def __enter__(self) -> "StandInServer":
+        self._thread.start()
+        utilities.API_HOST = self.host
+        utilities.API_HTTPS = False
+        return self
+
+    def __exit__(self, *exc) -> None:
+        utilities.API_HOST, utilities.API_HTTPS = self._saved
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,47 @@
+"""Shared fixtures for the wmata2 test suite."""
+
+import os
+from typing import Callable, Dict, Optional
+
+import pytest
+
+from wmata2 import metrics, policies, utilities
+from wmata2.gtfs_static import compile_static_feed
+
+
+@pytest.fixture(autouse=True)
+def _isolated_client_state():
+    """Gives each test empty metrics, default policies and no stale responses."""
+    metrics.get_registry().reset()
+    policies.clear_endpoint_policies()
+    with utilities._stale_lock:
+        utilities._last_good.clear()
+        utilities._revalidating.clear()
+    yield
+    policies.clear_endpoint_policies()
+
+
+@pytest.fixture(scope="session")
+def compile_feed(tmp_path_factory) -> Callable[..., str]:
+    """
+    Returns compile_feed(tables, directory=None, **options) -> str, which writes GTFS
+    tables (name -> CSV text) to <directory>/source, compiles them into
+    <directory>/compiled and returns that path. directory defaults to a new
+    temporary directory; options go to compile_static_feed, with workers=1 unless
+    given.
+    """
+
+    def compile_feed(
+        tables: Dict[str, str], directory: Optional[str] = None, **options
+    ) -> str:
+        directory = directory or str(tmp_path_factory.mktemp("feed"))
+        source = os.path.join(directory, "source")
+        os.makedirs(source, exist_ok=True)
+        for name, text in tables.items():
+            with open(os.path.join(source, f"{name}.txt"), "w", newline="") as f:
+                f.write(text)
+        output = os.path.join(directory, "compiled")
+        compile_static_feed(source, output, **{"workers": 1, **options})
+        return output
+
+    return compile_feed
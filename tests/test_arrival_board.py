@@ -0,0 +1,98 @@
+from wmata2.arrival_board import Arrival, ArrivalBoard
+
+
+def _update(stop_id, arrival=None, departure=None):
+    update = {"stopId": stop_id}
+    if arrival is not None:
+        update["arrival"] = arrival
+    if departure is not None:
+        update["departure"] = departure
+    return update
+
+
+def _feed(*trips):
+    return {
+        "header": {"timestamp": "1700000000"},
+        "entity": [
+            {
+                "id": trip_id,
+                "tripUpdate": {
+                    "trip": {"tripId": trip_id, "routeId": route_id},
+                    "stopTimeUpdate": updates,
+                },
+            }
+            for trip_id, route_id, updates in trips
+        ],
+    }
+
+
+def test_arrivals_are_sorted_per_stop():
+    board = ArrivalBoard(
+        _feed(
+            (
+                "T1",
+                "RED",
+                [_update("P1", {"time": "300"}), _update("P2", {"time": "400"})],
+            ),
+            ("T2", "RED", [_update("P1", {"time": "100", "delay": 60})]),
+        )
+    )
+
+    assert board.timestamp == 1700000000
+    assert set(board.stop_ids) == {"P1", "P2"}
+    assert board.next_arrivals("P1", now=0) == [
+        Arrival(100, "T2", "RED", "P1", 60),
+        Arrival(300, "T1", "RED", "P1", None),
+    ]
+    assert board.next_arrivals("P1", n=1, now=101) == [
+        Arrival(300, "T1", "RED", "P1", None)
+    ]
+    assert board.next_arrivals("missing", now=0) == []
+
+
+def test_departure_time_is_used_when_the_arrival_has_none():
+    board = ArrivalBoard(
+        _feed(
+            (
+                "T1",
+                "BL",
+                [
+                    _update("P1", {"delay": 30}, {"time": "500", "delay": 45}),
+                    _update("P2", departure={"time": "600"}),
+                    _update("P3", {"delay": 30}),
+                ],
+            )
+        )
+    )
+
+    assert board.next_arrivals("P1", now=0) == [Arrival(500, "T1", "BL", "P1", 45)]
+    assert board.next_arrivals("P2", now=0) == [Arrival(600, "T1", "BL", "P2", None)]
+    assert "P3" not in board
+
+
+def test_arrivals_across_stops_are_merged_in_time_order():
+    board = ArrivalBoard(
+        _feed(
+            (
+                "T1",
+                "RED",
+                [_update("P1", {"time": "100"}), _update("P1", {"time": "400"})],
+            ),
+            (
+                "T2",
+                "RED",
+                [_update("P2", {"time": "200"}), _update("P2", {"time": "300"})],
+            ),
+        )
+    )
+
+    merged = board.next_arrivals_at(["P1", "P2"], n=3, now=0)
+    assert [a.time for a in merged] == [100, 200, 300]
+
+
+def test_refresh_replaces_the_board():
+    board = ArrivalBoard(_feed(("T1", "RED", [_update("P1", {"time": "100"})])))
+    board.refresh(_feed(("T2", "RED", [_update("P2", {"time": "200"})])))
+
+    assert "P1" not in board
+    assert len(board) == 1
@@ -0,0 +1,203 @@
+import math, struct
+
+import pytest
+
+pb2 = pytest.importorskip("wmata2.gtfs_realtime_pb2")
+from google.protobuf.json_format import MessageToDict
+
+from wmata2.bus.feeds import MISSING_DELAY, TripUpdates, VehiclePositions
+
+# Fields the schema does not define, one of each wire type: varint, length-delimited,
+# fixed64 and fixed32 (field numbers 100 to 103).
+UNKNOWN_FIELDS = (
+    b"\xa0\x06\x96\x01"
+    + b"\xaa\x06\x03abc"
+    + b"\xa9\x06"
+    + bytes(8)
+    + b"\xbd\x06"
+    + bytes(4)
+)
+
+
+def _with_unknown_fields(message) -> None:
+    message.MergeFromString(UNKNOWN_FIELDS)
+
+
+def _float32(value: float) -> float:
+    return struct.unpack("<f", struct.pack("<f", value))[0]
+
+
+def _vehicle_positions_feed() -> bytes:
+    feed = pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = 1_700_000_000
+    _with_unknown_fields(feed.header)
+
+    full = feed.entity.add(id="full").vehicle
+    full.trip.trip_id, full.trip.route_id = "T1", "R1"
+    full.vehicle.id = "V1"
+    full.position.latitude, full.position.longitude = 38.8977, -77.0365
+    full.position.bearing, full.position.speed = 271.5, 12.25
+    full.current_stop_sequence = 7
+    full.current_status = pb2.VehiclePosition.STOPPED_AT
+    full.stop_id = "S1"
+    full.timestamp = 1_699_999_990
+
+    sparse = feed.entity.add(id="sparse").vehicle
+    sparse.position.latitude, sparse.position.longitude = -0.000001, 179.99999
+
+    unknown = feed.entity.add(id="unknown")
+    unknown.vehicle.trip.trip_id = "T3"
+    unknown.vehicle.vehicle.id = "V3"
+    unknown.vehicle.position.latitude, unknown.vehicle.position.longitude = 1.5, -2.5
+    unknown.vehicle.current_status = pb2.VehiclePosition.INCOMING_AT
+    for message in (
+        unknown,
+        unknown.vehicle,
+        unknown.vehicle.trip,
+        unknown.vehicle.vehicle,
+        unknown.vehicle.position,
+    ):
+        _with_unknown_fields(message)
+
+    # Entities of another kind are not rows.
+    feed.entity.add(id="other").trip_update.trip.trip_id = "T9"
+    feed.entity.add(id="empty").vehicle.vehicle.id = "V5"
+
+    return feed.SerializeToString()
+
+
+def _trip_updates_feed() -> bytes:
+    feed = pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "2.0"
+    feed.header.timestamp = 1_700_000_000
+
+    first = feed.entity.add(id="1").trip_update
+    first.trip.trip_id, first.trip.route_id = "T1", "R1"
+    first.trip.start_date = "20231114"
+    first.vehicle.id = "V1"
+    first.timestamp = 1_699_999_999
+    first.delay = -45
+    events = [
+        ({"delay": -90, "time": 1_700_000_100}, None),
+        ({"time": 1_700_000_200}, {"delay": -2_147_483_647, "time": 1_700_000_260}),
+        (None, {"delay": 30, "time": 1_700_000_300}),
+        ({"delay": 5}, None),
+        (None, None),
+    ]
+    for sequence, (arrival, departure) in enumerate(events, 1):
+        update = first.stop_time_update.add(stop_id=f"S{sequence}")
+        if sequence != 5:
+            update.stop_sequence = sequence
+        if arrival is not None:
+            update.arrival.CopyFrom(pb2.TripUpdate.StopTimeEvent(**arrival))
+        if departure is not None:
+            update.departure.CopyFrom(pb2.TripUpdate.StopTimeEvent(**departure))
+        if sequence == 2:
+            _with_unknown_fields(update)
+            _with_unknown_fields(update.arrival)
+            update.arrival.uncertainty = 30
+
+    bare = feed.entity.add(id="2")
+    bare.trip_update.trip.trip_id = "T2"
+    bare.trip_update.stop_time_update.add()
+    _with_unknown_fields(bare)
+    _with_unknown_fields(bare.trip_update)
+
+    feed.entity.add(id="3").vehicle.vehicle.id = "V9"
+    return feed.SerializeToString()
+
+
+def test_vehicle_positions_match_message_to_dict():
+    data = _vehicle_positions_feed()
+    message = pb2.FeedMessage.FromString(data)
+    expected = [
+        e["vehicle"] for e in MessageToDict(message)["entity"] if "vehicle" in e
+    ]
+    decoded = VehiclePositions.from_bytes(data)
+
+    assert decoded.timestamp == int(MessageToDict(message)["header"]["timestamp"])
+    assert len(decoded) == len(expected) == 4
+    for row, vehicle in enumerate(expected):
+        position = vehicle.get("position", {})
+        assert decoded.vehicle_ids[row] == vehicle.get("vehicle", {}).get("id")
+        assert decoded.trip_ids[row] == vehicle.get("trip", {}).get("tripId")
+        assert decoded.route_ids[row] == vehicle.get("trip", {}).get("routeId")
+        assert decoded.stop_ids[row] == vehicle.get("stopId")
+        for column, key in (
+            (decoded.latitude, "latitude"),
+            (decoded.longitude, "longitude"),
+            (decoded.bearing, "bearing"),
+            (decoded.speed, "speed"),
+        ):
+            if key in position:
+                # Both hold the float32 from the wire, MessageToDict rounded.
+                assert column[row] == _float32(position[key])
+            else:
+                assert math.isnan(column[row])
+        assert decoded.current_stop_sequence[row] == vehicle.get(
+            "currentStopSequence", -1
+        )
+        status = vehicle.get("currentStatus")
+        assert decoded.current_status[row] == (
+            -1
+            if status is None
+            else pb2.VehiclePosition.VehicleStopStatus.Value(status)
+        )
+        assert decoded.timestamps[row] == int(vehicle.get("timestamp", 0))
+
+    assert decoded.vehicle("V3").current_status == pb2.VehiclePosition.INCOMING_AT
+    assert [v.vehicle_id for v in decoded.for_route("R1")] == ["V1"]
+    assert [v.vehicle_id for v in decoded.at_stop("S1")] == ["V1"]
+
+
+def test_trip_updates_match_message_to_dict():
+    data = _trip_updates_feed()
+    expected = [
+        e["tripUpdate"]
+        for e in MessageToDict(pb2.FeedMessage.FromString(data))["entity"]
+        if "tripUpdate" in e
+    ]
+    decoded = TripUpdates.from_bytes(data)
+
+    assert decoded.timestamp == 1_700_000_000
+    assert len(decoded) == len(expected) == 2
+    update_row = 0
+    for row, trip_update in enumerate(expected):
+        trip = trip_update.get("trip", {})
+        assert decoded.trip_ids[row] == trip.get("tripId")
+        assert decoded.route_ids[row] == trip.get("routeId")
+        assert decoded.start_dates[row] == trip.get("startDate")
+        assert decoded.vehicle_ids[row] == trip_update.get("vehicle", {}).get("id")
+        assert decoded.trip_timestamps[row] == int(trip_update.get("timestamp", 0))
+        assert decoded.trip_delays[row] == trip_update.get("delay", MISSING_DELAY)
+
+        updates = trip_update.get("stopTimeUpdate", [])
+        assert list(decoded.updates_for_trip(trip["tripId"])) == list(
+            range(update_row, update_row + len(updates))
+        )
+        for update in updates:
+            assert decoded.stop_ids[update_row] == update.get("stopId")
+            assert decoded.stop_sequences[update_row] == update.get("stopSequence", -1)
+            assert decoded.update_trips[update_row] == row
+            for times, delays, key in (
+                (decoded.arrival_times, decoded.arrival_delays, "arrival"),
+                (decoded.departure_times, decoded.departure_delays, "departure"),
+            ):
+                event = update.get(key, {})
+                assert times[update_row] == int(event.get("time", 0))
+                assert delays[update_row] == event.get("delay", MISSING_DELAY)
+            update_row += 1
+    assert update_row == len(decoded.stop_ids) == 6
+
+
+def test_next_arrivals_use_the_departure_when_there_is_no_arrival():
+    decoded = TripUpdates.from_bytes(_trip_updates_feed())
+
+    (arrival,) = decoded.next_arrivals("S3", now=1_700_000_000)
+    assert (arrival.time, arrival.delay, arrival.route_id) == (1_700_000_300, 30, "R1")
+    (arrival,) = decoded.next_arrivals("S1", now=1_700_000_000)
+    assert arrival.delay == -90
+    assert decoded.next_arrivals("S1", now=1_700_000_101) == []
+    assert decoded.next_arrivals("S4", now=0) == []
+    assert decoded.trips_for_route("R1") == ["T1"]
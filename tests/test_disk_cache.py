@@ -0,0 +1,143 @@
+import json, os, runpy, subprocess, sys, time
+
+import pytest
+
+from benchmarks.server import StandInServer
+from wmata2 import disk_cache, policies, utilities
+
+URL = "/Rail.svc/json/jLines?"
+
+WARM_UP_PATHS = (
+    "/Rail.svc/json/jLines",
+    "/Rail.svc/json/jStations",
+    "/Rail.svc/json/jStationTimes",
+    "/Rail.svc/json/jStationParking",
+    "/Rail.svc/json/jSrcStationToDstStationInfo",
+    "/Rail.svc/json/jStationEntrances",
+    "/TrainPositions/StandardRoutes",
+    "/TrainPositions/TrackCircuits",
+)
+
+
+@pytest.fixture(autouse=True)
+def cache_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache" / "responses.sqlite3")
+    monkeypatch.setattr(disk_cache, "CACHE_FILE", path)
+    return path
+
+
+def test_put_get_and_expiry():
+    assert disk_cache.get(URL) is None
+    disk_cache.put(URL, b'{"Lines": []}', ttl_s=60.0)
+
+    assert disk_cache.get(URL) == b'{"Lines": []}'
+    assert disk_cache.get(URL, now=time.time() + 120) is None
+    assert [entry["url"] for entry in disk_cache.entries()] == [URL]
+
+    disk_cache.put(URL, b"{}", ttl_s=60.0)
+    assert disk_cache.get(URL) == b"{}"
+
+
+def test_stale_entries_and_purging():
+    disk_cache.put(URL, b"old", ttl_s=-30.0)
+
+    assert disk_cache.get(URL) is None
+    assert disk_cache.get_stale(URL, max_stale_s=60.0) == b"old"
+    assert disk_cache.get_stale(URL, max_stale_s=10.0) is None
+
+    disk_cache.purge_expired()
+    assert disk_cache.entries() == []
+
+
+def test_invalidate_one_or_all():
+    disk_cache.put(URL, b"a", ttl_s=60.0)
+    disk_cache.put("/Rail.svc/json/jStations?", b"b", ttl_s=60.0)
+
+    disk_cache.invalidate(URL)
+    assert disk_cache.get(URL) is None
+    assert disk_cache.get("/Rail.svc/json/jStations?") == b"b"
+
+    disk_cache.invalidate()
+    assert disk_cache.entries() == []
+
+
+def test_disabled_or_unusable_cache_misses(monkeypatch, tmp_path):
+    monkeypatch.setattr(disk_cache, "CACHE_FILE", None)
+    disk_cache.put(URL, b"a", ttl_s=60.0)
+    assert disk_cache.get(URL) is None
+
+    blocker = tmp_path / "not-a-directory"
+    blocker.write_text("")
+    monkeypatch.setattr(disk_cache, "CACHE_FILE", str(blocker / "responses.sqlite3"))
+    disk_cache.put(URL, b"a", ttl_s=60.0)
+    assert disk_cache.get(URL) is None
+
+
+def test_entries_are_shared_between_processes(cache_file):
+    disk_cache.put(URL, b"from parent", ttl_s=60.0)
+    script = (
+        "import sys\n"
+        "from wmata2 import disk_cache\n"
+        f"sys.stdout.write(disk_cache.get({URL!r}).decode())\n"
+        "disk_cache.put('/child?', b'from child', 60.0)\n"
+    )
+    child = subprocess.run(
+        [sys.executable, "-c", script],
+        env={**os.environ, "WMATA2_CACHE_FILE": cache_file},
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    assert child.stdout == "from parent"
+    assert disk_cache.get("/child?") == b"from child"
+
+
+def test_api_responses_are_cached_on_disk():
+    policies.set_endpoint_policy(
+        "/Rail.svc/json/jLines", policies.EndpointPolicy(disk_cache_ttl_s=60.0)
+    )
+    routes = {"/Rail.svc/json/jLines": ("application/json", b'{"Lines": [1]}')}
+    with StandInServer(routes) as server:
+        assert utilities.get_json_data("key", URL) == {"Lines": [1]}
+        assert utilities.get_json_data("key", URL) == {"Lines": [1]}
+
+    assert server.statuses[200] == 1
+    assert disk_cache.get(URL) == b'{"Lines": [1]}'
+
+
+@pytest.mark.filterwarnings("ignore::RuntimeWarning")
+def test_command_line_warms_the_given_cache_file(
+    tmp_path, cache_file, monkeypatch, capsys
+):
+    target = str(tmp_path / "cli.sqlite3")
+    routes = {path: ("application/json", b'{"ok": 1}') for path in WARM_UP_PATHS}
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["wmata2.disk_cache", "--api-key", "key", "--cache-file", target],
+    )
+    with StandInServer(routes):
+        with pytest.raises(SystemExit) as exit:
+            runpy.run_module("wmata2.disk_cache", run_name="__main__")
+
+    assert exit.value.code == 0
+    assert all(json.loads(capsys.readouterr().out)["endpoints"].values())
+    assert disk_cache.CACHE_FILE == target
+    assert len(disk_cache.entries()) == len(WARM_UP_PATHS)
+    assert not os.path.exists(cache_file)
+
+
+def test_an_expired_entry_is_served_when_the_request_fails():
+    policies.set_endpoint_policy(
+        "/Rail.svc/json/jLines", policies.EndpointPolicy(disk_cache_ttl_s=60.0)
+    )
+    disk_cache.put(URL, b'{"Lines": [1]}', ttl_s=-30.0)
+    error = b'{"statusCode": 500, "message": "Internal error"}'
+    routes = {"/Rail.svc/json/jLines": ("application/json", error, 500)}
+    with StandInServer(routes) as server:
+        assert utilities.get_json_data("key", URL) == {"Lines": [1]}
+
+    assert server.statuses[500] == 1
+    # The error body must not replace the cached response.
+    assert disk_cache.get_stale(URL, max_stale_s=60.0) == b'{"Lines": [1]}'
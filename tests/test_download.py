@@ -0,0 +1,54 @@
+import io, zipfile
+
+import pytest
+
+from benchmarks.server import StandInServer
+from wmata2 import metrics
+from wmata2.key_pool import APIKeyPool
+from wmata2.utilities import download
+
+URL = "/gtfs/rail-gtfs-static.zip?"
+
+
+def _zip() -> bytes:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("stops.txt", "stop_id,stop_name\nSTN_A01,Metro Center\n")
+    return buffer.getvalue()
+
+
+def test_download_returns_body_and_records_metrics():
+    body = _zip()
+    with StandInServer({"/gtfs/rail-gtfs-static.zip": ("application/zip", body)}):
+        assert download("key", URL) == body
+
+    snapshot = metrics.get_registry().snapshot()["/gtfs/rail-gtfs-static.zip"]
+    assert snapshot["requests"] == 1
+    assert snapshot["errors"] == 0
+    assert snapshot["bytes"]["sum"] == len(body)
+
+
+def test_download_decompresses_gzip_responses():
+    body = _zip()
+    routes = {"/gtfs/rail-gtfs-static.zip": ("application/zip", body)}
+    with StandInServer(routes, compress=True):
+        assert download("key", URL) == body
+
+
+def test_download_raises_on_http_error():
+    with StandInServer({}):
+        with pytest.raises(ConnectionError, match="HTTP 404"):
+            download("key", URL)
+
+    assert (
+        metrics.get_registry().snapshot()["/gtfs/rail-gtfs-static.zip"]["errors"] == 1
+    )
+
+
+def test_download_takes_its_key_from_a_pool():
+    pool = APIKeyPool(["key-one", "key-two"])
+    with StandInServer({"/gtfs/rail-gtfs-static.zip": ("application/zip", _zip())}):
+        download(pool, URL)
+
+    assert sum(stats["requests"] for stats in pool.stats()) == 1
+    assert sum(stats["errors"] for stats in pool.stats()) == 0
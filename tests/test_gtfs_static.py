@@ -0,0 +1,105 @@
+import json, math, os
+
+import pytest
+
+from wmata2.gtfs_static import MANIFEST_FILE, load_table
+
+STOP_TIMES = """\
+trip_id,arrival_time,departure_time,stop_id,stop_sequence,shape_dist_traveled
+T1,08:00:00,08:00:30,S1,1,0.0
+T1,08:05:00,08:05:00,S2,2,
+T2,25:10:00,25:10:00,S2,2,1.5
+T2,25:00:00,25:00:00,S1,1,0
+
+T3,,,S3,1,
+"""
+
+TRIPS = """\
+route_id,service_id,trip_id,direction_id,shape_id
+R1,WKD,T1,0,SH1
+R1,WKD,T2,1,SH1
+R2,SAT,T3,,SH2
+"""
+
+CALENDAR_DATES = "service_id,date,exception_type\n"
+
+
+TABLES = {"stop_times": STOP_TIMES, "trips": TRIPS, "calendar_dates": CALENDAR_DATES}
+
+
+@pytest.fixture(scope="module")
+def compiled(compile_feed):
+    # A tiny chunk size splits every table into several byte ranges.
+    output = compile_feed(TABLES, chunk_bytes=16)
+    with open(os.path.join(output, MANIFEST_FILE), encoding="utf-8") as f:
+        return output, json.load(f)["tables"]
+
+
+def test_columns_are_typed(compiled):
+    output, _ = compiled
+    stop_times = load_table("bus", "stop_times", output)
+
+    assert len(stop_times) == 5
+    assert list(stop_times.column("trip_id")) == ["T1", "T1", "T2", "T2", "T3"]
+    assert list(stop_times.column("arrival_time")) == [
+        8 * 3600,
+        8 * 3600 + 300,
+        25 * 3600 + 600,
+        25 * 3600,
+        -1,
+    ]
+    distances = stop_times.column("shape_dist_traveled")
+    assert distances[0] == 0.0 and math.isnan(distances[1])
+    assert list(load_table("bus", "trips", output).column("direction_id")) == [0, 1, -1]
+
+
+def test_indexes_use_global_rows_in_order_by_order(compiled):
+    output, _ = compiled
+    stop_times = load_table("bus", "stop_times", output)
+
+    # T2's rows are stored out of stop_sequence order and come back sorted.
+    assert list(stop_times.rows_for("trip_id", "T2")) == [3, 2]
+    assert list(stop_times.rows_for("stop_id", "S1")) == [0, 3]
+    assert list(stop_times.rows_for("stop_id", "missing")) == []
+
+    trips = load_table("bus", "trips", output)
+    assert trips.lookup("trip_id", "T3")["route_id"] == "R2"
+    assert list(trips.rows_for("route_id", "R1")) == [0, 1]
+
+
+def test_empty_tables_report_every_timing(compiled):
+    _, timings = compiled
+    for table in timings.values():
+        for key in ("parse_s", "merge_s", "index_s", "write_s", "total_s"):
+            assert table[key] >= 0.0
+    assert timings["calendar_dates"]["rows"] == 0
+
+
+def test_worker_processes_give_the_same_tables(compiled, compile_feed):
+    output, _ = compiled
+    parallel = compile_feed(TABLES, workers=2, chunk_bytes=16)
+
+    for name in ("stop_times", "trips", "calendar_dates"):
+        serial_table = load_table("bus", name, output)
+        parallel_table = load_table("bus", name, parallel)
+        assert parallel_table.nrows == serial_table.nrows
+        assert parallel_table.index == serial_table.index
+        assert parallel_table.unique == serial_table.unique
+        for column, values in serial_table.columns.items():
+            assert [str(v) for v in parallel_table.columns[column]] == [
+                str(v) for v in values
+            ]
+
+
+def test_load_table_is_cached_until_the_file_changes(compiled, tmp_path):
+    output, _ = compiled
+    assert load_table("bus", "trips", output) is load_table("bus", "trips", output)
+
+    with pytest.raises(FileNotFoundError):
+        load_table("bus", "trips", str(tmp_path))
+
+
+def test_quoted_newlines_are_rejected(compile_feed):
+    stop_times = 'trip_id,stop_id,stop_headsign\nT1,S1,"two\nlines"\n'
+    with pytest.raises(ValueError, match="newlines"):
+        compile_feed(dict(TABLES, stop_times=stop_times))
@@ -0,0 +1,118 @@
+import random, statistics
+
+import pytest
+
+from wmata2.rail.headways import HeadwayTracker, RingBuffer
+
+ROUTES = {
+    "StandardRoutes": [
+        {
+            "LineCode": "RD",
+            "TrackNum": 1,
+            "TrackCircuits": [
+                {"SeqNum": 0, "CircuitId": 1, "StationCode": "A01"},
+                {"SeqNum": 1, "CircuitId": 2, "StationCode": None},
+                {"SeqNum": 2, "CircuitId": 3, "StationCode": "A02"},
+            ],
+        }
+    ]
+}
+
+
+def _positions(*trains):
+    return {
+        "TrainPositions": [
+            {
+                "TrainId": train_id,
+                "CircuitId": circuit,
+                "LineCode": "RD",
+                "DirectionNum": 1,
+                "SecondsAtLocation": seconds,
+            }
+            for train_id, circuit, seconds in trains
+        ]
+    }
+
+
+def test_ring_buffer_matches_statistics_over_its_window():
+    rng = random.Random(1)
+    buffer = RingBuffer(8)
+    values = []
+    for _ in range(50):
+        value = rng.uniform(0, 600)
+        buffer.push(value)
+        values.append(value)
+        window = values[-8:]
+        assert len(buffer) == len(window)
+        assert list(buffer.values()) == window
+        assert buffer.last == value
+        assert buffer.mean == pytest.approx(statistics.fmean(window))
+        assert buffer.stdev == pytest.approx(statistics.pstdev(window), abs=1e-6)
+
+
+def test_empty_ring_buffer():
+    buffer = RingBuffer(4)
+    assert buffer.stats() == {"count": 0, "mean": None, "stdev": None, "last": None}
+    with pytest.raises(ValueError):
+        RingBuffer(0)
+
+
+def test_headways_and_dwells_from_train_positions():
+    tracker = HeadwayTracker(ROUTES)
+    tracker.update_positions(_positions(("100", 1, 0)), now=1000)
+    tracker.update_positions(_positions(("100", 1, 30)), now=1030)
+    tracker.update_positions(_positions(("100", 2, 0), ("101", 1, 0)), now=1300)
+    tracker.update_positions(_positions(("101", 2, 0), ("102", 1, 0)), now=1400)
+
+    headways = tracker.headway_stats("RD", "A01", 1)
+    assert headways["count"] == 2
+    assert headways["last"] == 100
+    assert headways["mean"] == 200
+    assert headways["bunching"] == 1
+
+    # Train 100 was last seen at A01 at 1030; train 101 from 1300 to 1300.
+    dwells = tracker.dwell_stats("RD", "A01", 1)
+    assert dwells["count"] == 2
+    assert dwells["mean"] == 15
+
+
+def test_departed_trains_are_forgotten():
+    tracker = HeadwayTracker(ROUTES)
+    tracker.update_positions(_positions(("100", 1, 0)), now=1000)
+    tracker.update_positions(_positions(), now=1010)
+    tracker.update_positions(_positions(("100", 1, 0)), now=1100)
+
+    # A train that disappears and comes back counts as a new arrival.
+    assert tracker.headway_stats("RD", "A01", 1)["last"] == 100
+
+
+def test_delay_of_a_passed_stop_is_recorded():
+    def feed(stop_id, update):
+        return {
+            "entity": [
+                {
+                    "id": "1",
+                    "tripUpdate": {
+                        "trip": {"tripId": "T1", "routeId": "RED", "directionId": 0},
+                        "stopTimeUpdate": [{"stopId": stop_id, **update}],
+                    },
+                }
+            ]
+        }
+
+    tracker = HeadwayTracker()
+    tracker.update_trip_updates(feed("P1", {"arrival": {"time": "100"}}))
+    tracker.update_trip_updates(
+        feed("P1", {"arrival": {"time": "160"}, "departure": {"delay": 60}})
+    )
+    tracker.update_trip_updates(feed("P2", {"arrival": {"delay": 90}}))
+
+    assert tracker.delay_stats("RED", "P1")["last"] == 60
+    assert tracker.delay_stats("RED", "P2")["count"] == 0
+
+
+def test_unknown_keys_report_empty_statistics():
+    tracker = HeadwayTracker()
+    assert tracker.headway_stats("RD", "A01", 1)["count"] == 0
+    assert tracker.dwell_stats("RD", "A01", 1)["mean"] is None
+    assert not tracker.is_bunched("RD", "A01", 1)
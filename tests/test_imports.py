@@ -0,0 +1,27 @@
+import json, os, subprocess, sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ("google.protobuf", "gps_time", "numpy", "http.client", "csv")
+
+
+@pytest.mark.parametrize(
+    "module", ["wmata2", "wmata2.wmata", "wmata2.rail.predictions"]
+)
+def test_entry_points_do_not_import_heavy_modules(module):
+    script = (
+        "import json, sys\n"
+        f"import {module}\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))\n"
+    )
+    child = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=ROOT,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+
+    assert json.loads(child.stdout) == []
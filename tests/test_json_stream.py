@@ -0,0 +1,99 @@
+import gzip, json, zlib
+
+import pytest
+
+from benchmarks.server import StandInServer
+from wmata2 import metrics, utilities
+from wmata2.utilities import _decompressor, _iter_array_items, iter_json_items
+
+DOCUMENT = {
+    "Meta": {"Trains": "not this one", "Count": 4},
+    "Trains": [
+        {"Car": "8", "Min": "ARR", "Line": "RD"},
+        -4.5,
+        12345678901234567890,
+        "café — “quoted” ]",
+        [1, [2, {"Trains": []}]],
+        None,
+        True,
+    ],
+    "After": [1],
+}
+BODY = json.dumps(DOCUMENT, ensure_ascii=False, indent=1).encode("utf-8")
+
+
+def _chunked(data: bytes, size: int):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, len(BODY)])
+def test_items_survive_every_chunk_boundary(size):
+    assert list(_iter_array_items(_chunked(BODY, size), "Trains")) == (
+        DOCUMENT["Trains"]
+    )
+
+
+def test_a_number_split_across_chunks_is_not_cut_short():
+    chunks = [b'{"Trains": [1', b"23, -4.", b"5e", b"1, 7]}"]
+    assert list(_iter_array_items(chunks, "Trains")) == [123, -45.0, 7]
+
+
+def test_empty_and_last_items():
+    assert list(_iter_array_items([b'{"Trains": [ ]}'], "Trains")) == []
+    assert list(_iter_array_items([b'{"Trains": [3', b"]}"], "Trains")) == [3]
+
+
+def test_missing_and_truncated_lists_raise():
+    with pytest.raises(ValueError, match="No 'Lines' list"):
+        list(_iter_array_items(_chunked(BODY, 5), "Lines"))
+
+    truncated = _iter_array_items([b'{"Trains": [{"a": 1}, {"b": '], "Trains")
+    assert next(truncated) == {"a": 1}
+    with pytest.raises(ValueError, match="Truncated 'Trains'"):
+        next(truncated)
+
+
+@pytest.mark.parametrize(
+    "encoding, compress",
+    [
+        ("gzip", gzip.compress),
+        ("deflate", zlib.compress),
+        ("deflate", lambda data: zlib.compress(data)[2:-4]),
+    ],
+    ids=["gzip", "zlib-deflate", "raw-deflate"],
+)
+def test_decompressors_stream(encoding, compress):
+    decompressor = _decompressor(encoding)
+    body = b"".join(decompressor.decompress(c) for c in _chunked(compress(BODY), 10))
+    assert body + decompressor.flush() == BODY
+
+
+def test_identity_and_unknown_encodings():
+    assert _decompressor(None) is None
+    assert _decompressor(" Identity ") is None
+    with pytest.raises(ValueError, match="br"):
+        _decompressor("br")
+
+
+def test_decode_json_parses_bytes():
+    assert utilities._decode_json(BODY) == DOCUMENT
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_iter_json_items_streams_from_the_api(compress):
+    routes = {"/TrainPositions/TrainPositions": ("application/json", BODY)}
+    with StandInServer(routes, compress=compress):
+        items = list(
+            iter_json_items("key", "/TrainPositions/TrainPositions?", "Trains")
+        )
+
+    assert items == DOCUMENT["Trains"]
+    snapshot = metrics.get_registry().snapshot()["/TrainPositions/TrainPositions"]
+    assert snapshot["requests"] == 1 and snapshot["errors"] == 0
+
+
+def test_iter_json_items_stops_quietly_on_failure():
+    with StandInServer({}):
+        assert list(iter_json_items("key", "/Missing?", "Trains")) == []
+
+    assert metrics.get_registry().snapshot()["/Missing"]["errors"] == 1
@@ -0,0 +1,109 @@
+import time
+
+import pytest
+
+from benchmarks.server import StandInServer
+from wmata2 import key_pool, utilities
+from wmata2.key_pool import APIKeyPool, NoKeyAvailable
+
+PATH = "/Rail.svc/json/jLines"
+
+
+def _stats(pool: APIKeyPool) -> dict:
+    return {stats["key"]: stats for stats in pool.stats()}
+
+
+def test_acquire_takes_the_key_with_the_most_budget():
+    pool = APIKeyPool(["key-aaaa", "key-bbbb", "key-cccc"])
+    taken = [pool.acquire() for _ in range(9)]
+
+    assert sorted(taken) == sorted(["key-aaaa", "key-bbbb", "key-cccc"] * 3)
+    assert {s["requests"] for s in pool.stats()} == {3}
+
+
+def test_a_faster_key_takes_more_of_the_load():
+    pool = APIKeyPool(["slow-1111"], calls_per_second=2)
+    pool.add_key("fast-2222", calls_per_second=20)
+    taken = [pool.acquire(timeout=0) for _ in range(22)]
+
+    assert taken.count("fast-2222") == 20 and taken.count("slow-1111") == 2
+    with pytest.raises(NoKeyAvailable, match="deadline"):
+        pool.acquire(timeout=0)
+
+
+def test_a_throttled_key_is_benched_for_retry_after():
+    pool = APIKeyPool(["key-aaaa", "key-bbbb"])
+    pool.release(pool.acquire(), 429, "30")
+
+    stats = _stats(pool)
+    assert stats["...aaaa"]["throttled"] == 1
+    assert 29 < stats["...aaaa"]["cooldown_s"] <= 30
+    assert pool.available() == 1
+    assert {pool.acquire() for _ in range(5)} == {"key-bbbb"}
+
+
+def test_repeated_throttles_back_off_exponentially_until_a_success():
+    pool = APIKeyPool(["key-aaaa"], cooldown_s=2.0)
+    cooldowns = []
+    for _ in range(3):
+        pool.release("key-aaaa", 429)
+        cooldowns.append(pool.stats()[0]["cooldown_s"])
+    pool.release("key-aaaa", 429, "10000")
+
+    assert [round(c) for c in cooldowns] == [2, 4, 8]
+    assert pool.stats()[0]["cooldown_s"] == pytest.approx(key_pool.MAX_COOLDOWN_S, 1)
+
+    pool.release("key-aaaa", 200)
+    pool.release("key-aaaa", 429)
+    assert round(pool.stats()[0]["cooldown_s"]) == 2
+
+
+def test_waits_for_a_key_within_the_deadline():
+    pool = APIKeyPool(["key-aaaa"], calls_per_second=20)
+    for _ in range(20):
+        pool.acquire(timeout=0)
+
+    start = time.monotonic()
+    assert pool.acquire(timeout=1.0) == "key-aaaa"
+    assert 0.02 <= time.monotonic() - start < 0.5
+
+
+def test_daily_quota_and_the_next_day(monkeypatch):
+    pool = APIKeyPool(["key-aaaa", "key-bbbb"], calls_per_day=2)
+    for _ in range(4):
+        pool.acquire(timeout=1.0)
+
+    with pytest.raises(NoKeyAvailable, match="daily quota"):
+        pool.acquire(timeout=1.0)
+    assert pool.available() == 0
+
+    today = key_pool._utc_day()
+    monkeypatch.setattr(key_pool, "_utc_day", lambda: today + 1)
+    pool.acquire(timeout=0)
+    assert sorted(s["remaining_today"] for s in pool.stats()) == [1, 2]
+
+
+def test_keys_are_masked_and_errors_counted():
+    pool = APIKeyPool(["secret-key-1234"])
+    pool.release("secret-key-1234", 500)
+    pool.release("secret-key-1234", None)
+    pool.release("unknown", 500)
+
+    assert "secret" not in repr(pool) and "secret" not in repr(pool.stats())
+    assert _stats(pool)["...1234"]["errors"] == 2
+    with pytest.raises(ValueError):
+        APIKeyPool([])
+
+
+def test_a_throttled_request_is_retried_on_another_key():
+    pool = APIKeyPool(["bad-key-0000", "good-key-1111"])
+    routes = {PATH: ("application/json", b'{"Lines": []}')}
+    with StandInServer(routes) as server:
+        server._server.throttled = lambda key: key == "bad-key-0000"
+        assert utilities.get_json_data(pool, PATH + "?") == {"Lines": []}
+        assert utilities.get_json_data(pool, PATH + "?") == {"Lines": []}
+
+    assert server.statuses[429] == 1 and server.statuses[200] == 2
+    stats = _stats(pool)
+    assert stats["...0000"]["throttled"] == 1
+    assert stats["...1111"]["requests"] == 2
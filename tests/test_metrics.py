@@ -0,0 +1,115 @@
+import math, re
+
+import pytest
+
+from wmata2 import metrics
+from wmata2.metrics import Histogram, RequestRecord
+
+PATH = "/Rail.svc/json/jLines"
+
+
+def _record(endpoint=PATH, **fields) -> RequestRecord:
+    record = RequestRecord(endpoint, "Get lines")
+    for name, value in fields.items():
+        setattr(record, name, value)
+    return record
+
+
+def _samples(text: str) -> dict:
+    """Parses the exposition text into {(name, labels): value}."""
+    samples = {}
+    for line in text.splitlines():
+        if line.startswith("#"):
+            continue
+        match = re.fullmatch(r"(\w+)\{(.*)\} (\S+)", line)
+        assert match, line
+        samples[match.group(1), match.group(2)] = float(match.group(3))
+    return samples
+
+
+def test_histogram_buckets_and_quantiles():
+    histogram = Histogram((1.0, 2.0, 4.0))
+    assert histogram.quantile(0.5) is None
+
+    for value in (0.5, 1.0, 1.5, 3.0, 3.5, 100.0):
+        histogram.observe(value)
+
+    # Bounds are inclusive: 1.0 lands in the first bucket.
+    assert histogram.counts == [2, 1, 2, 1]
+    assert histogram.count == 6 and histogram.sum == pytest.approx(109.5)
+    assert histogram.quantile(0.0) == 1.0
+    assert histogram.quantile(1 / 3) == 1.0
+    assert histogram.quantile(0.5) == 2.0
+    assert histogram.quantile(0.8) == 4.0
+    assert histogram.quantile(1.0) == math.inf
+
+
+def test_observe_counts_requests_and_runs_hooks():
+    registry = metrics.get_registry()
+    seen = []
+
+    def failing_hook(record):
+        raise RuntimeError("hook failed")
+
+    metrics.add_hook(failing_hook)
+    metrics.add_hook(seen.append)
+    try:
+        ok = _record(total=0.003, request=0.002, bytes=300, status=200, hedges=1)
+        registry.observe(ok)
+        registry.observe(_record(total=0.01, error="HTTP 500", status=500))
+        metrics.record_cache_hit(PATH)
+    finally:
+        metrics.remove_hook(failing_hook)
+        metrics.remove_hook(seen.append)
+    registry.observe(_record(total=0.001))
+
+    # A failing hook is logged and does not stop the others.
+    assert len(seen) == 2 and seen[0] is ok
+    snapshot = registry.snapshot()[PATH]
+    assert (snapshot["requests"], snapshot["errors"]) == (3, 1)
+    assert (snapshot["hedged_requests"], snapshot["cache_hits"]) == (1, 1)
+    assert snapshot["bytes"] == {"sum": 300.0, "count": 1}
+    assert snapshot["total_seconds"]["count"] == 3
+    assert snapshot["request_seconds"]["count"] == 1
+    assert snapshot["parse_seconds"]["count"] == 0
+    assert registry.sample_count(PATH) == 3 and registry.sample_count("/x") == 0
+    assert registry.quantile(PATH, 0.5) == 0.004
+    assert registry.quantile("/x", 0.5) is None
+
+
+def test_openmetrics_export():
+    registry = metrics.get_registry()
+    totals = (0.0001, 0.003, 0.003, 1000.0)
+    for total in totals:
+        registry.observe(_record(total=total, bytes=123456789))
+    registry.observe(_record('/quoted"\\path', error="timeout"))
+
+    text = metrics.export_openmetrics()
+    assert text.endswith("\n# EOF\n") and text.count("# EOF") == 1
+    samples = _samples(text)
+    label = f'endpoint="{PATH}"'
+
+    buckets = [
+        (float(le), value)
+        for (name, labels), value in samples.items()
+        if name == "wmata2_request_total_seconds_bucket"
+        and labels.startswith(label + ",")
+        for le in re.findall(r'le="([^"]+)"', labels)
+    ]
+    assert [le for le, _ in buckets] == [*metrics.LATENCY_BUCKETS_S, math.inf]
+    counts = [value for _, value in buckets]
+    assert counts == sorted(counts) and counts[-1] == 4
+    assert dict(buckets)[0.0005] == 1 and dict(buckets)[0.004] == 3
+    assert samples["wmata2_request_total_seconds_count", label] == 4
+    assert samples["wmata2_request_total_seconds_sum", label] == sum(totals)
+
+    # Bounds and sums are written at full precision.
+    assert 'le="1048576.0"' in text
+    assert samples["wmata2_response_bytes_sum", label] == 4 * 123456789
+
+    assert samples["wmata2_requests_total", label] == 4
+    assert samples["wmata2_request_errors_total", label] == 0
+    quoted = 'endpoint="/quoted\\"\\\\path"'
+    assert samples["wmata2_requests_total", quoted] == 1
+    assert samples["wmata2_request_errors_total", quoted] == 1
+    assert samples["wmata2_cache_hits_total", quoted] == 0
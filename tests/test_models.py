@@ -0,0 +1,91 @@
+import copy
+
+from wmata2.rail.models import (
+    Entrances,
+    Predictions,
+    StationToStationInfos,
+    Stations,
+    TrainPositions,
+)
+
+PREDICTIONS = {
+    "Trains": [
+        {"Car": "8", "LocationCode": "A01", "Line": "RD", "Min": "ARR", "Group": "1"},
+        {"Car": "6", "LocationCode": "A01", "Line": "RD", "Min": "BRD", "Group": "2"},
+        {"Car": "-", "LocationCode": "A01", "Line": "RD", "Min": "12", "Group": "1"},
+        {"Car": None, "LocationCode": "C01", "Line": "BL", "Min": "", "Group": "1"},
+        {"Car": "8", "LocationCode": "C01", "Line": "No", "Min": "---"},
+    ]
+}
+
+
+def test_prediction_fields_parse_once_and_tolerate_placeholders():
+    predictions = Predictions.from_response(copy.deepcopy(PREDICTIONS))
+
+    assert [p.minutes for p in predictions] == [0.0, 0.0, 12.0, None, None]
+    assert [p.car_count for p in predictions] == [8, 6, None, None, 8]
+    assert predictions[0].is_arriving and predictions[1].is_boarding
+    assert predictions[4].group is None
+
+    # The parsed value is cached: later edits to the raw dict are not seen.
+    predictions[2].raw["Min"] = "3"
+    assert predictions[2].minutes == 12.0
+
+
+def test_collections_index_by_key_in_response_order():
+    predictions = Predictions.from_response(PREDICTIONS)
+
+    assert [p.min for p in predictions.all("A01")] == ["ARR", "BRD", "12"]
+    assert predictions.get("C01") is predictions[3]
+    assert predictions.get("Z99") is None and predictions.all("Z99") == []
+    assert set(predictions.keys()) == {"A01", "C01"}
+    assert len(Predictions.from_response(None)) == 0
+
+
+def test_nested_fields_and_multi_key_items():
+    infos = StationToStationInfos.from_response(
+        {
+            "StationToStationInfos": [
+                {
+                    "SourceStation": "A01",
+                    "DestinationStation": "A02",
+                    "CompositeMiles": 0.95,
+                    "RailTime": 4,
+                    "RailFare": {"PeakTime": 2.25, "OffPeakTime": "2.0"},
+                }
+            ]
+        }
+    )
+    info = infos.get(("A01", "A02"))
+    assert (info.rail_time, info.peak_fare, info.off_peak_fare) == (4.0, 2.25, 2.0)
+    assert info.senior_disabled_fare is None
+
+    entrances = Entrances.from_response(
+        {
+            "Entrances": [
+                {"ID": "1", "StationCode1": "A01", "StationCode2": "C01", "Lat": "1"},
+                {"ID": "2", "StationCode1": "C01", "StationCode2": ""},
+            ]
+        }
+    )
+    assert [e.id for e in entrances.all("C01")] == ["1", "2"]
+    assert entrances.get("A01").lat == 1.0 and entrances[1].lat is None
+
+    station = Stations.from_response(
+        {"Stations": [{"Code": "A01", "LineCode1": "RD", "LineCode2": None}]}
+    ).get("A01")
+    assert station.line_codes == ("RD",) and station.street is None
+
+
+def test_train_positions_are_keyed_by_train_id():
+    positions = TrainPositions.from_response(
+        {
+            "TrainPositions": [
+                {"TrainId": "100", "CarCount": 6, "CircuitId": "1234"},
+                {"TrainId": "101", "CarCount": 0, "DirectionNum": 2},
+            ]
+        }
+    )
+    assert positions.get("100").circuit_id == 1234
+    assert positions.get("101").car_count == 0
+    assert positions.get("101").direction_num == 2
@@ -0,0 +1,144 @@
+import heapq, itertools
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from benchmarks import fixtures
+from wmata2.rail.network import STATION_COMPLEXES, Leg, RailNetwork
+
+LINES = {
+    "RD": [["A03", "A02", "A01", "B01", "B02", "B03"]],
+    "BL": [["C03", "C02", "C01", "D01", "D02"], ["D02", "D01", "C01"]],
+    "GR": [["F02", "F01", "E01", "E02"]],
+    "YL": [["E02", "E03", "D02"]],
+    "XX": [["X01", "X02"]],
+}
+COMPLEXES = (("A01", "C01"), ("B01", "F01"))
+TRANSFER_COST = 2.0
+
+
+def _edges(lines, complexes, transfer_cost):
+    """The graph RailNetwork documents, built independently as an adjacency map."""
+    place = {code: group[0] for group in complexes for code in group}
+    graph, by_place = {}, {}
+    for line_code, patterns in lines.items():
+        for stations in patterns:
+            for code in stations:
+                graph.setdefault((code, line_code), {})
+                by_place.setdefault(place.get(code, code), set()).add((code, line_code))
+            for a, b in zip(stations, stations[1:]):
+                graph[(a, line_code)][(b, line_code)] = 1.0
+                graph[(b, line_code)][(a, line_code)] = 1.0
+    for nodes in by_place.values():
+        for a, b in itertools.permutations(nodes, 2):
+            graph[a][b] = transfer_cost
+    return graph
+
+
+def _dijkstra(graph, source):
+    dist = {source: 0.0}
+    queue = [(0.0, source)]
+    while queue:
+        d, node = heapq.heappop(queue)
+        if d > dist[node]:
+            continue
+        for neighbour, cost in graph[node].items():
+            if d + cost < dist.get(neighbour, float("inf")):
+                dist[neighbour] = d + cost
+                heapq.heappush(queue, (d + cost, neighbour))
+    return dist
+
+
+def _check_against_brute_force(network, lines, complexes, transfer_cost):
+    graph = _edges(lines, complexes, transfer_cost)
+    assert set(network.nodes) == set(graph)
+    all_dist = {node: _dijkstra(graph, node) for node in graph}
+    stations = sorted({code for code, _ in graph})
+
+    for start, end in itertools.product(stations, repeat=2):
+        best = min(
+            all_dist[a].get(b, float("inf"))
+            for a in graph
+            if a[0] == start
+            for b in graph
+            if b[0] == end
+        )
+        path = network.path(start, end)
+        if best == float("inf"):
+            assert path == [] and network.transfers(start, end) is None
+            continue
+        assert path[0][0] == start and path[-1][0] == end
+        assert sum(graph[a][b] for a, b in zip(path, path[1:])) == best
+        transfers = network.transfers(start, end)
+        assert transfers == sum(1 for a, b in zip(path, path[1:]) if a[1] != b[1])
+
+        legs = network.legs(start, end)
+        assert sum(leg.stops for leg in legs) == sum(
+            1 for a, b in zip(path, path[1:]) if a[1] == b[1]
+        )
+        for leg, following in zip(legs, legs[1:]):
+            assert leg.line_code != following.line_code
+
+
+def test_paths_match_dijkstra():
+    network = RailNetwork(LINES, COMPLEXES, TRANSFER_COST)
+    _check_against_brute_force(network, LINES, COMPLEXES, TRANSFER_COST)
+
+
+def test_high_transfer_costs_prefer_staying_on_the_line():
+    network = RailNetwork(LINES, COMPLEXES, transfer_cost=10.0)
+    _check_against_brute_force(network, LINES, COMPLEXES, 10.0)
+
+    # E02 -> D02 on YL directly rather than changing twice.
+    assert network.legs("E02", "D02") == [Leg("YL", "E02", "D02", 2)]
+
+
+def test_legs_transfers_and_station_sequences():
+    network = RailNetwork(LINES, COMPLEXES, TRANSFER_COST)
+
+    assert network.legs("A03", "C03") == [
+        Leg("RD", "A03", "A01", 2),
+        Leg("BL", "C01", "C03", 2),
+    ]
+    assert network.transfers("A03", "C03") == 1
+    assert network.station_sequence("A03", "C03") == ["A03", "A02", "A01", "C02", "C03"]
+    assert network.stops("A03", "C03") == 4
+    assert network.transfers("A02", "B02") == 0
+    assert network.path("A01", "A01") == [("A01", "RD")]
+    assert network.stops("X01", "A01") is None
+    assert sorted(network.transfer_stations) == [
+        "A01",
+        "B01",
+        "C01",
+        "D02",
+        "E02",
+        "F01",
+    ]
+    assert network.lines["BL"] == ["C03", "C02", "C01", "D01", "D02"]
+    with pytest.raises(ValueError, match="Z99"):
+        network.path("A01", "Z99")
+
+
+def test_standard_routes_network_matches_dijkstra():
+    response = fixtures.standard_routes()
+    network = RailNetwork.from_standard_routes(response)
+
+    lines = {}
+    for route in response["StandardRoutes"]:
+        circuits = sorted(route["TrackCircuits"], key=lambda c: c["SeqNum"])
+        lines.setdefault(route["LineCode"], []).append(
+            [c["StationCode"] for c in circuits if c.get("StationCode")]
+        )
+    graph = _edges(lines, STATION_COMPLEXES, network.transfer_cost)
+    stations = sorted({code for code, _ in graph})
+    assert len(stations) > 50
+    for start in stations[::10]:
+        dist = {}
+        for node in graph:
+            if node[0] == start:
+                for target, d in _dijkstra(graph, node).items():
+                    dist[target[0]] = min(dist.get(target[0], float("inf")), d)
+        for end, best in dist.items():
+            path = network.path(start, end)
+            assert sum(graph[a][b] for a, b in zip(path, path[1:])) == best
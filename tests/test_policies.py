@@ -0,0 +1,174 @@
+import threading, time
+
+from benchmarks.server import StandInServer
+from wmata2 import metrics, policies, utilities
+from wmata2.policies import EndpointPolicy
+
+PATH = "/Rail.svc/json/jLines"
+URL = PATH + "?"
+
+
+def _server() -> StandInServer:
+    return StandInServer({PATH: ("application/json", b'{"Lines": [1, 2]}')})
+
+
+def _wait_for_revalidations() -> None:
+    give_up = time.monotonic() + 5
+    while utilities._revalidating and time.monotonic() < give_up:
+        time.sleep(0.01)
+
+
+def test_longest_prefix_wins():
+    short, long = EndpointPolicy(timeout_s=1.0), EndpointPolicy(timeout_s=2.0)
+    policies.set_endpoint_policy("/Rail.svc", short)
+    policies.set_endpoint_policy("/Rail.svc/json/jLines", long)
+
+    assert policies.get_endpoint_policy(PATH) is long
+    assert policies.get_endpoint_policy("/Rail.svc/json/jStations") is short
+    assert policies.get_endpoint_policy("/Bus.svc/json/jRoutes") is (
+        policies.DEFAULT_POLICY
+    )
+
+
+def test_enable_disk_cache_keeps_other_settings():
+    policies.set_endpoint_policy(PATH, EndpointPolicy(timeout_s=3.0, fresh_s=1.0))
+    policies.enable_disk_cache()
+
+    policy = policies.get_endpoint_policy(PATH)
+    assert policy.timeout_s == 3.0
+    assert policy.fresh_s == 1.0
+    assert policy.disk_cache_ttl_s == policies.SLOW_CHANGING_ENDPOINTS[PATH]
+
+
+def test_hedge_delay_waits_for_enough_samples():
+    policy = EndpointPolicy(hedge_quantile=0.5, hedge_min_samples=3)
+    assert policy.hedge_delay(PATH) is None
+
+    for _ in range(3):
+        record = metrics.RequestRecord(PATH)
+        record.request = 0.01
+        metrics.get_registry().observe(record)
+
+    assert policy.hedge_delay(PATH) == metrics.get_registry().quantile(
+        PATH, 0.5, "request"
+    )
+    assert EndpointPolicy(hedge_after_s=0.2).hedge_delay(PATH) == 0.2
+    assert EndpointPolicy(hedge_after_s=0.2, max_hedges=0).hedge_delay(PATH) is None
+
+
+def test_fresh_response_is_served_without_revalidating():
+    policies.set_endpoint_policy(
+        PATH, EndpointPolicy(stale_while_revalidate=True, fresh_s=60.0)
+    )
+    with _server() as server:
+        first = utilities.get_json_data("key", URL)
+        second = utilities.get_json_data("key", URL)
+        _wait_for_revalidations()
+
+    assert first == second == {"Lines": [1, 2]}
+    assert server.statuses[200] == 1
+    assert metrics.get_registry().snapshot()[PATH]["cache_hits"] == 1
+
+
+def test_old_response_is_served_and_revalidated_in_the_background():
+    policies.set_endpoint_policy(
+        PATH, EndpointPolicy(stale_while_revalidate=True, fresh_s=0.0)
+    )
+    with _server() as server:
+        utilities.get_json_data("key", URL)
+        assert utilities.get_json_data("key", URL) == {"Lines": [1, 2]}
+        _wait_for_revalidations()
+
+    assert server.statuses[200] == 2
+
+
+def test_concurrent_revalidations_of_a_url_are_deduplicated(monkeypatch):
+    policy = EndpointPolicy(stale_while_revalidate=True, fresh_s=0.0)
+    policies.set_endpoint_policy(PATH, policy)
+    utilities._last_good[URL] = (time.monotonic() - 1.0, {"Lines": []})
+
+    release = threading.Event()
+    calls = []
+
+    def slow_fetch_now(*args):
+        calls.append(args)
+        release.wait(5)
+
+    monkeypatch.setattr(utilities, "_fetch_now", slow_fetch_now)
+    for _ in range(5):
+        assert utilities.get_json_data("key", URL) == {"Lines": []}
+    release.set()
+    _wait_for_revalidations()
+
+    assert len(calls) == 1
+
+
+def test_last_good_response_is_served_when_the_request_fails():
+    policy = EndpointPolicy(stale_while_revalidate=True, fresh_s=60.0)
+    policies.set_endpoint_policy(PATH, policy)
+    with _server() as server:
+        utilities.get_json_data("key", URL)
+        server._server.routes.clear()
+        fetched = utilities._fetch_now(
+            "key", URL, "Get lines", "JSON", utilities._decode_json, policy
+        )
+
+    assert fetched == {"Lines": [1, 2]}
+    assert server.statuses[404] == 1
+
+
+def test_request_fails_once_the_deadline_passes():
+    policies.set_endpoint_policy(PATH, EndpointPolicy(timeout_s=0.0))
+    with _server() as server:
+        assert utilities.get_json_data("key", URL) is None
+
+    assert server.statuses[200] == 0
+    assert metrics.get_registry().snapshot()[PATH]["errors"] == 1
+
+
+def test_a_json_error_body_falls_back_to_the_last_good_response():
+    policy = EndpointPolicy(stale_while_revalidate=True, fresh_s=60.0)
+    policies.set_endpoint_policy(PATH, policy)
+    with _server() as server:
+        utilities.get_json_data("key", URL)
+        server._server.routes[PATH] = (
+            "application/json",
+            b'{"statusCode": 500, "message": "Internal error"}',
+            500,
+        )
+        fetched = utilities._fetch_now(
+            "key", URL, "Get lines", "JSON", utilities._decode_json, policy
+        )
+
+    assert fetched == {"Lines": [1, 2]}
+    assert server.statuses[500] == 1
+    assert metrics.get_registry().snapshot()[PATH]["errors"] == 1
+
+
+def test_a_json_error_body_is_not_returned_without_a_fallback():
+    error = b'{"statusCode": 500, "message": "Internal error"}'
+    with StandInServer({PATH: ("application/json", error, 500)}):
+        assert utilities.get_json_data("key", URL) is None
+
+
+def test_hedging_waits_for_a_good_attempt_after_an_error_status(monkeypatch):
+    policies.set_endpoint_policy(PATH, EndpointPolicy(hedge_after_s=0.01, max_hedges=1))
+    calls = []
+
+    def fake_request(API_KEY, URL, record, deadline):
+        calls.append(record)
+        if len(calls) == 1:
+            # The first attempt fails fast with a decodable error body...
+            record.status, record.error = 500, "HTTP 500"
+            return b'{"statusCode": 500}'
+        # ...and the hedge answers later with the real response.
+        time.sleep(0.05)
+        record.status = 200
+        return b'{"Lines": [3]}'
+
+    monkeypatch.setattr(utilities, "_request", fake_request)
+    assert utilities.get_json_data("key", URL) == {"Lines": [3]}
+    assert len(calls) == 2
+
+    snapshot = metrics.get_registry().snapshot()[PATH]
+    assert snapshot["errors"] == 0 and snapshot["hedged_requests"] == 1
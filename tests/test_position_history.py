@@ -0,0 +1,140 @@
+import pytest
+
+from wmata2.rail.position_history import SCHEMA, PositionHistory
+
+BASE = 1_700_000_000
+
+
+def _train(train_id: str, circuit_id: int, **fields) -> dict:
+    train = {
+        "TrainId": train_id,
+        "TrainNumber": "4" + train_id,
+        "LineCode": "RD",
+        "DestinationStationCode": "A15",
+        "ServiceType": "Normal",
+        "CircuitId": circuit_id,
+        "DirectionNum": 1,
+        "CarCount": 8,
+        "SecondsAtLocation": 5,
+    }
+    train.update(fields)
+    return train
+
+
+def _fill(history: PositionHistory, snapshots: int = 10) -> None:
+    for i in range(snapshots):
+        trains = [_train("001", 100 + i), _train("002", 200 + i)]
+        if i % 2:
+            trains.append(_train("003", 300 + i, LineCode=None))
+        history.append_snapshot({"TrainPositions": trains}, now=BASE + 10 * i)
+
+
+def _as_lists(columns: dict) -> dict:
+    return {name: list(values) for name, values in columns.items()}
+
+
+def test_trajectory_and_time_slice():
+    history = PositionHistory()
+    _fill(history)
+
+    trajectory = history.trajectory("003")
+    assert list(trajectory["time"]) == [BASE + 10 * i for i in range(1, 10, 2)]
+    assert list(trajectory["circuit_id"]) == [300 + i for i in range(1, 10, 2)]
+    assert trajectory["line_code"] == [None] * 5
+    assert history.trajectory("003", start=BASE + 25, end=BASE + 50)["time"] == (
+        history.time_slice(BASE + 25, BASE + 50)["time"][2::5]
+    )
+
+    time_slice = history.time_slice(BASE + 10, BASE + 20)
+    assert time_slice["train_id"] == ["001", "002", "003", "001", "002"]
+    assert history.trajectory("missing")["train_id"] == []
+
+
+def test_a_train_that_does_not_fit_is_skipped_whole():
+    history = PositionHistory()
+    added = history.append_snapshot(
+        {
+            "TrainPositions": [
+                _train("001", 100),
+                _train("002", 200, CarCount=300),
+                _train("004", 400, CircuitId="x"),
+                _train("003", 300),
+            ]
+        },
+        now=BASE,
+    )
+
+    assert added == 2
+    assert {len(history._columns[name]) for name, _, _, _ in SCHEMA} == {2}
+    assert history.time_slice(BASE, BASE)["train_id"] == ["001", "003"]
+    assert history.trajectory("002")["train_id"] == []
+    assert history.trajectory("004")["train_id"] == []
+    assert list(history.trajectory("003")["circuit_id"]) == [300]
+
+
+def test_an_older_snapshot_is_rejected():
+    history = PositionHistory()
+    history.append_snapshot({"TrainPositions": [_train("001", 100)]}, now=BASE + 10)
+    history.append_snapshot({"TrainPositions": [_train("001", 101)]}, now=BASE + 10)
+
+    with pytest.raises(ValueError, match="time order"):
+        history.append_snapshot({"TrainPositions": [_train("001", 99)]}, now=BASE)
+    assert len(history) == 2
+
+
+def test_spilled_segments_answer_like_memory(tmp_path):
+    memory = PositionHistory()
+    spilled = PositionHistory(spill_dir=str(tmp_path), spill_rows=4)
+    _fill(memory)
+    _fill(spilled)
+
+    assert len(spilled._segments) > 1
+    assert len(spilled) == len(memory)
+    for train_id in ("001", "002", "003"):
+        assert _as_lists(spilled.trajectory(train_id)) == _as_lists(
+            memory.trajectory(train_id)
+        )
+        assert _as_lists(
+            spilled.trajectory(train_id, start=BASE + 15, end=BASE + 65)
+        ) == _as_lists(memory.trajectory(train_id, start=BASE + 15, end=BASE + 65))
+    assert _as_lists(spilled.time_slice(BASE + 15, BASE + 65)) == _as_lists(
+        memory.time_slice(BASE + 15, BASE + 65)
+    )
+
+
+def test_a_reopened_spill_dir_keeps_history_and_time_order(tmp_path):
+    history = PositionHistory(spill_dir=str(tmp_path), spill_rows=4)
+    _fill(history)
+    history.spill()
+    expected = _as_lists(history.trajectory("001"))
+
+    reopened = PositionHistory(spill_dir=str(tmp_path), spill_rows=4)
+    assert len(reopened) == len(history)
+    assert _as_lists(reopened.trajectory("001")) == expected
+    with pytest.raises(ValueError):
+        reopened.append_snapshot({"TrainPositions": [_train("001", 1)]}, now=BASE)
+
+
+def test_spilled_trajectories_read_only_the_trains_rows(tmp_path, monkeypatch):
+    history = PositionHistory(spill_dir=str(tmp_path), spill_rows=4)
+    _fill(history)
+    history.spill()
+    expected = _as_lists(history.trajectory("003", start=BASE + 15))
+
+    def load_segment(meta):
+        raise AssertionError(f"read all of {meta['name']}")
+
+    read = []
+    original_read_rows = history._read_rows
+
+    def read_rows(meta, rows, names=None):
+        read.extend(rows)
+        return original_read_rows(meta, rows, names)
+
+    monkeypatch.setattr(history, "_load_segment", load_segment)
+    monkeypatch.setattr(history, "_read_rows", read_rows)
+
+    assert _as_lists(history.trajectory("003", start=BASE + 15)) == expected
+    assert expected["circuit_id"] == [303, 305, 307, 309]
+    # Each row in range is read twice: for the time column, then for the others.
+    assert len(read) == 2 * len(expected["time"])
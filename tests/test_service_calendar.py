@@ -0,0 +1,128 @@
+from datetime import date, timedelta
+
+import pytest
+
+from wmata2.service_calendar import Departure, ServiceCalendar
+
+WEEKDAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday")
+
+CALENDAR = [
+    # service_id, monday..sunday, start_date, end_date
+    ("WKD", 1, 1, 1, 1, 1, 0, 0, 20240101, 20240131),
+    ("SAT", 0, 0, 0, 0, 0, 1, 0, 20240106, 20240127),
+    ("SUN", 0, 0, 0, 0, 0, 0, 1, 20240101, 20240131),
+]
+CALENDAR_DATES = [
+    ("WKD", 20240115, 2),  # Monday holiday runs the Sunday service.
+    ("SUN", 20240115, 1),
+    ("EXTRA", 20240120, 1),  # Only defined in calendar_dates.
+    ("SAT", 20240101, 2),  # Removing a day the service does not run is a no-op.
+]
+TRIPS = [
+    ("R1", "WKD", "wkd-am"),
+    ("R1", "WKD", "wkd-late"),
+    ("R1", "SUN", "sun-1"),
+    ("R2", "SAT", "sat-1"),
+    ("R2", "EXTRA", "extra-1"),
+]
+STOP_TIMES = [
+    ("wkd-am", "08:00:00", "S1", 1),
+    ("wkd-am", "08:10:00", "S2", 2),
+    ("wkd-late", "23:50:00", "S1", 1),
+    ("wkd-late", "24:20:00", "S2", 2),
+    ("sun-1", "09:00:00", "S1", 1),
+    ("sat-1", "10:00:00", "S1", 1),
+    ("extra-1", "11:00:00", "S1", 1),
+]
+
+
+def _csv(header: str, rows) -> str:
+    return header + "\n" + "".join(",".join(map(str, row)) + "\n" for row in rows)
+
+
+@pytest.fixture(scope="module")
+def compiled(compile_feed):
+    return compile_feed(
+        {
+            "calendar": _csv(
+                "service_id," + ",".join(WEEKDAYS) + ",sunday,start_date,end_date",
+                CALENDAR,
+            ),
+            "calendar_dates": _csv("service_id,date,exception_type", CALENDAR_DATES),
+            "trips": _csv("route_id,service_id,trip_id", TRIPS),
+            "stop_times": _csv(
+                "trip_id,arrival_time,departure_time,stop_id,stop_sequence",
+                [(trip, t, t, stop, seq) for trip, t, stop, seq in STOP_TIMES],
+            ),
+        }
+    )
+
+
+def _expected_services(day: date):
+    """Evaluates the GTFS calendar rules for one day directly."""
+    ymd = int(day.strftime("%Y%m%d"))
+    active = {
+        row[0]
+        for row in CALENDAR
+        if row[8] <= ymd <= row[9] and row[1 + day.weekday()] == 1
+    }
+    for service_id, exception_date, exception_type in CALENDAR_DATES:
+        if exception_date == ymd:
+            if exception_type == 1:
+                active.add(service_id)
+            else:
+                active.discard(service_id)
+    return active
+
+
+def test_every_day_matches_the_calendar_rules(compiled):
+    calendar = ServiceCalendar("bus", compiled)
+    assert (calendar.first_day, calendar.last_day) == (
+        date(2024, 1, 1),
+        date(2024, 1, 31),
+    )
+
+    day = date(2023, 12, 30)
+    while day <= date(2024, 2, 2):
+        expected = _expected_services(day)
+        assert set(calendar.active_services(day)) == expected, day
+        for service_id in ("WKD", "SAT", "SUN", "EXTRA", "MISSING"):
+            assert calendar.is_active(service_id, day) == (service_id in expected)
+        day += timedelta(days=1)
+
+
+def test_active_trips(compiled):
+    calendar = ServiceCalendar("bus", compiled)
+
+    assert calendar.active_trip_ids(date(2024, 1, 16)) == ["wkd-am", "wkd-late"]
+    assert calendar.active_trip_ids(date(2024, 1, 15)) == ["sun-1"]
+    assert calendar.active_trip_ids(date(2024, 1, 20)) == ["sat-1", "extra-1"]
+    assert calendar.active_trip_ids(date(2024, 3, 1)) == []
+
+
+def test_departures_include_the_previous_service_days_late_trips(compiled):
+    calendar = ServiceCalendar("bus", compiled)
+
+    # Tuesday: its own trips, plus Monday the 15th's (none, a holiday).
+    assert calendar.departures("S2", date(2024, 1, 16)) == [
+        Departure(8 * 3600 + 600, "wkd-am", "R1", 2),
+        Departure(24 * 3600 + 1200, "wkd-late", "R1", 2),
+    ]
+    # Wednesday also gets Tuesday's 24:20 arrival, shifted to 00:20.
+    assert calendar.departures("S2", date(2024, 1, 17), before_s=12 * 3600) == [
+        Departure(1200, "wkd-late", "R1", 2),
+        Departure(8 * 3600 + 600, "wkd-am", "R1", 2),
+    ]
+    assert calendar.departures("S1", date(2024, 1, 20), after_s=10 * 3600) == [
+        Departure(10 * 3600, "sat-1", "R2", 1),
+        Departure(11 * 3600, "extra-1", "R2", 1),
+    ]
+    assert calendar.departures("missing", date(2024, 1, 20)) == []
+
+
+def test_day_caches_are_bounded(compiled):
+    calendar = ServiceCalendar("bus", compiled, max_cached_days=2)
+    for offset in range(5):
+        calendar.active_trip_rows(date(2024, 1, 1) + timedelta(days=offset))
+
+    assert list(calendar._trips_by_day) == [date(2024, 1, 4), date(2024, 1, 5)]
@@ -0,0 +1,116 @@
+import math, random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from wmata2.shape_geometry import ShapeGeometry
+
+# An L-shaped line and a zigzag with a repeated point (a zero-length segment).
+SHAPES = {
+    "L": [(38.90, -77.05), (38.90, -77.03), (38.92, -77.03)],
+    "Z": [(38.89, -77.06), (38.895, -77.05), (38.895, -77.05), (38.89, -77.04)],
+}
+STOPS = [("S1", 38.90, -77.05), ("S2", 38.90, -77.03), ("S3", 38.92, -77.03)]
+
+
+@pytest.fixture(scope="module")
+def geometry(compile_feed):
+    tables = {
+        "shapes": ["shape_id,shape_pt_lat,shape_pt_lon,shape_pt_sequence"]
+        + [
+            f"{shape_id},{lat},{lon},{i}"
+            for shape_id, points in SHAPES.items()
+            for i, (lat, lon) in enumerate(points)
+        ],
+        "trips": ["route_id,service_id,trip_id,shape_id", "R,WKD,T1,L", "R,WKD,T2,Z"],
+        "stops": ["stop_id,stop_lat,stop_lon"] + [",".join(map(str, s)) for s in STOPS],
+        "stop_times": ["trip_id,stop_id,stop_sequence"]
+        + [f"T1,{stop_id},{i}" for i, (stop_id, _, _) in enumerate(STOPS)],
+    }
+    output = compile_feed(
+        {name: "\n".join(lines) + "\n" for name, lines in tables.items()}
+    )
+    return ShapeGeometry("bus", output, bucket_m=100.0)
+
+
+def _brute_force(geometry, lat, lon, shape_id):
+    """Distance along and off the shape of the closest point, segment by segment."""
+    points = np.asarray(SHAPES[shape_id])
+    xs, ys = geometry._to_xy(points[:, 0], points[:, 1])
+    px, py = geometry._to_xy(np.float64(lat), np.float64(lon))
+    best, along = None, 0.0
+    for i in range(len(points) - 1):
+        dx, dy = xs[i + 1] - xs[i], ys[i + 1] - ys[i]
+        length = math.hypot(dx, dy)
+        t = 0.0 if length == 0 else ((px - xs[i]) * dx + (py - ys[i]) * dy) / length**2
+        t = min(max(t, 0.0), 1.0)
+        off = math.hypot(px - xs[i] - t * dx, py - ys[i] - t * dy)
+        if best is None or off < best[1] - 1e-9:
+            best = (along + t * length, off)
+        along += length
+    return best
+
+
+def test_projection_matches_brute_force(geometry):
+    rng = random.Random(7)
+    lat, lon, shapes, expected = [], [], [], []
+    for _ in range(300):
+        shape_id = rng.choice(sorted(SHAPES))
+        # Mostly near the shape, some far enough to miss the bucket index.
+        spread = 0.001 if rng.random() < 0.8 else 0.02
+        a, b = rng.choice(list(zip(SHAPES[shape_id], SHAPES[shape_id][1:])))
+        t = rng.random()
+        lat.append(a[0] + t * (b[0] - a[0]) + rng.uniform(-spread, spread))
+        lon.append(a[1] + t * (b[1] - a[1]) + rng.uniform(-spread, spread))
+        shapes.append(shape_id)
+        expected.append(_brute_force(geometry, lat[-1], lon[-1], shape_id))
+
+    projection = geometry.project(lat, lon, geometry.shape_index(shapes))
+    np.testing.assert_allclose(
+        projection.distance_m, [e[0] for e in expected], atol=1e-6
+    )
+    np.testing.assert_allclose(projection.offset_m, [e[1] for e in expected], atol=1e-6)
+
+
+def test_unknown_shapes_are_nan(geometry):
+    projection = geometry.project(
+        [38.9, 38.9], [-77.05, -77.05], geometry.shape_index(["missing", None])
+    )
+    assert np.isnan(projection.distance_m).all()
+    assert list(projection.segment) == [-1, -1]
+
+
+def test_snapshot_next_stop_and_eta(geometry):
+    def vehicle(vehicle_id, trip_id, lat, lon, **position):
+        position.update(latitude=lat, longitude=lon)
+        return {
+            "vehicle": {
+                "vehicle": {"id": vehicle_id},
+                "trip": {"tripId": trip_id},
+                "position": position,
+            }
+        }
+
+    feed = {
+        "entity": [
+            vehicle("A", "T1", 38.90, -77.04, speed=10.0),
+            vehicle("B", "T1", 38.91, -77.03),
+            vehicle("C", "T1", 38.9205, -77.03),
+            vehicle("D", "T9", 38.90, -77.04),
+            {"vehicle": {"vehicle": {"id": "E"}}},
+        ]
+    }
+    snapshot = geometry.project_snapshot(feed, default_speed_mps=5.0)
+
+    assert snapshot.vehicle_ids == ["A", "B", "C", "D"]
+    assert snapshot.shape_ids == ["L", "L", "L", None]
+    assert snapshot.next_stop_ids == ["S2", "S3", None, None]
+    stop_2 = _brute_force(geometry, 38.90, -77.03, "L")[0]
+    np.testing.assert_allclose(
+        snapshot.to_next_stop_m[0], stop_2 - snapshot.distance_m[0], atol=1e-6
+    )
+    assert snapshot.eta_s[0] == pytest.approx(snapshot.to_next_stop_m[0] / 10.0)
+    assert snapshot.eta_s[1] == pytest.approx(snapshot.to_next_stop_m[1] / 5.0)
+    assert np.isnan(snapshot.eta_s[2:]).all()
+    assert geometry.project_snapshot(None).vehicle_ids == []
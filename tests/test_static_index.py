@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from wmata2.static_index import StaticIndex, get_static_index
+
+TABLES = {
+    "routes": "route_id,route_short_name,route_long_name\nR1,1,One\nR2,2,Two\n",
+    "trips": (
+        "route_id,service_id,trip_id,trip_headsign,direction_id,shape_id\n"
+        "R1,WKD,T1,North,0,SH1\n"
+        "R2,WKD,T2,South,,SH2\n"
+    ),
+    "stops": "stop_id,stop_name,stop_lat,stop_lon\nS1,First,38.5,-77.25\n",
+}
+
+
+@pytest.fixture(scope="module")
+def index(compile_feed):
+    return StaticIndex("bus", compile_feed(TABLES))
+
+
+def test_trip_and_stop_lookups(index):
+    assert index.trip("T1") == {
+        "route_id": "R1",
+        "direction_id": 0,
+        "route_short_name": "1",
+        "route_long_name": "One",
+        "trip_headsign": "North",
+        "shape_id": "SH1",
+    }
+    assert index.stop("S1") == {
+        "stop_name": "First",
+        "stop_lat": 38.5,
+        "stop_lon": -77.25,
+    }
+    assert index.trip("missing") is None and index.stop("missing") is None
+
+
+def test_enrich_attaches_attributes_in_place(index):
+    feed = {
+        "entity": [
+            {
+                "tripUpdate": {
+                    "trip": {"tripId": "T1", "routeId": "realtime"},
+                    "stopTimeUpdate": [{"stopId": "S1"}, {"stopId": "S9"}, {}],
+                }
+            },
+            {"vehicle": {"trip": {"tripId": "T2"}, "stopId": "S1"}},
+            {"vehicle": {"trip": {"tripId": "T9", "routeId": "R2"}}},
+            {"vehicle": {"trip": {"tripId": "T9", "routeId": "R9"}}},
+            {"alert": {}},
+        ]
+    }
+
+    assert index.enrich(feed) is feed
+    first, second, unknown, unknown_route, _ = feed["entity"]
+    assert first["tripUpdate"]["trip"] == {
+        "tripId": "T1",
+        "routeId": "realtime",
+        "directionId": 0,
+        "routeShortName": "1",
+        "routeLongName": "One",
+        "tripHeadsign": "North",
+        "shapeId": "SH1",
+    }
+    assert first["tripUpdate"]["stopTimeUpdate"] == [
+        {"stopId": "S1", "stopName": "First", "stopLat": 38.5, "stopLon": -77.25},
+        {"stopId": "S9"},
+        {},
+    ]
+    assert second["vehicle"]["trip"]["routeId"] == "R2"
+    assert "directionId" not in second["vehicle"]["trip"]
+    assert second["vehicle"]["stopName"] == "First"
+    assert unknown["vehicle"]["trip"] == {
+        "tripId": "T9",
+        "routeId": "R2",
+        "routeShortName": "2",
+        "routeLongName": "Two",
+    }
+    assert unknown_route["vehicle"]["trip"] == {"tripId": "T9", "routeId": "R9"}
+    assert index.enrich(None) is None
+
+
+def test_shared_index_is_rebuilt_when_the_tables_change(compile_feed, tmp_path):
+    output = compile_feed(TABLES, str(tmp_path))
+    index = get_static_index("bus", output)
+    assert get_static_index("bus", output) is index
+
+    time.sleep(0.01)
+    tables = dict(TABLES, stops="stop_id,stop_name,stop_lat,stop_lon\nS2,Two,1,2\n")
+    compile_feed(tables, str(tmp_path))
+    rebuilt = get_static_index("bus", output)
+    assert rebuilt is not index
+    assert rebuilt.stop("S2")["stop_name"] == "Two"
@@ -1,11 +1,65 @@
-import http.client, urllib.request, urllib.parse, urllib.error, os, shutil
-from zipfile import ZipFile
+import importlib, os
+from typing import TYPE_CHECKING, Optional
 from logging import getLogger
 
+if TYPE_CHECKING:
+    from .key_pool import APIKey
+
 logger = getLogger(__name__)
 
+# Submodules and names resolved on first attribute access (e.g. wmata2.WMATA), so that
+# "import wmata2" does not pay for dependencies the caller never uses.
+_LAZY_SUBMODULES = (
+    "alerts",
+    "arrival_board",
+    "bus",
+    "disk_cache",
+    "gtfs_static",
+    "key_pool",
+    "metrics",
+    "policies",
+    "rail",
+    "service_calendar",
+    "shape_geometry",
+    "static_index",
+    "utilities",
+    "wmata",
+)
+_LAZY_NAMES = {
+    "WMATA": "wmata",
+    "get_station_code": "utilities",
+    "get_station_name": "utilities",
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name in _LAZY_NAMES:
+        module = importlib.import_module(f".{_LAZY_NAMES[name]}", __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Deadline for downloading one static GTFS zip, which is several megabytes.
+STATIC_DOWNLOAD_TIMEOUT_S = 300.0
+
+
+def rebuild_static_data(api_key: "APIKey", workers: Optional[int] = None) -> None:
+    """
+    Downloads and extracts the rail and bus static GTFS feeds, then compiles each
+    into indexed tables (see wmata2.gtfs_static).
+
+    Args:
+        api_key (str | APIKeyPool): WMATA API key, or a pool of keys.
+        workers (int, optional): Worker processes used to compile the feeds.
+            Defaults to the number of CPUs.
+    """
+    import shutil
+    from zipfile import ZipFile
+    from .gtfs_static import compile_static_feed, compiled_feed_dir
+    from .utilities import download
 
-def rebuild_static_data(api_key: str) -> None:
     module_path = os.path.dirname(__file__)
     data_path = os.path.join(module_path, "data")
 
@@ -18,55 +72,31 @@ def rebuild_static_data(api_key: str) -> None:
         ) as f:
             f.close()
 
-    RAIL_OUTPUT_DIR = os.path.join(data_path, "rail_gtfs_static")
-    BUS_OUTPUT_DIR = os.path.join(data_path, "bus_gtfs_static")
-    RAIL_OUTPUT_PATH = RAIL_OUTPUT_DIR + ".zip"
-    BUS_OUTPUT_PATH = BUS_OUTPUT_DIR + ".zip"
-
-    headers = {
-        "api_key": api_key,
-    }
-
-    params = urllib.parse.urlencode({})
-
-    try:
-        logger.info("Downloading rail static data...")
-        conn = http.client.HTTPSConnection("api.wmata.com")
-        conn.request("GET", "/gtfs/rail-gtfs-static.zip?%s" % params, "{body}", headers)
-        response = conn.getresponse()
-        data = response.read()
-
-        with open(RAIL_OUTPUT_PATH, "wb") as f:
-            f.write(data)
-        conn.close()
-
-        logger.debug("Extracting rail data...")
-        with ZipFile(RAIL_OUTPUT_PATH, "r") as zObject:
-            # Extracting all the members of the zip
-            # into a specific location.
-            zObject.extractall(path=RAIL_OUTPUT_DIR)
-
-        logger.debug("Rail static data complete.")
-    except Exception as e:
-        logger.warning(f"Error getting rail static data: {e}")
-
-    try:
-        logger.info("Downloading bus static data...")
-        conn = http.client.HTTPSConnection("api.wmata.com")
-        conn.request("GET", "/gtfs/bus-gtfs-static.zip?%s" % params, "{body}", headers)
-        response = conn.getresponse()
-        data = response.read()
-
-        with open(BUS_OUTPUT_PATH, "wb") as f:
-            f.write(data)
-        conn.close()
-
-        logger.debug("Extracting bus data...")
-        with ZipFile(BUS_OUTPUT_PATH, "r") as zObject:
-            # Extracting all the members of the zip
-            # into a specific location.
-            zObject.extractall(path=BUS_OUTPUT_DIR)
-
-        logger.debug("Bus static data complete.")
-    except Exception as e:
-        logger.warning(f"Error getting rail static data: {e}")
+    for feed in ("rail", "bus"):
+        OUTPUT_DIR = os.path.join(data_path, f"{feed}_gtfs_static")
+        OUTPUT_PATH = OUTPUT_DIR + ".zip"
+
+        try:
+            logger.info(f"Downloading {feed} static data...")
+            data = download(
+                api_key,
+                f"/gtfs/{feed}-gtfs-static.zip?",
+                f"Download {feed} static data",
+                timeout_s=STATIC_DOWNLOAD_TIMEOUT_S,
+            )
+
+            with open(OUTPUT_PATH, "wb") as f:
+                f.write(data)
+
+            logger.debug(f"Extracting {feed} data...")
+            with ZipFile(OUTPUT_PATH, "r") as zObject:
+                # Extracting all the members of the zip
+                # into a specific location.
+                zObject.extractall(path=OUTPUT_DIR)
+
+            logger.debug(f"Compiling {feed} data...")
+            compile_static_feed(OUTPUT_DIR, compiled_feed_dir(feed), workers)
+
+            logger.debug(f"{feed.capitalize()} static data complete.")
+        except Exception as e:
+            logger.warning(f"Error getting {feed} static data: {e}")
@@ -0,0 +1,210 @@
+"""
+A system-wide arrival board built from a single GTFS-RT TripUpdates feed.
+
+Instead of requesting predictions station by station, ArrivalBoard makes one pass over
+every stop_time_update in a TripUpdates feed (as returned by
+get_rail_rt_trip_updates, or any feed in the same MessageToDict form) and keeps, for
+each stop id, a time-sorted array of arrivals. Next-N lookups for a stop are then a
+binary search; for a rail station the sorted arrays of its platforms are heap-merged.
+Call refresh() with each newly polled feed to rebuild the board.
+
+Classes:
+- Arrival: One predicted arrival (time, trip_id, route_id, stop_id, delay).
+- ArrivalBoard: The stop_id -> sorted arrivals index.
+
+Functions:
+- get_rail_arrival_board(API_KEY: str) -> ArrivalBoard:
+  Fetches the rail TripUpdates feed and builds a board from it.
+
+Example:
+    from wmata2.arrival_board import get_rail_arrival_board
+    board = get_rail_arrival_board(API_KEY)
+    for arrival in board.next_station_arrivals("A01", n=5):
+        print(arrival.route_id, arrival.time)
+"""
+
+import heapq, time
+from array import array
+from bisect import bisect_left
+from itertools import islice
+from operator import attrgetter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+_by_time = attrgetter("time")
+
+
+class Arrival(NamedTuple):
+    """A predicted arrival of a trip at a stop. time is in POSIX seconds."""
+
+    time: int
+    trip_id: str
+    route_id: str
+    stop_id: str
+    delay: Optional[int] = None
+
+
+class ArrivalBoard:
+    """
+    Next arrivals at every stop of a TripUpdates feed.
+
+    Args:
+        feed (dict, optional): A TripUpdates feed in MessageToDict form to build the
+            board from. Defaults to an empty board.
+    """
+
+    def __init__(self, feed: Optional[dict] = None) -> None:
+        self.timestamp: Optional[int] = None
+        # (arrivals by stop, arrival times by stop), replaced as a whole on refresh.
+        self._board: Tuple[Dict[str, List[Arrival]], Dict[str, array]] = ({}, {})
+        if feed is not None:
+            self.refresh(feed)
+
+    def __len__(self) -> int:
+        """Returns the number of stops with at least one arrival."""
+        return len(self._board[0])
+
+    def __contains__(self, stop_id: str) -> bool:
+        return stop_id in self._board[0]
+
+    @property
+    def stop_ids(self) -> Iterable[str]:
+        """The stop ids with at least one arrival."""
+        return self._board[0].keys()
+
+    def refresh(self, feed: dict) -> None:
+        """
+        Rebuilds the board from a newly polled TripUpdates feed.
+
+        Args:
+            feed (dict): A TripUpdates feed in MessageToDict form. Stop time updates
+                without an arrival or departure time are skipped.
+        """
+        by_stop: Dict[str, List[Arrival]] = {}
+        for entity in feed.get("entity", ()):
+            trip_update = entity.get("tripUpdate")
+            if not trip_update:
+                continue
+            trip = trip_update.get("trip", {})
+            trip_id = trip.get("tripId", "")
+            route_id = trip.get("routeId", "")
+            for update in trip_update.get("stopTimeUpdate", ()):
+                # The arrival time, else the departure time: either event may be
+                # present with only a delay.
+                event = update.get("arrival")
+                if not event or "time" not in event:
+                    event = update.get("departure")
+                    if not event or "time" not in event:
+                        continue
+                stop_id = update.get("stopId", "")
+                arrival = Arrival(
+                    int(event["time"]), trip_id, route_id, stop_id, event.get("delay")
+                )
+                stop_arrivals = by_stop.get(stop_id)
+                if stop_arrivals is None:
+                    by_stop[stop_id] = [arrival]
+                else:
+                    stop_arrivals.append(arrival)
+
+        times = {}
+        for stop_id, stop_arrivals in by_stop.items():
+            stop_arrivals.sort(key=_by_time)
+            times[stop_id] = array("q", [a.time for a in stop_arrivals])
+
+        header_time = feed.get("header", {}).get("timestamp")
+        # Swap in the new index with a single store so concurrent readers never see
+        # arrivals and times from different feeds.
+        self._board = (by_stop, times)
+        self.timestamp = int(header_time) if header_time is not None else None
+        logger.debug(f"Arrival board refreshed: {len(by_stop)} stops")
+
+    def _upcoming(
+        self,
+        stop_id: str,
+        now: float,
+        board: Optional[Tuple[Dict[str, List[Arrival]], Dict[str, array]]] = None,
+    ) -> Tuple[List[Arrival], int]:
+        by_stop, times = self._board if board is None else board
+        stop_times = times.get(stop_id)
+        if stop_times is None:
+            return [], 0
+        return by_stop[stop_id], bisect_left(stop_times, now)
+
+    def next_arrivals(
+        self, stop_id: str, n: int = 5, now: Optional[float] = None
+    ) -> List[Arrival]:
+        """
+        Returns the next arrivals at a stop.
+
+        Args:
+            stop_id (str): A GTFS stop id, e.g. a rail platform or a bus stop.
+            n (int, optional): Maximum number of arrivals. Defaults to 5.
+            now (float, optional): POSIX time to look forward from. Defaults to the
+                current time.
+
+        Returns:
+            List[Arrival]: Up to n arrivals at or after now, soonest first.
+        """
+        arrivals, start = self._upcoming(stop_id, time.time() if now is None else now)
+        return arrivals[start : start + n]
+
+    def next_arrivals_at(
+        self, stop_ids: Iterable[str], n: int = 5, now: Optional[float] = None
+    ) -> List[Arrival]:
+        """
+        Returns the next arrivals across several stops, merged in time order.
+
+        Args:
+            stop_ids (Iterable[str]): GTFS stop ids, e.g. all platforms of a station.
+            n (int, optional): Maximum number of arrivals. Defaults to 5.
+            now (float, optional): POSIX time to look forward from. Defaults to the
+                current time.
+
+        Returns:
+            List[Arrival]: Up to n arrivals at or after now, soonest first.
+        """
+        now = time.time() if now is None else now
+        board = self._board  # One board for all stops, even across a refresh.
+        runs = []
+        for stop_id in stop_ids:
+            arrivals, start = self._upcoming(stop_id, now, board)
+            if start < len(arrivals):
+                runs.append(islice(arrivals, start, start + n))
+        return list(islice(heapq.merge(*runs, key=_by_time), n))
+
+    def next_station_arrivals(
+        self, station_code: str, n: int = 5, now: Optional[float] = None
+    ) -> List[Arrival]:
+        """
+        Returns the next arrivals at any platform of a rail station.
+
+        Args:
+            station_code (str): The 3 character station code.
+            n (int, optional): Maximum number of arrivals. Defaults to 5.
+            now (float, optional): POSIX time to look forward from. Defaults to the
+                current time.
+
+        Returns:
+            List[Arrival]: Up to n arrivals at or after now, soonest first.
+        """
+        from .utilities import get_station_stop_ids
+
+        return self.next_arrivals_at(get_station_stop_ids(station_code), n, now)
+
+
+def get_rail_arrival_board(API_KEY: str) -> ArrivalBoard:
+    """
+    Fetches the rail TripUpdates feed and builds an arrival board from it.
+
+    Args:
+        API_KEY (str): The API key to use for authentication.
+
+    Returns:
+        ArrivalBoard: The board. Empty if the feed could not be retrieved.
+    """
+    from .rail.gtfs_rt import get_rail_rt_trip_updates
+
+    return ArrivalBoard(get_rail_rt_trip_updates(API_KEY) or {})
@@ -0,0 +1,542 @@
+"""
+Array-backed GTFS-RT vehicle positions and trip updates for the bus network.
+
+The bus feeds carry thousands of vehicles and tens of thousands of stop time updates,
+and the pure-Python protobuf runtime followed by MessageToDict takes longer than the
+polling interval to turn one into dicts. The classes here instead read the protobuf
+wire format directly, decoding only the fields they keep, into parallel columns
+(array.array for numbers, lists for ids) plus the indexes the bus use cases need:
+
+- VehiclePositions: one row per vehicle; indexed by route, stop, trip and vehicle id.
+- TripUpdates: one row per trip and one per stop time update; trips indexed by route
+  and trip id, and stop time updates by stop, sorted by time, so that the next
+  arrivals at a stop are a binary search.
+
+Absent fields are NaN in float columns, 0 in time columns (GTFS-RT times are POSIX
+seconds), -1 in enum and sequence columns, MISSING_DELAY in delay columns and None in
+id columns.
+
+Classes:
+- VehiclePosition: One row of VehiclePositions.
+- VehiclePositions: The columns and indexes of a VehiclePositions feed.
+- TripUpdates: The columns and indexes of a TripUpdates feed.
+
+Example:
+    from wmata2.bus.gtfs_rt import get_bus_rt_trip_updates
+    updates = get_bus_rt_trip_updates(API_KEY)
+    for arrival in updates.next_arrivals("1001234", n=3):
+        print(arrival.route_id, arrival.time)
+"""
+
+import struct, time
+from array import array
+from bisect import bisect_left
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ..arrival_board import Arrival
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+MISSING_DELAY = -(2**31)
+
+_NAN = float("nan")
+_float32 = struct.Struct("<f").unpack_from
+
+_VARINT, _FIXED64, _LENGTH, _FIXED32 = 0, 1, 2, 5
+
+
+def _varint(data: bytes, i: int) -> Tuple[int, int]:
+    """Decodes the varint at data[i], returning (value, next offset)."""
+    byte = data[i]
+    if byte < 0x80:
+        return byte, i + 1
+    value, shift = byte & 0x7F, 7
+    while True:
+        i += 1
+        byte = data[i]
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, i + 1
+        shift += 7
+
+
+def _signed(value: int) -> int:
+    """Two's complement of an int32/int64 varint (negative ones use 10 bytes)."""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _fields(data: bytes, i: int, end: int):
+    """
+    Yields (field number, wire type, value, i) for each field of the message in
+    data[i:end]. value is the integer of varint fields, and i the offset of the
+    payload for the others (length-delimited fields end at value).
+    """
+    while i < end:
+        key = data[i]
+        if key < 0x80:
+            i += 1
+        else:
+            key, i = _varint(data, i)
+        wire = key & 7
+        if wire == _VARINT:
+            value, i = _varint(data, i)
+            yield key >> 3, wire, value, i
+        elif wire == _LENGTH:
+            length, i = _varint(data, i)
+            yield key >> 3, wire, i + length, i
+            i += length
+        elif wire == _FIXED32:
+            yield key >> 3, wire, None, i
+            i += 4
+        elif wire == _FIXED64:
+            yield key >> 3, wire, None, i
+            i += 8
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire}")
+
+
+def _string(data: bytes, start: int, end: int) -> str:
+    return data[start:end].decode("utf-8")
+
+
+def _header_timestamp(data: bytes, start: int, end: int) -> Optional[int]:
+    for field, wire, value, _ in _fields(data, start, end):
+        if field == 3 and wire == _VARINT:  # FeedHeader.timestamp
+            return value
+    return None
+
+
+def _trip(data: bytes, start: int, end: int) -> Tuple[Optional[str], ...]:
+    """Returns (trip_id, route_id, start_date) of a TripDescriptor."""
+    trip_id = route_id = start_date = None
+    for field, wire, value, i in _fields(data, start, end):
+        if wire != _LENGTH:
+            continue
+        if field == 1:
+            trip_id = _string(data, i, value)
+        elif field == 5:
+            route_id = _string(data, i, value)
+        elif field == 3:
+            start_date = _string(data, i, value)
+    return trip_id, route_id, start_date
+
+
+def _vehicle_id(data: bytes, start: int, end: int) -> Optional[str]:
+    for field, wire, value, i in _fields(data, start, end):
+        if field == 1 and wire == _LENGTH:  # VehicleDescriptor.id
+            return _string(data, i, value)
+    return None
+
+
+def _skip(data: bytes, i: int, wire: int) -> int:
+    """Returns the offset after the payload of a field of the given wire type."""
+    if wire == _VARINT:
+        return _varint(data, i)[1]
+    if wire == _LENGTH:
+        length, i = _varint(data, i)
+        return i + length
+    if wire == _FIXED32:
+        return i + 4
+    if wire == _FIXED64:
+        return i + 8
+    raise ValueError(f"Unsupported protobuf wire type {wire}")
+
+
+def _event(data: bytes, i: int, end: int) -> Tuple[int, int]:
+    """Returns (time, delay) of a StopTimeEvent."""
+    # The innermost message of a TripUpdates feed, so decoded without _fields.
+    when, delay = 0, MISSING_DELAY
+    while i < end:
+        key, i = _varint(data, i)
+        if key == 0x10:  # time, varint
+            when, i = _varint(data, i)
+            when = _signed(when)
+        elif key == 0x08:  # delay, varint
+            delay, i = _varint(data, i)
+            delay = _signed(delay)
+        else:
+            i = _skip(data, i, key & 7)
+    return when, delay
+
+
+def _stop_time_update(data: bytes, i: int, end: int) -> tuple:
+    """
+    Returns (stop_id, stop_sequence, (arrival time, delay), (departure time, delay))
+    of a StopTimeUpdate.
+    """
+    stop_id = None
+    sequence = -1
+    arrival = departure = (0, MISSING_DELAY)
+    while i < end:
+        key, i = _varint(data, i)
+        if key & 7 == _LENGTH:
+            length, i = _varint(data, i)
+            field, i, start = key >> 3, i + length, i
+            if field == 4:
+                stop_id = _string(data, start, i)
+            elif field == 2:
+                arrival = _event(data, start, i)
+            elif field == 3:
+                departure = _event(data, start, i)
+        elif key == 0x08:  # stop_sequence, varint
+            sequence, i = _varint(data, i)
+        else:
+            i = _skip(data, i, key & 7)
+    return stop_id, sequence, arrival, departure
+
+
+def _feed_entities(data: bytes, kind: int):
+    """
+    Returns the header timestamp of a FeedMessage and the (start, end) offsets of the
+    kind field (3 trip_update, 4 vehicle) of each of its entities.
+    """
+    timestamp = None
+    entities = []
+    for field, wire, value, i in _fields(data, 0, len(data)):
+        if wire != _LENGTH:
+            continue
+        if field == 1:
+            timestamp = _header_timestamp(data, i, value)
+        elif field == 2:
+            for entity_field, entity_wire, end, j in _fields(data, i, value):
+                if entity_field == kind and entity_wire == _LENGTH:
+                    entities.append((j, end))
+    return timestamp, entities
+
+
+def _index(keys: List[Optional[str]]) -> Dict[str, array]:
+    """Groups row numbers by key, skipping None."""
+    groups: Dict[str, List[int]] = {}
+    for row, key in enumerate(keys):
+        if key is None:
+            continue
+        rows = groups.get(key)
+        if rows is None:
+            groups[key] = [row]
+        else:
+            rows.append(row)
+    return {key: array("i", rows) for key, rows in groups.items()}
+
+
+class VehiclePosition(NamedTuple):
+    """One vehicle of a VehiclePositions feed."""
+
+    vehicle_id: Optional[str]
+    trip_id: Optional[str]
+    route_id: Optional[str]
+    stop_id: Optional[str]
+    latitude: float
+    longitude: float
+    bearing: float
+    speed: float
+    current_stop_sequence: int
+    current_status: int
+    timestamp: int
+
+
+class VehiclePositions:
+    """
+    The vehicles of a GTFS-RT VehiclePositions feed, one row each.
+
+    Attributes:
+        timestamp (int, optional): Feed header timestamp.
+        vehicle_ids, trip_ids, route_ids, stop_ids (List[Optional[str]]): Id columns.
+        latitude, longitude, bearing, speed (array('d')): Position columns.
+        current_stop_sequence, current_status (array('i')): -1 where absent.
+        timestamps (array('q')): Time of each position, 0 where absent.
+        by_route, by_stop (Dict[str, array]): Route/stop id -> rows.
+        by_trip, by_vehicle (Dict[str, int]): Trip/vehicle id -> row.
+    """
+
+    def __init__(self) -> None:
+        self.timestamp: Optional[int] = None
+        self.vehicle_ids: List[Optional[str]] = []
+        self.trip_ids: List[Optional[str]] = []
+        self.route_ids: List[Optional[str]] = []
+        self.stop_ids: List[Optional[str]] = []
+        self.latitude = array("d")
+        self.longitude = array("d")
+        self.bearing = array("d")
+        self.speed = array("d")
+        self.current_stop_sequence = array("i")
+        self.current_status = array("i")
+        self.timestamps = array("q")
+        self.by_route: Dict[str, array] = {}
+        self.by_stop: Dict[str, array] = {}
+        self.by_trip: Dict[str, int] = {}
+        self.by_vehicle: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.vehicle_ids)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "VehiclePositions":
+        """
+        Decodes a serialized VehiclePositions FeedMessage.
+
+        Raises:
+            ValueError, IndexError: If the data is not a valid FeedMessage.
+        """
+        start = time.perf_counter()
+        self = cls()
+        self.timestamp, entities = _feed_entities(data, 4)
+        for entity_start, entity_end in entities:
+            self._append(data, entity_start, entity_end)
+
+        self.by_route = _index(self.route_ids)
+        self.by_stop = _index(self.stop_ids)
+        self.by_trip = {t: row for row, t in enumerate(self.trip_ids) if t is not None}
+        self.by_vehicle = {
+            v: row for row, v in enumerate(self.vehicle_ids) if v is not None
+        }
+        logger.debug(
+            f"Decoded {len(self)} bus vehicle positions in "
+            f"{time.perf_counter() - start:.3f}s"
+        )
+        return self
+
+    def _append(self, data: bytes, start: int, end: int) -> None:
+        """Decodes one VehiclePosition message onto the columns."""
+        trip_id = route_id = stop_id = vehicle_id = None
+        latitude = longitude = bearing = speed = _NAN
+        sequence = status = -1
+        timestamp = 0
+        for field, wire, value, i in _fields(data, start, end):
+            if field == 2 and wire == _LENGTH:  # position
+                for position_field, position_wire, _, j in _fields(data, i, value):
+                    if position_wire != _FIXED32:
+                        continue
+                    if position_field == 1:
+                        latitude = _float32(data, j)[0]
+                    elif position_field == 2:
+                        longitude = _float32(data, j)[0]
+                    elif position_field == 3:
+                        bearing = _float32(data, j)[0]
+                    elif position_field == 5:
+                        speed = _float32(data, j)[0]
+            elif field == 1 and wire == _LENGTH:
+                trip_id, route_id, _ = _trip(data, i, value)
+            elif field == 8 and wire == _LENGTH:
+                vehicle_id = _vehicle_id(data, i, value)
+            elif field == 7 and wire == _LENGTH:
+                stop_id = _string(data, i, value)
+            elif field == 3 and wire == _VARINT:
+                sequence = value
+            elif field == 4 and wire == _VARINT:
+                status = value
+            elif field == 5 and wire == _VARINT:
+                timestamp = value
+        self.vehicle_ids.append(vehicle_id)
+        self.trip_ids.append(trip_id)
+        self.route_ids.append(route_id)
+        self.stop_ids.append(stop_id)
+        self.latitude.append(latitude)
+        self.longitude.append(longitude)
+        self.bearing.append(bearing)
+        self.speed.append(speed)
+        self.current_stop_sequence.append(sequence)
+        self.current_status.append(status)
+        self.timestamps.append(timestamp)
+
+    def row(self, i: int) -> VehiclePosition:
+        """Returns row i."""
+        return VehiclePosition(
+            self.vehicle_ids[i],
+            self.trip_ids[i],
+            self.route_ids[i],
+            self.stop_ids[i],
+            self.latitude[i],
+            self.longitude[i],
+            self.bearing[i],
+            self.speed[i],
+            self.current_stop_sequence[i],
+            self.current_status[i],
+            self.timestamps[i],
+        )
+
+    def for_route(self, route_id: str) -> List[VehiclePosition]:
+        """Returns the vehicles serving a route."""
+        return [self.row(i) for i in self.by_route.get(route_id, ())]
+
+    def at_stop(self, stop_id: str) -> List[VehiclePosition]:
+        """Returns the vehicles at or heading to a stop."""
+        return [self.row(i) for i in self.by_stop.get(stop_id, ())]
+
+    def vehicle(self, vehicle_id: str) -> Optional[VehiclePosition]:
+        """Returns a vehicle by id, or None."""
+        i = self.by_vehicle.get(vehicle_id)
+        return None if i is None else self.row(i)
+
+
+class TripUpdates:
+    """
+    The trips and stop time updates of a GTFS-RT TripUpdates feed.
+
+    Trip rows and stop time update rows are separate; the updates of trip row t are
+    rows first_update[t] to first_update[t + 1], in feed order.
+
+    Attributes:
+        timestamp (int, optional): Feed header timestamp.
+        trip_ids, route_ids, vehicle_ids, start_dates (List[Optional[str]]): Trip
+            columns.
+        trip_timestamps (array('q')): Trip update timestamps, 0 where absent.
+        trip_delays (array('i')): Trip-level delays, MISSING_DELAY where absent.
+        first_update (array('i')): Offsets of each trip's updates, plus the total.
+        stop_ids (List[Optional[str]]): Stop of each update.
+        stop_sequences (array('i')): -1 where absent.
+        arrival_times, departure_times (array('q')): 0 where absent.
+        arrival_delays, departure_delays (array('i')): MISSING_DELAY where absent.
+        update_trips (array('i')): Trip row of each update.
+        by_route (Dict[str, array]): Route id -> trip rows.
+        by_trip (Dict[str, int]): Trip id -> trip row.
+        by_stop (Dict[str, array]): Stop id -> update rows with a time, soonest first.
+    """
+
+    def __init__(self) -> None:
+        self.timestamp: Optional[int] = None
+        self.trip_ids: List[Optional[str]] = []
+        self.route_ids: List[Optional[str]] = []
+        self.vehicle_ids: List[Optional[str]] = []
+        self.start_dates: List[Optional[str]] = []
+        self.trip_timestamps = array("q")
+        self.trip_delays = array("i")
+        self.first_update = array("i", [0])
+        self.stop_ids: List[Optional[str]] = []
+        self.stop_sequences = array("i")
+        self.arrival_times = array("q")
+        self.arrival_delays = array("i")
+        self.departure_times = array("q")
+        self.departure_delays = array("i")
+        self.update_trips = array("i")
+        self.by_route: Dict[str, array] = {}
+        self.by_trip: Dict[str, int] = {}
+        self.by_stop: Dict[str, array] = {}
+        self._stop_times: Dict[str, array] = {}
+
+    def __len__(self) -> int:
+        """Returns the number of trips."""
+        return len(self.trip_ids)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TripUpdates":
+        """
+        Decodes a serialized TripUpdates FeedMessage.
+
+        Raises:
+            ValueError, IndexError: If the data is not a valid FeedMessage.
+        """
+        start = time.perf_counter()
+        self = cls()
+        self.timestamp, entities = _feed_entities(data, 3)
+        for entity_start, entity_end in entities:
+            self._append(data, entity_start, entity_end)
+        self._build_indexes()
+        logger.debug(
+            f"Decoded {len(self)} bus trip updates ({len(self.stop_ids)} stop time "
+            f"updates) in {time.perf_counter() - start:.3f}s"
+        )
+        return self
+
+    def _append(self, data: bytes, start: int, end: int) -> None:
+        """Decodes one TripUpdate message onto the columns."""
+        trip_id = route_id = start_date = vehicle_id = None
+        timestamp, delay = 0, MISSING_DELAY
+        row = len(self.trip_ids)
+        stop_ids = self.stop_ids
+        for field, wire, value, i in _fields(data, start, end):
+            if field == 2 and wire == _LENGTH:  # stop_time_update
+                stop_id, sequence, arrival, departure = _stop_time_update(
+                    data, i, value
+                )
+                stop_ids.append(stop_id)
+                self.stop_sequences.append(sequence)
+                self.arrival_times.append(arrival[0])
+                self.arrival_delays.append(arrival[1])
+                self.departure_times.append(departure[0])
+                self.departure_delays.append(departure[1])
+                self.update_trips.append(row)
+            elif field == 1 and wire == _LENGTH:
+                trip_id, route_id, start_date = _trip(data, i, value)
+            elif field == 3 and wire == _LENGTH:
+                vehicle_id = _vehicle_id(data, i, value)
+            elif field == 4 and wire == _VARINT:
+                timestamp = value
+            elif field == 5 and wire == _VARINT:
+                delay = _signed(value)
+        self.trip_ids.append(trip_id)
+        self.route_ids.append(route_id)
+        self.vehicle_ids.append(vehicle_id)
+        self.start_dates.append(start_date)
+        self.trip_timestamps.append(timestamp)
+        self.trip_delays.append(delay)
+        self.first_update.append(len(stop_ids))
+
+    def _build_indexes(self) -> None:
+        self.by_route = _index(self.route_ids)
+        self.by_trip = {t: row for row, t in enumerate(self.trip_ids) if t is not None}
+
+        # Arrival time, else departure time, of each update.
+        times = [a or d for a, d in zip(self.arrival_times, self.departure_times)]
+        groups: Dict[str, List[int]] = {}
+        for row, stop_id in enumerate(self.stop_ids):
+            if stop_id is None or not times[row]:
+                continue
+            rows = groups.get(stop_id)
+            if rows is None:
+                groups[stop_id] = [row]
+            else:
+                rows.append(row)
+        by_stop, stop_times = {}, {}
+        for stop_id, rows in groups.items():
+            rows.sort(key=times.__getitem__)
+            by_stop[stop_id] = array("i", rows)
+            stop_times[stop_id] = array("q", [times[row] for row in rows])
+        self.by_stop, self._stop_times = by_stop, stop_times
+
+    def updates_for_trip(self, trip_id: str) -> range:
+        """Returns the stop time update rows of a trip (empty if unknown)."""
+        row = self.by_trip.get(trip_id)
+        if row is None:
+            return range(0)
+        return range(self.first_update[row], self.first_update[row + 1])
+
+    def trips_for_route(self, route_id: str) -> List[str]:
+        """Returns the trip ids of a route."""
+        return [self.trip_ids[row] for row in self.by_route.get(route_id, ())]  # type: ignore
+
+    def _arrival(self, row: int) -> Arrival:
+        trip = self.update_trips[row]
+        when, delay = self.arrival_times[row], self.arrival_delays[row]
+        if not when:
+            when, delay = self.departure_times[row], self.departure_delays[row]
+        return Arrival(
+            when,
+            self.trip_ids[trip] or "",
+            self.route_ids[trip] or "",
+            self.stop_ids[row] or "",
+            None if delay == MISSING_DELAY else delay,
+        )
+
+    def next_arrivals(
+        self, stop_id: str, n: int = 5, now: Optional[float] = None
+    ) -> List[Arrival]:
+        """
+        Returns the next predicted arrivals at a stop.
+
+        Args:
+            stop_id (str): The GTFS stop id.
+            n (int, optional): Maximum number of arrivals. Defaults to 5.
+            now (float, optional): POSIX time to look forward from. Defaults to the
+                current time.
+
+        Returns:
+            List[Arrival]: Up to n arrivals at or after now, soonest first.
+        """
+        times = self._stop_times.get(stop_id)
+        if times is None:
+            return []
+        start = bisect_left(times, time.time() if now is None else now)
+        rows = self.by_stop[stop_id]
+        return [self._arrival(rows[i]) for i in range(start, min(start + n, len(rows)))]
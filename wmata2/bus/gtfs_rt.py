@@ -0,0 +1,82 @@
+"""
+This module provides functions to retrieve real-time vehicle position and trip update
+data for Metrobus from WMATA's API using a provided API key.
+
+Unlike the rail feeds, the responses are not converted with MessageToDict: at bus
+network scale they are decoded straight into the array-backed, route- and
+stop-indexed structures of wmata2.bus.feeds.
+
+Functions:
+
+get_bus_rt_vehicle_positions(API_KEY: str) -> VehiclePositions: Retrieves real-time
+    vehicle position data for Metrobus.
+get_bus_rt_trip_updates(API_KEY: str) -> TripUpdates: Retrieves real-time trip update
+    data for Metrobus.
+
+Example:
+from wmata2.bus.gtfs_rt import get_bus_rt_vehicle_positions
+positions = get_bus_rt_vehicle_positions(API_KEY)
+buses_on_route = positions.for_route("70")
+
+Raises:
+Warning: If the functions fail to retrieve the real-time data from the API, or if there
+    is an error decoding it.
+"""
+
+from typing import Optional
+
+from ..key_pool import APIKey
+from ..utilities import get_gtfs_rt_data
+from .feeds import TripUpdates, VehiclePositions
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+def get_bus_rt_vehicle_positions(API_KEY: APIKey) -> Optional[VehiclePositions]:
+    """
+    Retrieves real-time vehicle position data for Metrobus from WMATA's API using a
+    GET request with the provided API key.
+
+    Args:
+        API_KEY (str | APIKeyPool): The API key to use for authentication.
+
+    Returns:
+        VehiclePositions: The vehicles, indexed by route, stop, trip and vehicle id.
+            None if the request fails.
+
+    Raises:
+        Warning: If the function fails to retrieve the vehicle position data from the
+            API, or if there is an error decoding it.
+    """
+    return get_gtfs_rt_data(
+        API_KEY=API_KEY,
+        URL="/gtfs/bus-gtfsrt-vehiclepositions.pb?",
+        function_desc="Get Bus RT Vehicle Positions",
+        decode=VehiclePositions.from_bytes,
+    )
+
+
+def get_bus_rt_trip_updates(API_KEY: APIKey) -> Optional[TripUpdates]:
+    """
+    Retrieves real-time trip update data for Metrobus from WMATA's API using a GET
+    request with the provided API key.
+
+    Args:
+        API_KEY (str | APIKeyPool): The API key to use for authentication.
+
+    Returns:
+        TripUpdates: The trips and stop time updates, indexed by route, trip and stop.
+            None if the request fails.
+
+    Raises:
+        Warning: If the function fails to retrieve the trip update data from the API,
+            or if there is an error decoding it.
+    """
+    return get_gtfs_rt_data(
+        API_KEY=API_KEY,
+        URL="/gtfs/bus-gtfsrt-tripupdates.pb?",
+        function_desc="Get Bus RT Trip Updates",
+        decode=TripUpdates.from_bytes,
+    )
@@ -0,0 +1,264 @@
+"""
+A persistent response cache shared by every process on a machine.
+
+Endpoints whose policy sets disk_cache_ttl_s (see wmata2.policies) have their raw
+response bodies stored in one SQLite database, keyed by URL (endpoint path and query
+parameters), with the time each was fetched and when it expires. SQLite runs in WAL
+mode, so any number of web workers and cron jobs can read concurrently while one of
+them writes. Its file locking serializes the writers. A process that starts after the
+cache is warm answers these endpoints from disk in well under a millisecond, without
+calling the API.
+
+policies.enable_disk_cache() turns caching on for the slow-changing rail endpoints,
+and warm_up() prefetches all of them concurrently. The same is available from the
+command line:
+
+    python -m wmata2.disk_cache --api-key-file parts/wmata_api_key
+
+The cache lives at CACHE_FILE, which defaults to the WMATA2_CACHE_FILE environment
+variable or wmata2/responses.sqlite3 under the user cache directory. Setting it to
+None disables the cache. Any error opening or using the database is logged and the
+request simply goes to the API.
+
+Functions:
+- get(URL: str) -> Optional[bytes]: The cached body if it has not expired.
+- get_stale(URL: str, max_stale_s: float) -> Optional[bytes]: The cached body if it
+  expired no more than max_stale_s ago.
+- put(URL: str, body: bytes, ttl_s: float): Store a body.
+- invalidate(URL: Optional[str] = None): Drop one entry, or all of them.
+- purge_expired(): Drop expired entries.
+- warm_up(API_KEY: str, force: bool = False, workers: int = 8) -> dict: Prefetch the
+  slow-changing endpoints.
+"""
+
+import os, sqlite3, threading, time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+def _default_cache_file() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "wmata2", "responses.sqlite3")
+
+
+CACHE_FILE: Optional[str] = os.environ.get("WMATA2_CACHE_FILE") or _default_cache_file()
+
+# How long a connection waits on another process's write lock before giving up.
+BUSY_TIMEOUT_S = 5.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    url TEXT PRIMARY KEY,
+    fetched_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    body BLOB NOT NULL
+)
+"""
+
+# One connection per thread and process; connections must not cross a fork.
+_local = threading.local()
+
+
+def _connect() -> Optional[sqlite3.Connection]:
+    """Returns this thread's connection to CACHE_FILE, opening it if needed."""
+    if CACHE_FILE is None:
+        return None
+    key = (CACHE_FILE, os.getpid())
+    conn = getattr(_local, "conn", None)
+    if conn is not None and _local.key == key:
+        return conn
+
+    directory = os.path.dirname(CACHE_FILE)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(CACHE_FILE, timeout=BUSY_TIMEOUT_S, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(_SCHEMA)
+    _local.conn, _local.key = conn, key
+    return conn
+
+
+def _execute(sql: str, params: Tuple = ()) -> List[tuple]:
+    """Runs one statement, logging and swallowing database errors."""
+    try:
+        conn = _connect()
+        if conn is None:
+            return []
+        return conn.execute(sql, params).fetchall()
+    except (sqlite3.Error, OSError) as e:
+        logger.warning(f"Failed to use disk cache {CACHE_FILE}|| Error: {e}")
+        return []
+
+
+def get(URL: str, now: Optional[float] = None) -> Optional[bytes]:
+    """
+    Returns the cached response body for a URL if it has not expired.
+
+    Args:
+        URL (str): The request URL, path and query string.
+        now (float, optional): POSIX time to compare expiry against. Defaults to the
+            current time.
+
+    Returns:
+        bytes: The body, or None on a miss.
+    """
+    now = time.time() if now is None else now
+    rows = _execute(
+        "SELECT body FROM responses WHERE url = ? AND expires_at > ?", (URL, now)
+    )
+    return rows[0][0] if rows else None
+
+
+def get_stale(URL: str, max_stale_s: float) -> Optional[bytes]:
+    """
+    Returns the cached response body for a URL if it is fresh or expired no more
+    than max_stale_s seconds ago. Used to serve something when the API fails.
+    """
+    rows = _execute(
+        "SELECT body FROM responses WHERE url = ? AND expires_at > ?",
+        (URL, time.time() - max_stale_s),
+    )
+    return rows[0][0] if rows else None
+
+
+def put(URL: str, body: bytes, ttl_s: float) -> None:
+    """
+    Stores a response body for a URL, replacing any previous entry.
+
+    Args:
+        URL (str): The request URL, path and query string.
+        body (bytes): The (decompressed) response body.
+        ttl_s (float): Seconds the entry stays fresh.
+    """
+    now = time.time()
+    _execute(
+        "INSERT OR REPLACE INTO responses (url, fetched_at, expires_at, body)"
+        " VALUES (?, ?, ?, ?)",
+        (URL, now, now + ttl_s, sqlite3.Binary(body)),
+    )
+
+
+def invalidate(URL: Optional[str] = None) -> None:
+    """Drops the entry for a URL, or every entry when URL is None."""
+    if URL is None:
+        _execute("DELETE FROM responses")
+    else:
+        _execute("DELETE FROM responses WHERE url = ?", (URL,))
+
+
+def purge_expired(now: Optional[float] = None) -> None:
+    """Drops every expired entry."""
+    now = time.time() if now is None else now
+    _execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+
+
+def entries() -> List[Dict[str, Any]]:
+    """Returns url, fetched_at, expires_at and size for every entry."""
+    rows = _execute(
+        "SELECT url, fetched_at, expires_at, length(body) FROM responses ORDER BY url"
+    )
+    return [
+        {"url": url, "fetched_at": fetched, "expires_at": expires, "bytes": size}
+        for url, fetched, expires, size in rows
+    ]
+
+
+def _warm_up_calls() -> Dict[str, Callable[[str], Any]]:
+    """The slow-changing endpoints to prefetch, by name."""
+    from .rail import positions, station_info
+
+    return {
+        "lines": station_info.get_lines_data,
+        "stations": station_info.get_station_list,
+        "station_timing": station_info.get_station_timing,
+        "parking": station_info.get_parking_data,
+        "station_to_station": station_info.get_station2station_info,
+        "entrances": station_info.get_station_entrances,
+        "standard_routes": positions.get_standard_routes,
+        "track_circuits": positions.get_track_circuits,
+    }
+
+
+def warm_up(API_KEY: str, force: bool = False, workers: int = 8) -> Dict[str, bool]:
+    """
+    Prefetches every slow-changing endpoint concurrently, enabling the disk cache
+    for them first (policies.enable_disk_cache) if needed. Endpoints that already
+    have a fresh entry are answered from the cache without calling the API.
+
+    Args:
+        API_KEY (str): The API key to use for authentication.
+        force (bool, optional): Drop the existing entries and fetch everything anew.
+            Defaults to False.
+        workers (int, optional): Concurrent requests. Defaults to 8.
+
+    Returns:
+        dict: Endpoint name -> whether a response was obtained.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+    from . import policies
+
+    policies.enable_disk_cache()
+    if force:
+        invalidate()
+
+    calls = _warm_up_calls()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {name: executor.submit(func, API_KEY) for name, func in calls.items()}
+        results = {
+            name: future.result() is not None for name, future in futures.items()
+        }
+
+    logger.info(f"Disk cache warm-up: {sum(results.values())}/{len(results)} endpoints")
+    return results
+
+
+def _main(argv: Optional[List[str]] = None) -> int:
+    import argparse, json
+
+    # Under "python -m" this file runs as __main__, a second copy of the module.
+    # The request path reads CACHE_FILE from wmata2.disk_cache, so configure and
+    # run that one.
+    from . import disk_cache
+
+    parser = argparse.ArgumentParser(
+        prog="python -m wmata2.disk_cache",
+        description="Prefetch the slow-changing WMATA endpoints into the disk cache.",
+    )
+    parser.add_argument("--api-key", help="WMATA API key (or WMATA_API_KEY)")
+    parser.add_argument("--api-key-file", help="File containing the WMATA API key")
+    parser.add_argument(
+        "--cache-file", help=f"Cache database (default {disk_cache.CACHE_FILE})"
+    )
+    parser.add_argument("--force", action="store_true", help="Refetch everything")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent requests")
+    args = parser.parse_args(argv)
+
+    api_key = args.api_key or os.environ.get("WMATA_API_KEY")
+    if args.api_key_file:
+        with open(args.api_key_file) as f:
+            api_key = f.read().strip()
+    if not api_key:
+        parser.error("an API key is required")
+
+    if args.cache_file:
+        disk_cache.CACHE_FILE = args.cache_file
+
+    start = time.perf_counter()
+    results = disk_cache.warm_up(api_key, force=args.force, workers=args.workers)
+    print(
+        json.dumps(
+            {"elapsed_s": time.perf_counter() - start, "endpoints": results},
+            indent=2,
+        )
+    )
+    return 0 if all(results.values()) else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,524 @@
+"""
+Compiles the static GTFS feeds downloaded by wmata2.rebuild_static_data into typed,
+indexed tables, and loads them back.
+
+Parsing the bus feed's large tables (stop_times.txt, trips.txt, shapes.txt) in a single
+Python process takes minutes, so compile_static_feed splits each CSV into byte ranges
+that end on line boundaries and parses the ranges in a ProcessPoolExecutor. Workers
+first count the rows of every range, so that each chunk knows the global number of its
+first row. They then convert typed columns (times to seconds after midnight, integers,
+floats), dictionary-encode string columns and build partial group indexes of global
+row numbers. The parent is left with C-level work per row (extending columns, slicing
+the indexes by key) while concatenating the chunks in file order, and writes one pickle
+per table next to a manifest with per-table timings.
+
+Functions:
+- compile_static_feed(source_dir, output_dir, workers=None) -> dict:
+  Compile every table of an extracted GTFS feed, returning per-table timings.
+- load_table(feed, table) -> StaticTable:
+  Load a compiled table ("rail" or "bus" feed) with its indexes.
+- compiled_feed_dir(feed) -> str:
+  Directory holding the compiled tables of a feed.
+
+Compiled column types:
+- "time" columns hold seconds after midnight in an array("i"), -1 when empty. GTFS
+  times may run past 24:00:00 for trips that end after midnight.
+- "int" columns hold an array("i"), -1 when empty.
+- "float" columns hold an array("d"), NaN when empty.
+- Every other column is a list of str.
+
+Quoted fields containing newlines are not supported by the byte-range splitter; WMATA's
+feeds do not use them.
+"""
+
+import csv, json, math, os, pickle, time
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+MANIFEST_FILE = "manifest.json"
+
+# Per-table typed columns, group indexes (column -> key -> rows), unique indexes
+# (column -> key -> row) and the column that orders rows within a group.
+TABLE_SPECS: Dict[str, Dict[str, Any]] = {
+    "stop_times": {
+        "types": {
+            "arrival_time": "time",
+            "departure_time": "time",
+            "stop_sequence": "int",
+            "pickup_type": "int",
+            "drop_off_type": "int",
+            "timepoint": "int",
+            "shape_dist_traveled": "float",
+        },
+        "group_by": ("trip_id", "stop_id"),
+        "order_by": {"trip_id": "stop_sequence"},
+    },
+    "trips": {
+        "types": {"direction_id": "int"},
+        "unique": ("trip_id",),
+        "group_by": ("route_id", "service_id", "shape_id"),
+    },
+    "shapes": {
+        "types": {
+            "shape_pt_lat": "float",
+            "shape_pt_lon": "float",
+            "shape_pt_sequence": "int",
+            "shape_dist_traveled": "float",
+        },
+        "group_by": ("shape_id",),
+        "order_by": {"shape_id": "shape_pt_sequence"},
+    },
+    "stops": {
+        "types": {"stop_lat": "float", "stop_lon": "float", "location_type": "int"},
+        "unique": ("stop_id",),
+        "group_by": ("parent_station",),
+    },
+    "routes": {"types": {"route_type": "int"}, "unique": ("route_id",)},
+    "calendar": {
+        "types": {
+            day: "int"
+            for day in (
+                "monday",
+                "tuesday",
+                "wednesday",
+                "thursday",
+                "friday",
+                "saturday",
+                "sunday",
+                "start_date",
+                "end_date",
+            )
+        },
+        "unique": ("service_id",),
+    },
+    "calendar_dates": {
+        "types": {"date": "int", "exception_type": "int"},
+        "group_by": ("service_id", "date"),
+    },
+}
+
+# Byte ranges smaller than this are not worth shipping to a worker process.
+MIN_CHUNK_BYTES = 1 << 20
+
+
+class StaticTable:
+    """
+    A compiled GTFS table: typed columns plus lookup indexes.
+
+    Attributes:
+        name (str): Table name, e.g. "stop_times".
+        nrows (int): Number of rows.
+        columns (Dict[str, Sequence]): Column name -> values, one per row.
+        index (Dict[str, Dict[str, array]]): Group indexes: column -> key -> row
+            numbers (in order_by order where the spec defines one).
+        unique (Dict[str, Dict[str, int]]): Unique indexes: column -> key -> row.
+    """
+
+    __slots__ = ("name", "nrows", "columns", "index", "unique")
+
+    def __init__(
+        self,
+        name: str,
+        nrows: int,
+        columns: Dict[str, Sequence],
+        index: Dict[str, Dict[str, array]],
+        unique: Dict[str, Dict[str, int]],
+    ) -> None:
+        self.name = name
+        self.nrows = nrows
+        self.columns = columns
+        self.index = index
+        self.unique = unique
+
+    def __len__(self) -> int:
+        return self.nrows
+
+    def __repr__(self) -> str:
+        return f"StaticTable({self.name!r}, nrows={self.nrows})"
+
+    def column(self, name: str, default: Any = None) -> Sequence:
+        """Returns a column, or a constant column of default if the feed omits it."""
+        values = self.columns.get(name)
+        if values is None:
+            return [default] * self.nrows
+        return values
+
+    def row(self, i: int) -> Dict[str, Any]:
+        """Returns row i as a dict."""
+        return {name: values[i] for name, values in self.columns.items()}
+
+    def rows_for(self, column: str, key: str) -> Sequence[int]:
+        """Returns the row numbers whose column equals key (empty if none)."""
+        return self.index[column].get(key, ())
+
+    def lookup(self, column: str, key: str) -> Optional[Dict[str, Any]]:
+        """Returns the row whose unique column equals key as a dict, or None."""
+        i = self.unique[column].get(key)
+        return None if i is None else self.row(i)
+
+
+def compiled_feed_dir(feed: str) -> str:
+    """Returns the directory of the compiled tables for the "rail" or "bus" feed."""
+    return os.path.join(DATA_DIR, f"{feed}_gtfs_compiled")
+
+
+def _chunk_ranges(
+    path: str, chunk_bytes: int
+) -> Tuple[List[str], List[Tuple[int, int]]]:
+    """
+    Reads the header of a CSV file and splits the rest into byte ranges that start
+    and end on line boundaries.
+    """
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        header_line = f.readline()
+        start = f.tell()
+        ranges = []
+        while start < size:
+            f.seek(min(start + chunk_bytes, size))
+            if f.tell() < size:
+                f.readline()  # run to the end of the current line
+            end = f.tell()
+            ranges.append((start, end))
+            start = end
+
+    header = next(csv.reader([header_line.decode("utf-8-sig")]))
+    return [name.strip() for name in header], ranges
+
+
+def _count_rows(path: str, start: int, end: int) -> int:
+    """
+    Counts the records in a byte range of a CSV file: its lines that are not blank.
+    Runs in a worker process, so that chunks can number their rows globally before
+    they are parsed.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        lines = f.read(end - start).split(b"\n")
+    return len(lines) - lines.count(b"") - lines.count(b"\r")
+
+
+def _parse_time(value: str) -> int:
+    if not value:
+        return -1
+    hours, minutes, seconds = value.split(":")
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+# A chunk as returned by a worker: its row count, its columns (typed arrays, and
+# (vocabulary, codes) pairs for string columns) and, per group_by column, the distinct
+# keys, the global row numbers ordered by key and the start of each key's run in them.
+_Chunk = Tuple[int, Dict[str, Any], Dict[str, Tuple[list, array, array]]]
+
+
+def _parse_chunk(
+    path: str,
+    start: int,
+    end: int,
+    first_row: int,
+    nrows: int,
+    header: List[str],
+    types: Dict[str, str],
+    group_by: Tuple[str, ...],
+) -> _Chunk:
+    """
+    Parses one byte range of a CSV file, holding nrows records numbered from
+    first_row, into typed columns, dictionary-encoded string columns and partial
+    group indexes. Runs in a worker process.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        text = f.read(end - start).decode("utf-8")
+
+    raw: List[List[str]] = [[] for _ in header]
+    appends = [column.append for column in raw]
+    width = len(header)
+    lines = (line for line in text.split("\n") if line and line != "\r")
+    for row in csv.reader(lines):
+        if len(row) < width:
+            row += [""] * (width - len(row))
+        for append, value in zip(appends, row):
+            append(value)
+    if raw and len(raw[0]) != nrows:
+        raise ValueError(
+            f"{path}: expected {nrows} rows at byte {start}, parsed {len(raw[0])}. "
+            "Quoted fields containing newlines are not supported."
+        )
+
+    columns: Dict[str, Any] = {}
+    for name, values in zip(header, raw):
+        kind = types.get(name)
+        if kind == "time":
+            columns[name] = array("i", map(_parse_time, values))
+        elif kind == "int":
+            columns[name] = array("i", (int(v) if v else -1 for v in values))
+        elif kind == "float":
+            columns[name] = array("d", (float(v) if v else math.nan for v in values))
+        else:
+            # Ids repeat on every row of a trip, so each distinct string is pickled
+            # and transferred once per chunk, and rows are sent as 4-byte codes.
+            codes: Dict[str, int] = {}
+            encoded = array("i", (codes.setdefault(v, len(codes)) for v in values))
+            columns[name] = (list(codes), encoded)
+
+    groups: Dict[str, Tuple[list, array, array]] = {}
+    for name in group_by:
+        if name not in columns:
+            continue
+        rows_by_key: Dict[Any, List[int]] = {}
+        column = columns[name]
+        if isinstance(column, tuple):
+            vocabulary, encoded = column
+            by_code: List[List[int]] = [[] for _ in vocabulary]
+            for row, code in enumerate(encoded, first_row):
+                by_code[code].append(row)
+            rows_by_key = dict(zip(vocabulary, by_code))
+        else:
+            for row, key in enumerate(column, first_row):
+                rows = rows_by_key.get(key)
+                if rows is None:
+                    rows_by_key[key] = [row]
+                else:
+                    rows.append(row)
+        order = array("i")
+        starts = array("i")
+        for rows in rows_by_key.values():
+            starts.append(len(order))
+            order.extend(rows)
+        starts.append(len(order))
+        groups[name] = (list(rows_by_key), order, starts)
+
+    return nrows, columns, groups
+
+
+def _iter_chunk_results(
+    path: str,
+    header: List[str],
+    ranges: List[Tuple[int, int]],
+    spec: Dict[str, Any],
+    executor,
+) -> Iterator[_Chunk]:
+    """Parses the byte ranges, in parallel when an executor is given, in file order."""
+    args = (header, spec.get("types", {}), tuple(spec.get("group_by", ())))
+    parallel = executor is not None and len(ranges) > 1
+    if parallel:
+        futures = [executor.submit(_count_rows, path, *r) for r in ranges]
+        counts = [future.result() for future in futures]
+    else:
+        counts = [_count_rows(path, start, end) for start, end in ranges]
+
+    tasks = []
+    first_row = 0
+    for (start, end), nrows in zip(ranges, counts):
+        tasks.append((path, start, end, first_row, nrows) + args)
+        first_row += nrows
+
+    if not parallel:
+        for task in tasks:
+            yield _parse_chunk(*task)
+        return
+
+    futures = [executor.submit(_parse_chunk, *task) for task in tasks]
+    for future in futures:
+        yield future.result()
+
+
+def _compile_table(
+    name: str, path: str, output_dir: str, chunk_bytes: int, executor
+) -> Dict[str, Any]:
+    """Parses, merges, indexes and writes one table. Returns its timings."""
+    spec = TABLE_SPECS.get(name, {})
+    timings: Dict[str, Any] = {
+        "bytes": os.path.getsize(path),
+        "chunks": 0,
+        "rows": 0,
+        "parse_s": 0.0,
+        "merge_s": 0.0,
+        "index_s": 0.0,
+        "write_s": 0.0,
+        "total_s": 0.0,
+    }
+
+    start = time.perf_counter()
+    header, ranges = _chunk_ranges(path, chunk_bytes)
+    timings["chunks"] = len(ranges)
+
+    columns: Dict[str, Sequence] = {}
+    for column in header:
+        kind = spec.get("types", {}).get(column)
+        columns[column] = array("d" if kind == "float" else "i") if kind else []
+    index: Dict[str, Dict[str, array]] = {
+        column: {} for column in spec.get("group_by", ()) if column in columns
+    }
+
+    chunk_start = time.perf_counter()
+    nrows = 0
+    for chunk_rows, chunk_columns, chunk_groups in _iter_chunk_results(
+        path, header, ranges, spec, executor
+    ):
+        merge_start = time.perf_counter()
+        timings["parse_s"] += merge_start - chunk_start
+        for column, values in chunk_columns.items():
+            if isinstance(values, tuple):
+                vocabulary, codes = values
+                values = map(vocabulary.__getitem__, codes)
+            columns[column].extend(values)  # type: ignore
+        for column, (keys, order, starts) in chunk_groups.items():
+            merged = index[column]
+            for i, key in enumerate(keys):
+                rows = order[starts[i] : starts[i + 1]]
+                existing = merged.get(key)
+                if existing is None:
+                    merged[key] = rows
+                else:
+                    existing.extend(rows)
+        nrows += chunk_rows
+        chunk_start = time.perf_counter()
+        timings["merge_s"] += chunk_start - merge_start
+    timings["rows"] = nrows
+
+    index_start = time.perf_counter()
+    for column, order_column in spec.get("order_by", {}).items():
+        if column not in index or order_column not in columns:
+            continue
+        order = columns[order_column]
+        for key, rows in index[column].items():
+            previous = -1
+            for r in rows:
+                if order[r] < previous:
+                    index[column][key] = array("i", sorted(rows, key=order.__getitem__))
+                    break
+                previous = order[r]
+
+    unique: Dict[str, Dict[str, int]] = {}
+    for column in spec.get("unique", ()):
+        if column in columns:
+            values = columns[column]
+            unique[column] = dict(zip(values, range(nrows)))
+    timings["index_s"] = time.perf_counter() - index_start
+
+    write_start = time.perf_counter()
+    table = {
+        "name": name,
+        "nrows": nrows,
+        "columns": columns,
+        "index": index,
+        "unique": unique,
+    }
+    with open(os.path.join(output_dir, f"{name}.pickle"), "wb") as f:
+        pickle.dump(table, f, protocol=pickle.HIGHEST_PROTOCOL)
+    timings["write_s"] = time.perf_counter() - write_start
+    timings["total_s"] = time.perf_counter() - start
+    return timings
+
+
+def compile_static_feed(
+    source_dir: str,
+    output_dir: str,
+    workers: Optional[int] = None,
+    chunk_bytes: Optional[int] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Compiles every *.txt table of an extracted GTFS feed into indexed pickles.
+
+    Args:
+        source_dir (str): Directory with the extracted GTFS text files.
+        output_dir (str): Directory to write the compiled tables and manifest to.
+        workers (int, optional): Worker processes. Defaults to os.cpu_count(); 1
+            parses in the calling process.
+        chunk_bytes (int, optional): Target byte range size per worker task.
+            Defaults to splitting the largest table into about four ranges per
+            worker, and never below MIN_CHUNK_BYTES.
+
+    Returns:
+        dict: Table name -> timings in seconds (parse_s, merge_s, index_s, write_s,
+            total_s) with row, byte and chunk counts.
+    """
+    workers = workers or os.cpu_count() or 1
+    tables = sorted(
+        (name[:-4], os.path.join(source_dir, name))
+        for name in os.listdir(source_dir)
+        if name.endswith(".txt")
+    )
+    if chunk_bytes is None:
+        largest = max((os.path.getsize(path) for _, path in tables), default=0)
+        chunk_bytes = max(MIN_CHUNK_BYTES, largest // (workers * 4) + 1)
+
+    os.makedirs(output_dir, exist_ok=True)
+    start = time.perf_counter()
+    executor = None
+    if workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=workers)
+
+    timings: Dict[str, Dict[str, Any]] = {}
+    try:
+        # Largest first, so the long tables start while the pool is fresh.
+        for name, path in sorted(tables, key=lambda t: -os.path.getsize(t[1])):
+            timings[name] = _compile_table(
+                name, path, output_dir, chunk_bytes, executor
+            )
+            logger.info(
+                f"Compiled {name}: {timings[name]['rows']} rows in "
+                f"{timings[name]['total_s']:.2f}s"
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    manifest = {
+        "source_dir": os.path.abspath(source_dir),
+        "workers": workers,
+        "chunk_bytes": chunk_bytes,
+        "total_s": time.perf_counter() - start,
+        "tables": timings,
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"Compiled {source_dir} in {manifest['total_s']:.2f}s")
+    return timings
+
+
+_loaded: Dict[Tuple[str, int], StaticTable] = {}
+
+
+def load_table(feed: str, table: str, directory: Optional[str] = None) -> StaticTable:
+    """
+    Loads a compiled table, caching it in the process until the file changes.
+
+    Args:
+        feed (str): "rail" or "bus".
+        table (str): Table name, e.g. "stop_times".
+        directory (str, optional): Compiled feed directory. Defaults to
+            compiled_feed_dir(feed).
+
+    Returns:
+        StaticTable: The table with its indexes.
+
+    Raises:
+        FileNotFoundError: If the table has not been compiled.
+    """
+    path = os.path.join(directory or compiled_feed_dir(feed), f"{table}.pickle")
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"No compiled {feed} {table} table found. Try rebuilding the GTFS static "
+            "files."
+        ) from None
+
+    loaded = _loaded.get(key)
+    if loaded is None:
+        with open(path, "rb") as f:
+            data = pickle.load(f)
+        for stale in [k for k in _loaded if k[0] == path]:
+            del _loaded[stale]
+        loaded = _loaded[key] = StaticTable(**data)
+    return loaded
@@ -0,0 +1,274 @@
+"""
+A pool of WMATA API keys, accepted anywhere a single API_KEY is.
+
+Each WMATA key is rate limited on its own (by default 10 calls per second and 50,000
+calls per day), so one key caps a deployment's throughput. An APIKeyPool holds several
+keys and hands one out for every request made through wmata2.utilities, picking the
+key with the most budget left:
+
+- a token bucket per key enforces calls_per_second, and a per-day counter enforces
+  calls_per_day (days are UTC, as WMATA counts them);
+- a key answered with HTTP 429 is benched for the Retry-After delay, or cooldown_s
+  doubled for every consecutive throttle, and the request is retried on another key;
+- when every key is out of budget, a request waits for the first one to free up,
+  within its deadline.
+
+Per-key usage (requests, throttles, errors, remaining budget) is available from
+stats(). Keys are only ever shown by their last four characters.
+
+Classes:
+- APIKeyPool: The pool.
+- NoKeyAvailable: Raised when no key frees up before the request's deadline.
+
+Example:
+    from wmata2.key_pool import APIKeyPool
+    from wmata2.rail.predictions import get_next_trains
+
+    pool = APIKeyPool(["key-for-web", "key-for-batch", "key-for-alerts"])
+    trains = get_next_trains(pool, "A01")
+    print(pool.stats())
+"""
+
+import threading, time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+# WMATA's default tier.
+DEFAULT_CALLS_PER_SECOND = 10.0
+DEFAULT_CALLS_PER_DAY = 50_000
+
+# Longest a throttled key is benched for after repeated 429s.
+MAX_COOLDOWN_S = 3600.0
+
+
+class NoKeyAvailable(RuntimeError):
+    """No key in the pool had budget left before the request's deadline."""
+
+
+def _label(key: str) -> str:
+    """Identifies a key in logs and stats without revealing it."""
+    return "..." + key[-4:]
+
+
+def _utc_day() -> int:
+    return datetime.now(timezone.utc).toordinal()
+
+
+class _KeyState:
+    __slots__ = (
+        "key",
+        "calls_per_second",
+        "calls_per_day",
+        "tokens",
+        "refilled_at",
+        "day",
+        "used_today",
+        "requests",
+        "throttled",
+        "errors",
+        "consecutive_throttles",
+        "cooldown_until",
+    )
+
+    def __init__(self, key: str, calls_per_second: float, calls_per_day: int) -> None:
+        self.key = key
+        self.calls_per_second = calls_per_second
+        self.calls_per_day = calls_per_day
+        self.tokens = calls_per_second
+        self.refilled_at = time.monotonic()
+        self.day = _utc_day()
+        self.used_today = 0
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.consecutive_throttles = 0
+        self.cooldown_until = 0.0
+
+    def refill(self, now: float, day: int) -> None:
+        # Up to one second of burst.
+        self.tokens = min(
+            self.calls_per_second,
+            self.tokens + (now - self.refilled_at) * self.calls_per_second,
+        )
+        self.refilled_at = now
+        if day != self.day:
+            self.day, self.used_today = day, 0
+
+    def ready_at(self, now: float) -> Optional[float]:
+        """When the key can next be used, or None if its daily budget is spent."""
+        if self.used_today >= self.calls_per_day:
+            return None
+        token_at = now + max(0.0, 1.0 - self.tokens) / self.calls_per_second
+        return max(token_at, self.cooldown_until)
+
+
+class APIKeyPool:
+    """
+    Several API keys used as one, balanced by remaining budget.
+
+    Args:
+        keys (Iterable[str]): The keys.
+        calls_per_second (float, optional): Rate limit of each key. Defaults to 10.
+        calls_per_day (int, optional): Daily quota of each key. Defaults to 50,000.
+        cooldown_s (float, optional): How long a key is benched after its first 429
+            without a Retry-After header. Doubles for each consecutive 429. Defaults
+            to 1.0.
+
+    Raises:
+        ValueError: If no key is given.
+    """
+
+    def __init__(
+        self,
+        keys: Iterable[str],
+        calls_per_second: float = DEFAULT_CALLS_PER_SECOND,
+        calls_per_day: int = DEFAULT_CALLS_PER_DAY,
+        cooldown_s: float = 1.0,
+    ) -> None:
+        self.cooldown_s = cooldown_s
+        self._lock = threading.Lock()
+        self._states: Dict[str, _KeyState] = {}
+        for key in keys:
+            self.add_key(key, calls_per_second, calls_per_day)
+        if not self._states:
+            raise ValueError("An APIKeyPool needs at least one key")
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def __repr__(self) -> str:
+        labels = ", ".join(_label(key) for key in self._states)
+        return f"APIKeyPool([{labels}])"
+
+    def add_key(
+        self,
+        key: str,
+        calls_per_second: float = DEFAULT_CALLS_PER_SECOND,
+        calls_per_day: int = DEFAULT_CALLS_PER_DAY,
+    ) -> None:
+        """Adds a key, e.g. one on a higher tier, to the pool."""
+        with self._lock:
+            self._states[key] = _KeyState(key, calls_per_second, calls_per_day)
+
+    def remove_key(self, key: str) -> None:
+        """Removes a key from the pool."""
+        with self._lock:
+            self._states.pop(key, None)
+
+    def acquire(self, timeout: Optional[float] = None) -> str:
+        """
+        Takes one call from the budget of the key with the most left and returns it.
+        Blocks until a key frees up if all are out of budget or benched.
+
+        Args:
+            timeout (float, optional): Longest time to wait, in seconds. Defaults to
+                waiting as long as needed.
+
+        Returns:
+            str: The key to send.
+
+        Raises:
+            NoKeyAvailable: If no key frees up in time, or every daily quota is spent.
+        """
+        give_up = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now, day = time.monotonic(), _utc_day()
+                best: Optional[_KeyState] = None
+                next_ready: Optional[float] = None
+                for state in self._states.values():
+                    state.refill(now, day)
+                    ready = state.ready_at(now)
+                    if ready is None:
+                        continue
+                    if ready <= now:
+                        if best is None or (
+                            state.tokens,
+                            state.calls_per_day - state.used_today,
+                        ) > (best.tokens, best.calls_per_day - best.used_today):
+                            best = state
+                    elif next_ready is None or ready < next_ready:
+                        next_ready = ready
+                if best is not None:
+                    best.tokens -= 1.0
+                    best.used_today += 1
+                    best.requests += 1
+                    return best.key
+
+            if next_ready is None:
+                raise NoKeyAvailable("Every API key has used its daily quota")
+            if give_up is not None and next_ready > give_up:
+                raise NoKeyAvailable("No API key has budget left before the deadline")
+            time.sleep(max(0.0, next_ready - time.monotonic()))
+
+    def release(
+        self, key: str, status: Optional[int], retry_after: Optional[str] = None
+    ) -> None:
+        """
+        Records the outcome of a request made with a key from acquire().
+
+        Args:
+            key (str): The key used.
+            status (int, optional): The HTTP status, None if no response arrived.
+            retry_after (str, optional): The Retry-After header of a 429 response.
+        """
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return
+            if status == 429:
+                state.throttled += 1
+                state.consecutive_throttles += 1
+                try:
+                    delay = float(retry_after)  # type: ignore
+                except (TypeError, ValueError):
+                    delay = self.cooldown_s * 2 ** (state.consecutive_throttles - 1)
+                delay = min(delay, MAX_COOLDOWN_S)
+                state.cooldown_until = time.monotonic() + delay
+                logger.warning(f"API key {_label(key)} throttled, benched for {delay}s")
+                return
+            state.consecutive_throttles = 0
+            if status is None or status >= 400:
+                state.errors += 1
+
+    def available(self) -> int:
+        """Returns how many keys are not benched and have daily budget left."""
+        with self._lock:
+            now = time.monotonic()
+            return sum(
+                1
+                for state in self._states.values()
+                if state.cooldown_until <= now
+                and state.used_today < state.calls_per_day
+            )
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """
+        Returns per-key usage: requests, throttled, errors, used_today,
+        remaining_today, tokens and cooldown_s (time left benched).
+        """
+        with self._lock:
+            now, day = time.monotonic(), _utc_day()
+            result = []
+            for state in self._states.values():
+                state.refill(now, day)
+                result.append(
+                    {
+                        "key": _label(state.key),
+                        "requests": state.requests,
+                        "throttled": state.throttled,
+                        "errors": state.errors,
+                        "used_today": state.used_today,
+                        "remaining_today": state.calls_per_day - state.used_today,
+                        "tokens": state.tokens,
+                        "cooldown_s": max(0.0, state.cooldown_until - now),
+                    }
+                )
+            return result
+
+
+APIKey = Union[str, APIKeyPool]
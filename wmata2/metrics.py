@@ -0,0 +1,344 @@
+"""
+Per-endpoint request instrumentation for the WMATA API client.
+
+Every call made through wmata2.utilities is timed in stages and recorded against its
+endpoint (the URL path without the query string):
+
+- connect: opening the connection, including the TLS handshake
+- ttfb: sending the request until the response status line and headers arrive
+- download: reading the response body
+- request: connect, ttfb and download together, for the attempt that answered
+- parse: decoding the body (JSON or protobuf)
+- total: the whole call, end to end
+
+Alongside the timings the registry keeps response sizes, request, error and hedged
+request counts and cache hits, all in fixed-bucket histograms and counters so
+recording is a handful of integer increments under one lock.
+
+Functions:
+- add_hook(hook) / remove_hook(hook): Register a callable that receives a
+  RequestRecord after every request, e.g. to forward it to StatsD or a tracer.
+- get_registry() -> MetricsRegistry: The process-wide registry.
+- export_openmetrics() -> str: Render all metrics in the Prometheus/OpenMetrics text
+  exposition format.
+- record_cache_hit(endpoint): Count a response served from a cache.
+
+Example:
+    from wmata2 import metrics
+    print(metrics.export_openmetrics())
+"""
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+# Upper bounds, in seconds, of the latency buckets: 0.5 ms doubling up to ~66 s.
+LATENCY_BUCKETS_S: Tuple[float, ...] = tuple(0.0005 * 2**i for i in range(18))
+
+# Upper bounds, in bytes, of the payload size buckets: 256 B quadrupling up to 64 MiB.
+SIZE_BUCKETS_BYTES: Tuple[float, ...] = tuple(256.0 * 4**i for i in range(10))
+
+STAGES = ("connect", "ttfb", "download", "request", "parse", "total")
+
+
+class Histogram:
+    """
+    A fixed-bucket histogram in the Prometheus style.
+
+    Args:
+        bounds (Tuple[float, ...]): Sorted, inclusive bucket upper bounds. Values
+            above the last bound land in an implicit +Inf bucket.
+    """
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        """Records one value."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimates a quantile as the upper bound of the bucket containing it.
+
+        Args:
+            q (float): The quantile, between 0 and 1.
+
+        Returns:
+            float: The bucket upper bound (inf for the overflow bucket), or None if
+                nothing has been observed yet.
+        """
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return self.bounds[i] if i < len(self.bounds) else float("inf")
+        return float("inf")
+
+
+class RequestRecord:
+    """
+    Measurements for a single request, handed to hooks once the request finishes.
+
+    Stage durations are in seconds and stay None for stages that were not reached
+    (e.g. parse after a connection error).
+    """
+
+    __slots__ = (
+        "endpoint",
+        "function_desc",
+        "connect",
+        "ttfb",
+        "download",
+        "request",
+        "parse",
+        "total",
+        "bytes",
+        "status",
+        "error",
+        "hedges",
+    )
+
+    def __init__(self, endpoint: str, function_desc: str = "") -> None:
+        self.endpoint = endpoint
+        self.function_desc = function_desc
+        self.connect: Optional[float] = None
+        self.ttfb: Optional[float] = None
+        self.download: Optional[float] = None
+        self.request: Optional[float] = None
+        self.parse: Optional[float] = None
+        self.total: Optional[float] = None
+        self.bytes: Optional[int] = None
+        self.status: Optional[int] = None
+        self.error: Optional[str] = None
+        self.hedges = 0
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"RequestRecord({fields})"
+
+
+class EndpointMetrics:
+    """Histograms and counters for one endpoint."""
+
+    __slots__ = (
+        "stages",
+        "bytes",
+        "requests",
+        "errors",
+        "hedged_requests",
+        "cache_hits",
+    )
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, Histogram] = {
+            stage: Histogram(LATENCY_BUCKETS_S) for stage in STAGES
+        }
+        self.bytes = Histogram(SIZE_BUCKETS_BYTES)
+        self.requests = 0
+        self.errors = 0
+        self.hedged_requests = 0
+        self.cache_hits = 0
+
+
+class MetricsRegistry:
+    """Thread-safe collection of EndpointMetrics keyed by endpoint."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, EndpointMetrics] = {}
+        self._hooks: List[Callable[[RequestRecord], None]] = []
+
+    def _get(self, endpoint: str) -> EndpointMetrics:
+        metrics = self._endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self._endpoints[endpoint] = EndpointMetrics()
+        return metrics
+
+    def observe(self, record: RequestRecord) -> None:
+        """Adds a finished request to the endpoint's metrics and runs the hooks."""
+        with self._lock:
+            metrics = self._get(record.endpoint)
+            metrics.requests += 1
+            if record.error is not None:
+                metrics.errors += 1
+            if record.hedges:
+                metrics.hedged_requests += 1
+            for stage in STAGES:
+                value = getattr(record, stage)
+                if value is not None:
+                    metrics.stages[stage].observe(value)
+            if record.bytes is not None:
+                metrics.bytes.observe(record.bytes)
+            hooks = tuple(self._hooks)
+
+        for hook in hooks:
+            try:
+                hook(record)
+            except Exception as e:
+                logger.warning(f"Metrics hook {hook!r} failed|| Error: {e}")
+
+    def record_cache_hit(self, endpoint: str) -> None:
+        """Counts a response for the endpoint that was served from a cache."""
+        with self._lock:
+            self._get(endpoint).cache_hits += 1
+
+    def add_hook(self, hook: Callable[[RequestRecord], None]) -> None:
+        """Registers a callable to receive every RequestRecord."""
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[RequestRecord], None]) -> None:
+        """Unregisters a hook previously passed to add_hook."""
+        with self._lock:
+            self._hooks.remove(hook)
+
+    def quantile(
+        self, endpoint: str, q: float, stage: str = "total"
+    ) -> Optional[float]:
+        """Estimates a latency quantile for an endpoint, or None without samples."""
+        with self._lock:
+            metrics = self._endpoints.get(endpoint)
+            if metrics is None:
+                return None
+            return metrics.stages[stage].quantile(q)
+
+    def sample_count(self, endpoint: str, stage: str = "total") -> int:
+        """Returns how many observations an endpoint stage histogram holds."""
+        with self._lock:
+            metrics = self._endpoints.get(endpoint)
+            return 0 if metrics is None else metrics.stages[stage].count
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Returns a plain-dict copy of all metrics, e.g. for JSON logging."""
+        with self._lock:
+            return {
+                endpoint: {
+                    "requests": m.requests,
+                    "errors": m.errors,
+                    "hedged_requests": m.hedged_requests,
+                    "cache_hits": m.cache_hits,
+                    "bytes": {"sum": m.bytes.sum, "count": m.bytes.count},
+                    **{
+                        f"{stage}_seconds": {
+                            "sum": h.sum,
+                            "count": h.count,
+                            "p50": h.quantile(0.5),
+                            "p99": h.quantile(0.99),
+                        }
+                        for stage, h in m.stages.items()
+                    },
+                }
+                for endpoint, m in self._endpoints.items()
+            }
+
+    def reset(self) -> None:
+        """Drops all collected metrics. Hooks stay registered."""
+        with self._lock:
+            self._endpoints.clear()
+
+    def export_openmetrics(self) -> str:
+        """Renders all metrics in the OpenMetrics text exposition format."""
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines: List[str] = []
+
+            for stage in STAGES:
+                name = f"wmata2_request_{stage}_seconds"
+                lines.append(f"# TYPE {name} histogram")
+                lines.append(f"# UNIT {name} seconds")
+                for endpoint, m in endpoints:
+                    _histogram_lines(lines, name, endpoint, m.stages[stage])
+
+            name = "wmata2_response_bytes"
+            lines.append(f"# TYPE {name} histogram")
+            lines.append(f"# UNIT {name} bytes")
+            for endpoint, m in endpoints:
+                _histogram_lines(lines, name, endpoint, m.bytes)
+
+            for name, attr in (
+                ("wmata2_requests", "requests"),
+                ("wmata2_request_errors", "errors"),
+                ("wmata2_hedged_requests", "hedged_requests"),
+                ("wmata2_cache_hits", "cache_hits"),
+            ):
+                lines.append(f"# TYPE {name} counter")
+                for endpoint, m in endpoints:
+                    lines.append(
+                        f"{name}_total{{endpoint={_label(endpoint)}}} {getattr(m, attr)}"
+                    )
+
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+def _label(value: str) -> str:
+    escaped = value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return f'"{escaped}"'
+
+
+def _number(value: float) -> str:
+    # repr is the shortest string that round-trips, unlike :g's 6 significant digits.
+    return repr(float(value))
+
+
+def _histogram_lines(
+    lines: List[str], name: str, endpoint: str, histogram: Histogram
+) -> None:
+    label = _label(endpoint)
+    cumulative = 0
+    for bound, n in zip(histogram.bounds, histogram.counts):
+        cumulative += n
+        lines.append(
+            f'{name}_bucket{{endpoint={label},le="{_number(bound)}"}} {cumulative}'
+        )
+    lines.append(f'{name}_bucket{{endpoint={label},le="+Inf"}} {histogram.count}')
+    lines.append(f"{name}_sum{{endpoint={label}}} {_number(histogram.sum)}")
+    lines.append(f"{name}_count{{endpoint={label}}} {histogram.count}")
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    """Returns the process-wide metrics registry."""
+    return _registry
+
+
+def endpoint_name(URL: str) -> str:
+    """Returns the metrics label for a request URL: its path without the query."""
+    return URL.split("?", 1)[0]
+
+
+def add_hook(hook: Callable[[RequestRecord], None]) -> None:
+    """Registers a callable to receive a RequestRecord after every request."""
+    _registry.add_hook(hook)
+
+
+def remove_hook(hook: Callable[[RequestRecord], None]) -> None:
+    """Unregisters a hook previously passed to add_hook."""
+    _registry.remove_hook(hook)
+
+
+def record_cache_hit(endpoint: str) -> None:
+    """Counts a response for the endpoint that was served from a cache."""
+    _registry.record_cache_hit(endpoint)
+
+
+def export_openmetrics() -> str:
+    """Renders all metrics in the Prometheus/OpenMetrics text exposition format."""
+    return _registry.export_openmetrics()
@@ -0,0 +1,198 @@
+"""
+Per-endpoint latency policies for requests made through wmata2.utilities.
+
+A policy bounds how long a call may take and how the client fights tail latency:
+
+- timeout_s: a hard deadline for the whole request (connect, headers and body). When
+  it passes the call fails like any other error instead of blocking on the socket.
+- hedging: if a request has not completed after the endpoint's observed latency
+  quantile (taken from wmata2.metrics), a duplicate request is sent and whichever
+  answers first wins. A request that fails outright is hedged immediately.
+- stale_while_revalidate: once an endpoint has returned a good response, later calls
+  return that response right away, and those made once it is older than fresh_s also
+  refresh it in the background (one refresh per URL at a time). The same cached
+  response is also returned if a fresh request fails.
+- disk_cache_ttl_s: responses are kept in the cross-process SQLite cache of
+  wmata2.disk_cache and served from it while younger than this. An entry that expired
+  less than max_stale_s ago is still served if a fresh request fails.
+
+Policies are matched by URL path prefix; the longest matching prefix wins and paths
+without a match use DEFAULT_POLICY.
+
+Functions:
+- set_endpoint_policy(endpoint, policy): Install a policy for a URL path prefix.
+- get_endpoint_policy(endpoint) -> EndpointPolicy: Resolve the policy for a path.
+- clear_endpoint_policies(): Remove every installed policy.
+- enable_disk_cache(ttl_s=None): Turn on the disk cache for the slow-changing
+  endpoints listed in SLOW_CHANGING_ENDPOINTS.
+
+Example:
+    from wmata2 import policies
+    policies.set_endpoint_policy(
+        "/StationPrediction.svc/json/GetPrediction",
+        policies.EndpointPolicy(timeout_s=3.0, hedge_quantile=0.95),
+    )
+    policies.set_endpoint_policy(
+        "/Rail.svc/json/jStations",
+        policies.EndpointPolicy(stale_while_revalidate=True, max_stale_s=3600.0),
+    )
+"""
+
+import threading
+from typing import Dict, Optional
+
+from . import metrics
+
+
+class EndpointPolicy:
+    """
+    Latency policy for one endpoint.
+
+    Args:
+        timeout_s (float, optional): Deadline for the whole request in seconds.
+            Defaults to 10.0.
+        hedge_quantile (float, optional): Latency quantile (e.g. 0.95) after which a
+            duplicate request is sent. None disables hedging. Defaults to None.
+        hedge_after_s (float, optional): Fixed hedge delay in seconds, used instead of
+            the observed quantile. Defaults to None.
+        hedge_min_samples (int, optional): Observations required before the observed
+            quantile is trusted; until then no hedge is sent. Defaults to 20.
+        max_hedges (int, optional): Maximum duplicate requests per call. Defaults to 1.
+        stale_while_revalidate (bool, optional): Serve the last good response
+            immediately and refresh it in the background. Defaults to False.
+        fresh_s (float, optional): Age, in seconds, below which a response served
+            stale is not refreshed. Defaults to 10.0.
+        max_stale_s (float, optional): Oldest response, in seconds, that may be served
+            stale. Defaults to 300.0.
+        disk_cache_ttl_s (float, optional): Seconds a response stays fresh in the
+            disk cache shared across processes. None disables it. Defaults to None.
+    """
+
+    __slots__ = (
+        "timeout_s",
+        "hedge_quantile",
+        "hedge_after_s",
+        "hedge_min_samples",
+        "max_hedges",
+        "stale_while_revalidate",
+        "fresh_s",
+        "max_stale_s",
+        "disk_cache_ttl_s",
+    )
+
+    def __init__(
+        self,
+        timeout_s: float = 10.0,
+        hedge_quantile: Optional[float] = None,
+        hedge_after_s: Optional[float] = None,
+        hedge_min_samples: int = 20,
+        max_hedges: int = 1,
+        stale_while_revalidate: bool = False,
+        fresh_s: float = 10.0,
+        max_stale_s: float = 300.0,
+        disk_cache_ttl_s: Optional[float] = None,
+    ) -> None:
+        self.timeout_s = timeout_s
+        self.hedge_quantile = hedge_quantile
+        self.hedge_after_s = hedge_after_s
+        self.hedge_min_samples = hedge_min_samples
+        self.max_hedges = max_hedges
+        self.stale_while_revalidate = stale_while_revalidate
+        self.fresh_s = fresh_s
+        self.max_stale_s = max_stale_s
+        self.disk_cache_ttl_s = disk_cache_ttl_s
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"EndpointPolicy({fields})"
+
+    def hedge_delay(self, endpoint: str) -> Optional[float]:
+        """
+        Returns how long to wait before hedging a request to the endpoint, or None if
+        the request should not be hedged.
+        """
+        if self.max_hedges < 1:
+            return None
+        if self.hedge_after_s is not None:
+            return self.hedge_after_s
+        if self.hedge_quantile is None:
+            return None
+        registry = metrics.get_registry()
+        if registry.sample_count(endpoint, "request") < self.hedge_min_samples:
+            return None
+        return registry.quantile(endpoint, self.hedge_quantile, "request")
+
+
+DEFAULT_POLICY = EndpointPolicy()
+
+# URL path prefix -> seconds a response stays fresh in the disk cache, for endpoints
+# whose data changes at most with timetable or infrastructure changes.
+SLOW_CHANGING_ENDPOINTS: Dict[str, float] = {
+    "/Rail.svc/json/jLines": 86400.0,
+    "/Rail.svc/json/jStations": 86400.0,
+    "/Rail.svc/json/jStationInfo": 86400.0,
+    "/Rail.svc/json/jStationTimes": 86400.0,
+    "/Rail.svc/json/jStationParking": 86400.0,
+    "/Rail.svc/json/jStationEntrances": 86400.0,
+    "/Rail.svc/json/jSrcStationToDstStationInfo": 86400.0,
+    "/Rail.svc/json/jPath": 86400.0,
+    "/TrainPositions/StandardRoutes": 86400.0,
+    "/TrainPositions/TrackCircuits": 86400.0,
+}
+
+_lock = threading.Lock()
+_policies: Dict[str, EndpointPolicy] = {}
+
+
+def set_endpoint_policy(endpoint: str, policy: EndpointPolicy) -> None:
+    """
+    Installs a policy for every URL path starting with the given prefix.
+
+    Args:
+        endpoint (str): URL path prefix, e.g. "/Rail.svc/json/jStations".
+        policy (EndpointPolicy): The policy to apply.
+    """
+    with _lock:
+        _policies[endpoint] = policy
+
+
+def get_endpoint_policy(endpoint: str) -> EndpointPolicy:
+    """
+    Returns the policy for a URL path: the longest installed prefix match, or
+    DEFAULT_POLICY.
+    """
+    best = None
+    best_length = -1
+    with _lock:
+        for prefix, policy in _policies.items():
+            if len(prefix) > best_length and endpoint.startswith(prefix):
+                best, best_length = policy, len(prefix)
+    return best or DEFAULT_POLICY
+
+
+def clear_endpoint_policies() -> None:
+    """Removes every installed policy."""
+    with _lock:
+        _policies.clear()
+
+
+def enable_disk_cache(ttl_s: Optional[float] = None) -> None:
+    """
+    Turns on the cross-process disk cache (wmata2.disk_cache) for every endpoint in
+    SLOW_CHANGING_ENDPOINTS. Other settings of a policy already installed for one of
+    those prefixes are kept, as is a disk cache TTL it already sets.
+
+    Args:
+        ttl_s (float, optional): Freshness in seconds for all of them. Defaults to
+            each endpoint's SLOW_CHANGING_ENDPOINTS value.
+    """
+    with _lock:
+        for prefix, default_ttl_s in SLOW_CHANGING_ENDPOINTS.items():
+            current = _policies.get(prefix, DEFAULT_POLICY)
+            if ttl_s is None and current.disk_cache_ttl_s is not None:
+                continue
+            policy = EndpointPolicy(
+                **{name: getattr(current, name) for name in EndpointPolicy.__slots__}
+            )
+            policy.disk_cache_ttl_s = default_ttl_s if ttl_s is None else ttl_s
+            _policies[prefix] = policy
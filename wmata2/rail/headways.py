@@ -0,0 +1,362 @@
+"""
+Streaming headway, dwell and schedule-adherence analytics for Metrorail.
+
+Feed HeadwayTracker each snapshot as it is polled: get_live_trains_positions output via
+update_positions, GTFS-RT vehicle positions via update_vehicle_positions and GTFS-RT
+trip updates via update_trip_updates. The tracker only keeps the latest state of each
+train plus fixed-size, array-backed ring buffers per (line, station, direction), so
+memory stays constant however long it runs, and rolling-window statistics (count,
+mean, standard deviation, last value) are O(1) reads of running sums.
+
+Definitions:
+- headway: seconds between consecutive arrivals of trains of the same line at the
+  same station in the same direction.
+- dwell: seconds a train was observed at a station's circuit (or STOPPED_AT a
+  platform), from its arrival to the last snapshot that still placed it there.
+- delay: the GTFS-RT predicted delay of a trip at a stop, taken from the last trip
+  update before the trip moved past that stop.
+
+Classes:
+- RingBuffer: Fixed-capacity float window with O(1) summary statistics.
+- HeadwayTracker: Incremental headway, dwell and delay statistics.
+
+Example:
+    from wmata2.rail.positions import get_live_trains_positions, get_standard_routes
+    from wmata2.rail.headways import HeadwayTracker
+
+    tracker = HeadwayTracker(get_standard_routes(API_KEY))
+    while True:
+        tracker.update_positions(get_live_trains_positions(API_KEY))
+        print(tracker.headway_stats("RD", "A01", 1))
+        time.sleep(10)
+"""
+
+import math, time
+from array import array
+from typing import Dict, Hashable, Iterator, Optional, Tuple
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+StopKey = Tuple[str, str, int]
+
+
+class RingBuffer:
+    """
+    A fixed-capacity window of the most recent float values.
+
+    Pushing a value evicts the oldest once the buffer is full. Count, mean, variance
+    and the last value are kept as running sums, so every query is O(1).
+
+    Args:
+        capacity (int): Number of values kept.
+    """
+
+    __slots__ = ("_values", "_capacity", "_next", "_count", "_sum", "_sumsq", "_pushes")
+
+    def __init__(self, capacity: int) -> None:
+        if capacity < 1:
+            raise ValueError("RingBuffer capacity must be at least 1")
+        self._values = array("d", bytes(8 * capacity))
+        self._capacity = capacity
+        self._next = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sumsq = 0.0
+        self._pushes = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def push(self, value: float) -> None:
+        """Adds a value, evicting the oldest if the buffer is full."""
+        if self._count == self._capacity:
+            old = self._values[self._next]
+            self._sum -= old
+            self._sumsq -= old * old
+        else:
+            self._count += 1
+        self._values[self._next] = value
+        self._sum += value
+        self._sumsq += value * value
+        self._next = (self._next + 1) % self._capacity
+
+        # Re-derive the running sums once per full cycle so floating point error from
+        # the add/subtract updates cannot accumulate.
+        self._pushes += 1
+        if self._pushes >= self._capacity:
+            self._pushes = 0
+            window = self.values()
+            self._sum = math.fsum(window)
+            self._sumsq = math.fsum(v * v for v in window)
+
+    @property
+    def last(self) -> Optional[float]:
+        """The most recently pushed value, or None if empty."""
+        if not self._count:
+            return None
+        return self._values[(self._next - 1) % self._capacity]
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Mean of the window, or None if empty."""
+        return self._sum / self._count if self._count else None
+
+    @property
+    def stdev(self) -> Optional[float]:
+        """Population standard deviation of the window, or None if empty."""
+        if not self._count:
+            return None
+        mean = self._sum / self._count
+        return math.sqrt(max(0.0, self._sumsq / self._count - mean * mean))
+
+    def values(self) -> array:
+        """Returns a copy of the window, oldest first."""
+        if self._count < self._capacity:
+            return self._values[: self._count]
+        return self._values[self._next :] + self._values[: self._next]
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """Returns count, mean, stdev and last as a dict."""
+        return {
+            "count": self._count,
+            "mean": self.mean,
+            "stdev": self.stdev,
+            "last": self.last,
+        }
+
+
+class _StopStats:
+    __slots__ = ("headways", "dwells", "delays", "last_arrival", "bunching")
+
+    def __init__(self, capacity: int) -> None:
+        self.headways = RingBuffer(capacity)
+        self.dwells = RingBuffer(capacity)
+        self.delays = RingBuffer(capacity)
+        self.last_arrival: Optional[float] = None
+        self.bunching = 0
+
+
+class _TrainState:
+    __slots__ = ("key", "arrived", "last_seen")
+
+    def __init__(
+        self, key: Optional[StopKey], arrived: float, last_seen: float
+    ) -> None:
+        self.key = key
+        self.arrived = arrived
+        self.last_seen = last_seen
+
+
+class HeadwayTracker:
+    """
+    Incrementally maintained headway, dwell and delay statistics.
+
+    Args:
+        standard_routes (dict, optional): get_standard_routes output, used to map track
+            circuits to stations for update_positions. Not needed for the GTFS-RT
+            updates.
+        capacity (int, optional): Observations kept per statistic and key. Defaults
+            to 32.
+        bunching_ratio (float, optional): A headway shorter than this fraction of the
+            window's mean headway counts as a bunching event. Defaults to 0.5.
+    """
+
+    def __init__(
+        self,
+        standard_routes: Optional[dict] = None,
+        capacity: int = 32,
+        bunching_ratio: float = 0.5,
+    ) -> None:
+        self.capacity = capacity
+        self.bunching_ratio = bunching_ratio
+        self._stats: Dict[StopKey, _StopStats] = {}
+        self._trains: Dict[Hashable, _TrainState] = {}
+        self._trip_next_stop: Dict[str, Tuple[StopKey, Optional[int]]] = {}
+        self._circuit_station: Dict[int, str] = {}
+        if standard_routes:
+            for route in standard_routes.get("StandardRoutes", ()):
+                for circuit in route.get("TrackCircuits", ()):
+                    if circuit.get("StationCode"):
+                        self._circuit_station[circuit["CircuitId"]] = circuit[
+                            "StationCode"
+                        ]
+
+    def _get_stats(self, key: StopKey) -> _StopStats:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _StopStats(self.capacity)
+        return stats
+
+    def _observe(
+        self, train: Hashable, key: Optional[StopKey], arrived: float, now: float
+    ) -> None:
+        """Advances one train's state machine with its position in a snapshot."""
+        state = self._trains.get(train)
+        if state is not None and state.key == key:
+            state.last_seen = now
+            return
+
+        if state is not None and state.key is not None:
+            self._get_stats(state.key).dwells.push(state.last_seen - state.arrived)
+
+        if key is not None:
+            stats = self._get_stats(key)
+            if stats.last_arrival is not None and arrived > stats.last_arrival:
+                headway = arrived - stats.last_arrival
+                mean = stats.headways.mean
+                if mean and headway < self.bunching_ratio * mean:
+                    stats.bunching += 1
+                stats.headways.push(headway)
+            if stats.last_arrival is None or arrived > stats.last_arrival:
+                stats.last_arrival = arrived
+
+        if state is None:
+            self._trains[train] = _TrainState(key, arrived, now)
+        else:
+            state.key, state.arrived, state.last_seen = key, arrived, now
+
+    def _forget_missing(self, seen: set) -> None:
+        for train in [t for t in self._trains if t not in seen]:
+            del self._trains[train]
+
+    def update_positions(self, positions: dict, now: Optional[float] = None) -> None:
+        """
+        Processes one get_live_trains_positions snapshot.
+
+        Args:
+            positions (dict): The TrainPositions response.
+            now (float, optional): POSIX time of the snapshot. Defaults to the current
+                time.
+        """
+        now = time.time() if now is None else now
+        seen = set()
+        circuit_station = self._circuit_station
+        for train in positions.get("TrainPositions", ()):
+            train_id = train.get("TrainId")
+            seen.add(train_id)
+            station = circuit_station.get(train.get("CircuitId"))
+            key = None
+            if station is not None and train.get("LineCode"):
+                key = (train["LineCode"], station, train.get("DirectionNum") or 0)
+            arrived = now - (train.get("SecondsAtLocation") or 0)
+            self._observe(train_id, key, arrived, now)
+        self._forget_missing(seen)
+
+    def update_vehicle_positions(self, feed: dict, now: Optional[float] = None) -> None:
+        """
+        Processes one GTFS-RT vehicle positions snapshot in MessageToDict form.
+
+        A vehicle counts as at a station while its currentStatus is STOPPED_AT; the
+        key is (routeId, stopId, directionId).
+
+        Args:
+            feed (dict): get_rail_rt_vehicle_positions output.
+            now (float, optional): Fallback POSIX time for entities without a
+                timestamp. Defaults to the feed header timestamp, then the current
+                time.
+        """
+        header_time = feed.get("header", {}).get("timestamp")
+        if now is None:
+            now = float(header_time) if header_time is not None else time.time()
+        seen = set()
+        for entity in feed.get("entity", ()):
+            vehicle = entity.get("vehicle")
+            if not vehicle:
+                continue
+            train_id = vehicle.get("vehicle", {}).get("id") or entity.get("id")
+            seen.add(train_id)
+            observed = float(vehicle.get("timestamp", now))
+            key = None
+            if vehicle.get("currentStatus") == "STOPPED_AT" and vehicle.get("stopId"):
+                trip = vehicle.get("trip", {})
+                key = (
+                    trip.get("routeId", ""),
+                    vehicle["stopId"],
+                    trip.get("directionId", 0),
+                )
+            self._observe(train_id, key, observed, observed)
+        self._forget_missing(seen)
+
+    def update_trip_updates(self, feed: dict) -> None:
+        """
+        Processes one GTFS-RT trip updates snapshot in MessageToDict form.
+
+        When a trip's first remaining stop changes, the last delay predicted for the
+        stop it passed is recorded against (routeId, stopId, directionId).
+
+        Args:
+            feed (dict): get_rail_rt_trip_updates output.
+        """
+        next_stops: Dict[str, Tuple[StopKey, Optional[int]]] = {}
+        for entity in feed.get("entity", ()):
+            trip_update = entity.get("tripUpdate")
+            if not trip_update or not trip_update.get("stopTimeUpdate"):
+                continue
+            trip = trip_update.get("trip", {})
+            trip_id = trip.get("tripId") or entity.get("id")
+            update = trip_update["stopTimeUpdate"][0]
+            # The arrival delay, else the departure delay.
+            delay = (update.get("arrival") or {}).get("delay")
+            if delay is None:
+                delay = (update.get("departure") or {}).get("delay")
+            key = (
+                trip.get("routeId", ""),
+                update.get("stopId", ""),
+                trip.get("directionId", 0),
+            )
+            next_stops[trip_id] = (key, delay)
+
+            previous = self._trip_next_stop.get(trip_id)
+            if previous is not None and previous[0] != key and previous[1] is not None:
+                self._get_stats(previous[0]).delays.push(previous[1])
+        self._trip_next_stop = next_stops
+
+    def keys(self) -> Iterator[StopKey]:
+        """Iterates the (line or route, station or stop, direction) keys seen so far."""
+        return iter(self._stats)
+
+    def _stats_for(
+        self, line: str, station: str, direction: int
+    ) -> Optional[_StopStats]:
+        return self._stats.get((line, station, direction))
+
+    def headway_stats(
+        self, line: str, station: str, direction: int
+    ) -> Dict[str, Optional[float]]:
+        """
+        Returns the rolling headway statistics (seconds) for a line at a station in one
+        direction: count, mean, stdev, last and the number of bunching events.
+        """
+        stats = self._stats_for(line, station, direction)
+        if stats is None:
+            return {
+                "count": 0,
+                "mean": None,
+                "stdev": None,
+                "last": None,
+                "bunching": 0,
+            }
+        return {**stats.headways.stats(), "bunching": stats.bunching}
+
+    def dwell_stats(
+        self, line: str, station: str, direction: int
+    ) -> Dict[str, Optional[float]]:
+        """Returns the rolling dwell statistics (seconds): count, mean, stdev, last."""
+        stats = self._stats_for(line, station, direction)
+        return RingBuffer(1).stats() if stats is None else stats.dwells.stats()
+
+    def delay_stats(
+        self, route: str, stop_id: str, direction: int = 0
+    ) -> Dict[str, Optional[float]]:
+        """Returns the rolling delay statistics (seconds): count, mean, stdev, last."""
+        stats = self._stats_for(route, stop_id, direction)
+        return RingBuffer(1).stats() if stats is None else stats.delays.stats()
+
+    def is_bunched(self, line: str, station: str, direction: int) -> bool:
+        """True if the latest headway was shorter than bunching_ratio of the mean."""
+        stats = self._stats_for(line, station, direction)
+        if stats is None or len(stats.headways) < 2:
+            return False
+        return stats.headways.last < self.bunching_ratio * stats.headways.mean  # type: ignore
@@ -0,0 +1,463 @@
+"""
+Typed models for the Metrorail JSON endpoint responses.
+
+Each model wraps one item of a response as returned by the functions in wmata2.rail
+and exposes its fields as attributes. The raw values stay in the wrapped dict;
+numeric and time fields are converted the first time they are read and cached in a
+__slots__ member, so repeated reads cost an attribute lookup instead of a dict probe
+and a str-to-float conversion. Values that cannot be converted read as None. For
+predictions, "ARR" and "BRD" read as 0 minutes.
+
+Collections wrap a whole response, behave as sequences of models and index their
+items by station code or train id on first keyed lookup.
+
+Classes:
+- Prediction, Predictions: GetPrediction "Trains" items, keyed by station code.
+- StationToStationInfo, StationToStationInfos: jSrcStationToDstStationInfo items,
+  keyed by (source, destination) station codes.
+- TrainPosition, TrainPositions: TrainPositions items, keyed by train id.
+- Line, Lines: jLines items, keyed by line code.
+- Station, Stations: jStations items, keyed by station code.
+- ParkingInfo, ParkingInfos: jStationParking items, keyed by station code.
+- Entrance, Entrances: jStationEntrances items, keyed by each station code served.
+
+Example:
+    from wmata2.rail.models import Predictions
+    from wmata2.rail.predictions import get_next_trains
+
+    predictions = Predictions.from_response(get_next_trains(API_KEY))
+    for prediction in predictions.all("A01"):
+        print(prediction.line, prediction.minutes)
+"""
+
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    overload,
+)
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+
+def _to_float(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_int(value: Any) -> Optional[int]:
+    number = _to_float(value)
+    return None if number is None else int(number)
+
+
+def _to_minutes(value: Any) -> Optional[float]:
+    # Predictions use "ARR" (arriving) and "BRD" (boarding) for trains at the platform.
+    if value in ("ARR", "BRD"):
+        return 0.0
+    return _to_float(value)
+
+
+class _Field:
+    """A raw field of the wrapped dict, read as is."""
+
+    __slots__ = ("path",)
+
+    def __init__(self, *path: str) -> None:
+        self.path = path
+
+    def _lookup(self, raw: dict) -> Any:
+        value: Any = raw
+        for key in self.path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key)
+        return value
+
+    def __get__(self, obj: Optional["_Model"], owner: type) -> Any:
+        if obj is None:
+            return self
+        return self._lookup(obj.raw)
+
+
+class _Parsed(_Field):
+    """
+    A field converted on first access and cached in the slot named after the
+    attribute with a leading underscore.
+    """
+
+    __slots__ = ("parse", "_member")
+
+    def __init__(self, parse: Callable[[Any], Any], *path: str) -> None:
+        super().__init__(*path)
+        self.parse = parse
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        # The slot's member descriptor, used directly to skip attribute resolution.
+        self._member = owner.__dict__[f"_{name}"]
+
+    def __get__(self, obj: Optional["_Model"], owner: type) -> Any:
+        if obj is None:
+            return self
+        try:
+            return self._member.__get__(obj, owner)
+        except AttributeError:
+            value = self.parse(self._lookup(obj.raw))
+            self._member.__set__(obj, value)
+            return value
+
+
+class _Model:
+    """Base class of the models: holds the wrapped response item."""
+
+    __slots__ = ("raw",)
+
+    def __init__(self, raw: dict) -> None:
+        self.raw = raw
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.raw!r})"
+
+    def _keys(self) -> Iterable[Hashable]:
+        """Keys the item is indexed under in its collection."""
+        return ()
+
+
+class Prediction(_Model):
+    """A next-train prediction at a station (GetPrediction "Trains" item)."""
+
+    __slots__ = ("_minutes", "_car_count", "_group")
+
+    car = _Field("Car")
+    destination = _Field("Destination")
+    destination_code = _Field("DestinationCode")
+    destination_name = _Field("DestinationName")
+    line = _Field("Line")
+    location_code = _Field("LocationCode")
+    location_name = _Field("LocationName")
+    min = _Field("Min")
+
+    minutes = _Parsed(_to_minutes, "Min")
+    """Minutes until arrival; 0 for "ARR"/"BRD", None when no estimate is given."""
+    car_count = _Parsed(_to_int, "Car")
+    """Number of cars, None when unknown."""
+    group = _Parsed(_to_int, "Group")
+    """Platform track group (1 or 2)."""
+
+    @property
+    def is_arriving(self) -> bool:
+        return self.raw.get("Min") == "ARR"
+
+    @property
+    def is_boarding(self) -> bool:
+        return self.raw.get("Min") == "BRD"
+
+    def _keys(self) -> Iterable[Hashable]:
+        return (self.location_code,)
+
+
+class StationToStationInfo(_Model):
+    """Distance, rail time and fares between two stations."""
+
+    __slots__ = (
+        "_composite_miles",
+        "_rail_time",
+        "_peak_fare",
+        "_off_peak_fare",
+        "_senior_disabled_fare",
+    )
+
+    source_station = _Field("SourceStation")
+    destination_station = _Field("DestinationStation")
+
+    composite_miles = _Parsed(_to_float, "CompositeMiles")
+    rail_time = _Parsed(_to_float, "RailTime")
+    """Estimated travel time in minutes."""
+    peak_fare = _Parsed(_to_float, "RailFare", "PeakTime")
+    off_peak_fare = _Parsed(_to_float, "RailFare", "OffPeakTime")
+    senior_disabled_fare = _Parsed(_to_float, "RailFare", "SeniorDisabled")
+
+    def _keys(self) -> Iterable[Hashable]:
+        return ((self.source_station, self.destination_station),)
+
+
+class TrainPosition(_Model):
+    """A live train position (TrainPositions item)."""
+
+    __slots__ = (
+        "_car_count",
+        "_direction_num",
+        "_circuit_id",
+        "_seconds_at_location",
+    )
+
+    train_id = _Field("TrainId")
+    train_number = _Field("TrainNumber")
+    destination_station_code = _Field("DestinationStationCode")
+    line_code = _Field("LineCode")
+    service_type = _Field("ServiceType")
+
+    car_count = _Parsed(_to_int, "CarCount")
+    direction_num = _Parsed(_to_int, "DirectionNum")
+    circuit_id = _Parsed(_to_int, "CircuitId")
+    seconds_at_location = _Parsed(_to_int, "SecondsAtLocation")
+
+    def _keys(self) -> Iterable[Hashable]:
+        return (self.train_id,)
+
+
+class Line(_Model):
+    """A rail line (jLines item)."""
+
+    __slots__ = ()
+
+    line_code = _Field("LineCode")
+    display_name = _Field("DisplayName")
+    start_station_code = _Field("StartStationCode")
+    end_station_code = _Field("EndStationCode")
+    internal_destination_1 = _Field("InternalDestination1")
+    internal_destination_2 = _Field("InternalDestination2")
+
+    def _keys(self) -> Iterable[Hashable]:
+        return (self.line_code,)
+
+
+class Station(_Model):
+    """A rail station (jStations item or jStationInfo response)."""
+
+    __slots__ = ("_lat", "_lon", "_line_codes")
+
+    code = _Field("Code")
+    name = _Field("Name")
+    station_together_1 = _Field("StationTogether1")
+    station_together_2 = _Field("StationTogether2")
+    street = _Field("Address", "Street")
+    city = _Field("Address", "City")
+    state = _Field("Address", "State")
+    zip = _Field("Address", "Zip")
+
+    lat = _Parsed(_to_float, "Lat")
+    lon = _Parsed(_to_float, "Lon")
+
+    @property
+    def line_codes(self) -> Tuple[str, ...]:
+        """The lines serving the station."""
+        try:
+            return self._line_codes
+        except AttributeError:
+            raw = self.raw
+            self._line_codes = tuple(
+                raw[key]
+                for key in ("LineCode1", "LineCode2", "LineCode3", "LineCode4")
+                if raw.get(key)
+            )
+            return self._line_codes
+
+    def _keys(self) -> Iterable[Hashable]:
+        return (self.code,)
+
+
+class ParkingInfo(_Model):
+    """Parking at a station (jStationParking "StationsParking" item)."""
+
+    __slots__ = (
+        "_all_day_total",
+        "_rider_cost",
+        "_non_rider_cost",
+        "_saturday_rider_cost",
+        "_saturday_non_rider_cost",
+        "_short_term_total",
+    )
+
+    station_code = _Field("Code")
+    notes = _Field("Notes")
+    short_term_notes = _Field("ShortTermParking", "Notes")
+
+    all_day_total = _Parsed(_to_int, "AllDayParking", "TotalCount")
+    rider_cost = _Parsed(_to_float, "AllDayParking", "RiderCost")
+    non_rider_cost = _Parsed(_to_float, "AllDayParking", "NonRiderCost")
+    saturday_rider_cost = _Parsed(_to_float, "AllDayParking", "SaturdayRiderCost")
+    saturday_non_rider_cost = _Parsed(
+        _to_float, "AllDayParking", "SaturdayNonRiderCost"
+    )
+    short_term_total = _Parsed(_to_int, "ShortTermParking", "TotalCount")
+
+    def _keys(self) -> Iterable[Hashable]:
+        return (self.station_code,)
+
+
+class Entrance(_Model):
+    """A station entrance (jStationEntrances "Entrances" item)."""
+
+    __slots__ = ("_lat", "_lon")
+
+    id = _Field("ID")
+    name = _Field("Name")
+    description = _Field("Description")
+    station_code_1 = _Field("StationCode1")
+    station_code_2 = _Field("StationCode2")
+
+    lat = _Parsed(_to_float, "Lat")
+    lon = _Parsed(_to_float, "Lon")
+
+    @property
+    def station_codes(self) -> Tuple[str, ...]:
+        """The stations the entrance serves."""
+        return tuple(
+            code for code in (self.station_code_1, self.station_code_2) if code
+        )
+
+    def _keys(self) -> Iterable[Hashable]:
+        return self.station_codes
+
+
+M = TypeVar("M", bound=_Model)
+C = TypeVar("C", bound="_Collection")
+
+
+class _Collection(Generic[M]):
+    """
+    A sequence of models built from one response, with a keyed index built on first
+    use.
+    """
+
+    __slots__ = ("_items", "_index")
+
+    _model: Type[_Model] = _Model
+    _response_key: Optional[str] = None
+
+    def __init__(self, items: Iterable[dict] = ()) -> None:
+        model = self._model
+        self._items: List[M] = [model(item) for item in items]  # type: ignore
+        self._index: Optional[Dict[Hashable, List[M]]] = None
+
+    @classmethod
+    def from_response(cls: Type[C], response: Optional[dict]) -> C:
+        """
+        Wraps a response as returned by the matching wmata2.rail function.
+
+        Args:
+            response (dict, optional): The response. None (a failed request) gives an
+                empty collection.
+
+        Returns:
+            The collection.
+        """
+        if not response:
+            return cls()
+        return cls(response.get(cls._response_key) or ())  # type: ignore
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[M]:
+        return iter(self._items)
+
+    @overload
+    def __getitem__(self, i: int) -> M: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[M]: ...
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[M, List[M]]:
+        return self._items[i]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({len(self._items)} items)"
+
+    def _get_index(self) -> Dict[Hashable, List[M]]:
+        if self._index is None:
+            index: Dict[Hashable, List[M]] = {}
+            for item in self._items:
+                for key in item._keys():
+                    bucket = index.get(key)
+                    if bucket is None:
+                        index[key] = [item]
+                    else:
+                        bucket.append(item)
+            self._index = index
+        return self._index
+
+    def keys(self) -> Iterable[Hashable]:
+        """The keys the items are indexed under."""
+        return self._get_index().keys()
+
+    def get(self, key: Hashable) -> Optional[M]:
+        """Returns the first item indexed under key, or None."""
+        bucket = self._get_index().get(key)
+        return bucket[0] if bucket else None
+
+    def all(self, key: Hashable) -> List[M]:
+        """Returns every item indexed under key, in response order."""
+        return list(self._get_index().get(key, ()))
+
+
+class Predictions(_Collection[Prediction]):
+    """GetPrediction response. Keyed by the station code (LocationCode)."""
+
+    __slots__ = ()
+    _model = Prediction
+    _response_key = "Trains"
+
+
+class StationToStationInfos(_Collection[StationToStationInfo]):
+    """jSrcStationToDstStationInfo response. Keyed by (source, destination)."""
+
+    __slots__ = ()
+    _model = StationToStationInfo
+    _response_key = "StationToStationInfos"
+
+
+class TrainPositions(_Collection[TrainPosition]):
+    """TrainPositions response. Keyed by train id."""
+
+    __slots__ = ()
+    _model = TrainPosition
+    _response_key = "TrainPositions"
+
+
+class Lines(_Collection[Line]):
+    """jLines response. Keyed by line code."""
+
+    __slots__ = ()
+    _model = Line
+    _response_key = "Lines"
+
+
+class Stations(_Collection[Station]):
+    """jStations response. Keyed by station code."""
+
+    __slots__ = ()
+    _model = Station
+    _response_key = "Stations"
+
+
+class ParkingInfos(_Collection[ParkingInfo]):
+    """jStationParking response. Keyed by station code."""
+
+    __slots__ = ()
+    _model = ParkingInfo
+    _response_key = "StationsParking"
+
+
+class Entrances(_Collection[Entrance]):
+    """jStationEntrances response. Keyed by each station code an entrance serves."""
+
+    __slots__ = ()
+    _model = Entrance
+    _response_key = "Entrances"
@@ -0,0 +1,363 @@
+"""
+An offline Metrorail network graph with all-pairs shortest paths precomputed.
+
+get_path_between_stations asks the API for one pair at a time and only for stations on
+the same line. RailNetwork builds the whole network once, from the standard routes
+response (get_standard_routes) or from the compiled static GTFS feed, and answers path,
+transfer and station-sequence queries for any pair locally, across lines.
+
+The graph has one node per (station code, line code): consecutive stations of a line
+are joined by an edge of cost 1, and the nodes of a transfer station (several lines at
+one code, or several codes at one physical station, e.g. Metro Center A01/C01) are
+joined by edges of cost transfer_cost. Floyd-Warshall, vectorized over NumPy matrices,
+computes every shortest path up front and keeps an int16 predecessor matrix, so a
+query walks the predecessors of its pair: O(path length), with no network call.
+
+Requires numpy, which is otherwise an optional dependency of wmata2.
+
+Classes:
+- Leg: A ride along one line between two stations.
+- RailNetwork: The graph and its all-pairs shortest paths.
+
+Functions:
+- get_rail_network(API_KEY: str) -> RailNetwork: Builds the network from
+  get_standard_routes.
+
+Example:
+    from wmata2.rail.network import RailNetwork
+    network = RailNetwork.from_static()
+    network.transfers("K08", "B11")   # 1
+    for leg in network.legs("K08", "B11"):
+        print(leg.line_code, leg.from_station, leg.to_station)
+"""
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+# Physical stations served under more than one station code.
+STATION_COMPLEXES: Tuple[Tuple[str, ...], ...] = (
+    ("A01", "C01"),  # Metro Center
+    ("B01", "F01"),  # Gallery Place
+    ("B06", "E06"),  # Fort Totten
+    ("D03", "F03"),  # L'Enfant Plaza
+)
+
+# Static GTFS route_id -> line code, for feeds that name routes in full.
+ROUTE_LINE_CODES: Dict[str, str] = {
+    "RED": "RD",
+    "ORANGE": "OR",
+    "SILVER": "SV",
+    "BLUE": "BL",
+    "YELLOW": "YL",
+    "GREEN": "GR",
+}
+
+Node = Tuple[str, str]
+
+
+class Leg(NamedTuple):
+    """A ride along one line. stops is the number of stations travelled."""
+
+    line_code: str
+    from_station: str
+    to_station: str
+    stops: int
+
+
+class RailNetwork:
+    """
+    The rail network graph and its all-pairs shortest paths.
+
+    Args:
+        line_stations (Dict[str, Sequence[Sequence[str]]]): Line code -> station code
+            sequences run by that line (one per pattern, in either direction).
+        complexes (Iterable[Sequence[str]], optional): Groups of station codes that
+            are one physical station. Defaults to STATION_COMPLEXES.
+        transfer_cost (float, optional): Cost of changing lines, in stations.
+            Defaults to 2.
+
+    Raises:
+        ValueError: If the network has more nodes than an int16 can index.
+    """
+
+    def __init__(
+        self,
+        line_stations: Dict[str, Sequence[Sequence[str]]],
+        complexes: Iterable[Sequence[str]] = STATION_COMPLEXES,
+        transfer_cost: float = 2.0,
+    ) -> None:
+        self.transfer_cost = transfer_cost
+        self.nodes: List[Node] = []
+        self._node_index: Dict[Node, int] = {}
+        self._station_nodes: Dict[str, List[int]] = {}
+        self.lines: Dict[str, List[str]] = {}
+        edges: List[Tuple[int, int, float]] = []
+
+        for line_code, patterns in line_stations.items():
+            for stations in patterns:
+                previous = None
+                for code in stations:
+                    node = self._add_node(code, line_code)
+                    if previous is not None and previous != node:
+                        edges.append((previous, node, 1.0))
+                        edges.append((node, previous, 1.0))
+                    previous = node
+            longest = max(patterns, key=len, default=())
+            self.lines[line_code] = list(dict.fromkeys(longest))
+
+        self._complex: Dict[str, str] = {}
+        for group in complexes:
+            present = [code for code in group if code in self._station_nodes]
+            for code in present:
+                self._complex[code] = present[0]
+
+        # Transfer edges between every pair of nodes of a physical station.
+        by_place: Dict[str, List[int]] = {}
+        for code, indexes in self._station_nodes.items():
+            by_place.setdefault(self._complex.get(code, code), []).extend(indexes)
+        self.transfer_stations: List[str] = sorted(
+            code
+            for code in self._station_nodes
+            if len(by_place[self._complex.get(code, code)]) > 1
+        )
+        for indexes in by_place.values():
+            for a in indexes:
+                for b in indexes:
+                    if a != b:
+                        edges.append((a, b, transfer_cost))
+
+        self._solve(edges)
+        logger.debug(
+            f"Rail network: {len(self._station_nodes)} stations, {len(self.lines)} "
+            f"lines, {len(self.nodes)} nodes"
+        )
+
+    def _add_node(self, code: str, line_code: str) -> int:
+        node = (code, line_code)
+        index = self._node_index.get(node)
+        if index is None:
+            index = self._node_index[node] = len(self.nodes)
+            self.nodes.append(node)
+            self._station_nodes.setdefault(code, []).append(index)
+        return index
+
+    def _solve(self, edges: List[Tuple[int, int, float]]) -> None:
+        """All-pairs shortest paths by Floyd-Warshall, one vectorized step per node."""
+        n = len(self.nodes)
+        if n > np.iinfo(np.int16).max:
+            raise ValueError(f"{n} nodes do not fit an int16 predecessor matrix")
+        dist = np.full((n, n), np.inf)
+        pred = np.full((n, n), -1, np.int16)
+        for a, b, cost in edges:
+            if cost < dist[a, b]:
+                dist[a, b] = cost
+                pred[a, b] = a
+        np.fill_diagonal(dist, 0.0)
+        np.fill_diagonal(pred, np.arange(n, dtype=np.int16))
+
+        for k in range(n):
+            via = dist[:, k, None] + dist[None, k, :]
+            better = via < dist
+            dist = np.where(better, via, dist)
+            # The last hop into j through k is the last hop of the k -> j path.
+            pred = np.where(better, pred[k][None, :], pred)
+        self.dist = dist
+        self.pred = pred
+
+    @classmethod
+    def from_standard_routes(
+        cls, response: dict, transfer_cost: float = 2.0
+    ) -> "RailNetwork":
+        """
+        Builds the network from a get_standard_routes response: the station codes of
+        each line's track circuits, in sequence.
+
+        Args:
+            response (dict): The StandardRoutes response.
+            transfer_cost (float, optional): Cost of changing lines, in stations.
+                Defaults to 2.
+
+        Returns:
+            RailNetwork: The network.
+        """
+        line_stations: Dict[str, List[List[str]]] = {}
+        for route in response.get("StandardRoutes", ()):
+            circuits = sorted(route.get("TrackCircuits", ()), key=lambda c: c["SeqNum"])
+            stations = [c["StationCode"] for c in circuits if c.get("StationCode")]
+            line_stations.setdefault(route["LineCode"], []).append(stations)
+        return cls(line_stations, transfer_cost=transfer_cost)
+
+    @classmethod
+    def from_static(
+        cls,
+        feed: str = "rail",
+        directory: Optional[str] = None,
+        transfer_cost: float = 2.0,
+    ) -> "RailNetwork":
+        """
+        Builds the network from the compiled static GTFS feed: the platform sequence
+        of every distinct trip pattern of each route. Station complexes are taken from
+        parent stations named after several codes (e.g. STN_A01_C01), in addition to
+        STATION_COMPLEXES.
+
+        Args:
+            feed (str, optional): The compiled feed. Defaults to "rail".
+            directory (str, optional): Compiled feed directory. Defaults to
+                gtfs_static.compiled_feed_dir(feed).
+            transfer_cost (float, optional): Cost of changing lines, in stations.
+                Defaults to 2.
+
+        Returns:
+            RailNetwork: The network.
+
+        Raises:
+            FileNotFoundError: If the feed has not been compiled.
+        """
+        from ..gtfs_static import load_table
+
+        trips = load_table(feed, "trips", directory)
+        stop_times = load_table(feed, "stop_times", directory)
+        stops = load_table(feed, "stops", directory)
+
+        # Platform stop_id -> station code, through its parent station.
+        code_of: Dict[str, str] = {}
+        complexes = list(STATION_COMPLEXES)
+        parents = stops.column("parent_station")
+        for stop_id, parent in zip(stops.column("stop_id"), parents):
+            if parent and parent.startswith("STN_"):
+                codes = parent[4:].split("_")
+                code_of[stop_id] = codes[0]
+                if stop_id.startswith("PF_") and stop_id[3:6] in codes:
+                    code_of[stop_id] = stop_id[3:6]
+                if len(codes) > 1:
+                    complexes.append(tuple(codes))
+
+        stop_ids = stop_times.column("stop_id")
+        line_stations: Dict[str, List[List[str]]] = {}
+        seen = set()
+        for trip_id, route_id in zip(trips.column("trip_id"), trips.column("route_id")):
+            rows = stop_times.rows_for("trip_id", trip_id)
+            pattern = tuple(stop_ids[row] for row in rows)
+            if (route_id, pattern) in seen:
+                continue
+            seen.add((route_id, pattern))
+            stations = [code_of[s] for s in pattern if s in code_of]
+            line_code = ROUTE_LINE_CODES.get(route_id.upper(), route_id)
+            line_stations.setdefault(line_code, []).append(stations)
+        return cls(line_stations, complexes, transfer_cost)
+
+    def _nodes_of(self, station_code: str) -> List[int]:
+        nodes = self._station_nodes.get(station_code)
+        if nodes is None:
+            raise ValueError(f"No station found for code: {station_code}")
+        return nodes
+
+    def _endpoints(self, start: str, end: str) -> Tuple[int, int]:
+        """The (node, node) pair of two stations with the cheapest path."""
+        starts, ends = self._nodes_of(start), self._nodes_of(end)
+        costs = self.dist[np.ix_(starts, ends)]
+        i, j = np.unravel_index(np.argmin(costs), costs.shape)
+        return starts[i], ends[j]
+
+    def path(self, start: str, end: str) -> List[Node]:
+        """
+        Returns the shortest path between two stations as (station code, line code)
+        nodes, transfers included. Empty if the stations are not connected.
+
+        Raises:
+            ValueError: If either station code is unknown.
+        """
+        a, b = self._endpoints(start, end)
+        if not np.isfinite(self.dist[a, b]):
+            return []
+        pred = self.pred[a]
+        indexes = [b]
+        while b != a:
+            b = int(pred[b])
+            indexes.append(b)
+        return [self.nodes[i] for i in reversed(indexes)]
+
+    def station_sequence(self, start: str, end: str) -> List[str]:
+        """
+        Returns the station codes passed through between two stations, both included.
+        A transfer within a station complex keeps the code first arrived at.
+
+        Raises:
+            ValueError: If either station code is unknown.
+        """
+        sequence: List[str] = []
+        for code, _ in self.path(start, end):
+            if not sequence or self._place(code) != self._place(sequence[-1]):
+                sequence.append(code)
+        return sequence
+
+    def _place(self, code: str) -> str:
+        return self._complex.get(code, code)
+
+    def legs(self, start: str, end: str) -> List[Leg]:
+        """
+        Returns the rides of the shortest path between two stations, one per line.
+
+        Raises:
+            ValueError: If either station code is unknown.
+        """
+        legs: List[Leg] = []
+        path = self.path(start, end)
+        i = 0
+        while i < len(path) - 1:
+            code, line_code = path[i]
+            j = i
+            while j + 1 < len(path) and path[j + 1][1] == line_code:
+                j += 1
+            if j > i:
+                legs.append(Leg(line_code, code, path[j][0], j - i))
+            i = j + 1 if j > i else i + 1
+        return legs
+
+    def transfers(self, start: str, end: str) -> Optional[int]:
+        """
+        Returns how many times the shortest path changes lines, or None if the
+        stations are not connected.
+
+        Raises:
+            ValueError: If either station code is unknown.
+        """
+        path = self.path(start, end)
+        if not path:
+            return None
+        return sum(1 for a, b in zip(path, path[1:]) if a[1] != b[1])
+
+    def stops(self, start: str, end: str) -> Optional[int]:
+        """
+        Returns how many stations the shortest path travels, or None if the stations
+        are not connected.
+
+        Raises:
+            ValueError: If either station code is unknown.
+        """
+        sequence = self.station_sequence(start, end)
+        return len(sequence) - 1 if sequence else None
+
+
+def get_rail_network(API_KEY: str, transfer_cost: float = 2.0) -> RailNetwork:
+    """
+    Fetches the standard routes and builds the rail network from them.
+
+    Args:
+        API_KEY (str | APIKeyPool): The API key to use for authentication.
+        transfer_cost (float, optional): Cost of changing lines, in stations.
+            Defaults to 2.
+
+    Returns:
+        RailNetwork: The network. Empty if the routes could not be retrieved.
+    """
+    from .positions import get_standard_routes
+
+    return RailNetwork.from_standard_routes(
+        get_standard_routes(API_KEY) or {}, transfer_cost
+    )
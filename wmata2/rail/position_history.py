@@ -0,0 +1,428 @@
+"""
+A compact columnar store for train position history.
+
+Keeping hours of get_live_trains_positions snapshots as lists of dicts costs hundreds
+of bytes per observation. PositionHistory stores each observation as one row across
+typed, growable array.array columns instead, about 30 bytes per row:
+
+- time: int32 seconds since the store's base time
+- train id, train number, line, destination and service type: dictionary-encoded to
+  small integer codes
+- circuit id and seconds at location: int32; direction and car count: int8
+
+Rows are appended snapshot by snapshot, and a snapshot older than the last one is
+rejected, so time is non-decreasing and a time slice is a binary search. A per-train
+row index makes trajectories a direct gather. With a spill directory configured, the
+in-memory rows are written out as a segment of raw column files, with that segment's
+per-train row index, whenever they reach spill_rows, and queries read back only the
+segments that overlap the requested time range or contain the requested train. A
+trajectory reads just that train's rows from the memory mapped column files.
+
+Classes:
+- PositionHistory: The store.
+
+Example:
+    from wmata2.rail.position_history import PositionHistory
+    history = PositionHistory(spill_dir="/var/lib/wmata/positions")
+    history.append_snapshot(get_live_trains_positions(API_KEY))
+    ...
+    path = history.trajectory("123")
+    window = history.time_slice(start, end)
+"""
+
+import json, mmap, os, time
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+# Column name, array typecode, TrainPositions field, dictionary name (None when the
+# value is stored directly).
+SCHEMA: Tuple[Tuple[str, str, Optional[str], Optional[str]], ...] = (
+    ("time", "i", None, None),
+    ("train_id", "I", "TrainId", "train_id"),
+    ("train_number", "I", "TrainNumber", "train_number"),
+    ("line_code", "B", "LineCode", "line_code"),
+    ("destination", "H", "DestinationStationCode", "destination"),
+    ("service_type", "B", "ServiceType", "service_type"),
+    ("circuit_id", "i", "CircuitId", None),
+    ("direction", "b", "DirectionNum", None),
+    ("car_count", "b", "CarCount", None),
+    ("seconds_at_location", "i", "SecondsAtLocation", None),
+)
+
+DICTIONARIES_FILE = "dictionaries.json"
+SEGMENT_META_FILE = "meta.json"
+# Per-segment train index: the rows of each train in meta["trains"] order, and the
+# offset of each train's run in them.
+TRAIN_ROWS_FILE = "train_rows.bin"
+TRAIN_OFFSETS_FILE = "train_offsets.bin"
+
+
+class _Dictionary:
+    """Maps values to dense integer codes and back."""
+
+    __slots__ = ("values", "codes")
+
+    def __init__(self, values: Optional[List[Any]] = None) -> None:
+        self.values: List[Any] = list(values or ())
+        self.codes: Dict[Any, int] = {v: i for i, v in enumerate(self.values)}
+
+    def encode(self, value: Any) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class PositionHistory:
+    """
+    Columnar history of train positions.
+
+    Args:
+        spill_dir (str, optional): Directory for spilled segments. When None,
+            everything stays in memory. An existing directory is reopened, so history
+            survives restarts.
+        spill_rows (int, optional): In-memory rows that trigger a spill. Defaults to
+            1,000,000.
+        base_time (int, optional): POSIX time stored times are relative to. Defaults
+            to the first snapshot's time, or to the reopened store's base.
+    """
+
+    def __init__(
+        self,
+        spill_dir: Optional[str] = None,
+        spill_rows: int = 1_000_000,
+        base_time: Optional[int] = None,
+    ) -> None:
+        self.spill_dir = spill_dir
+        self.spill_rows = spill_rows
+        self.base_time = base_time
+        self._columns: Dict[str, array] = {
+            name: array(code) for name, code, _, _ in SCHEMA
+        }
+        self._dictionaries: Dict[str, _Dictionary] = {
+            d: _Dictionary() for _, _, _, d in SCHEMA if d is not None
+        }
+        self._train_rows: Dict[int, array] = {}
+        self._segments: List[Dict[str, Any]] = []
+        self._last_time: Optional[int] = None
+
+        if spill_dir is not None:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._reopen()
+
+    def _reopen(self) -> None:
+        """Loads the dictionaries and segment metadata of an existing spill dir."""
+        path = os.path.join(self.spill_dir, DICTIONARIES_FILE)  # type: ignore
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            saved = json.load(f)
+        self.base_time = saved["base_time"]
+        for name, values in saved["dictionaries"].items():
+            self._dictionaries[name] = _Dictionary(values)
+        for segment in sorted(saved["segments"]):
+            with open(
+                os.path.join(self.spill_dir, segment, SEGMENT_META_FILE),  # type: ignore
+                encoding="utf-8",
+            ) as f:
+                meta = json.load(f)
+            meta["name"] = segment
+            self._segments.append(meta)
+        if self._segments:
+            self._last_time = self._segments[-1]["time_max"]
+
+    def __len__(self) -> int:
+        """Returns the number of rows, in memory and spilled."""
+        return len(self._columns["time"]) + sum(s["rows"] for s in self._segments)
+
+    def nbytes(self) -> int:
+        """Returns the approximate memory held by in-memory rows and indexes."""
+        total = sum(c.itemsize * len(c) for c in self._columns.values())
+        total += sum(r.itemsize * len(r) for r in self._train_rows.values())
+        return total
+
+    def append_snapshot(self, positions: dict, now: Optional[float] = None) -> int:
+        """
+        Appends one get_live_trains_positions snapshot.
+
+        A train with a field that does not fit its column (e.g. a CarCount of 300, or
+        a string circuit id) is skipped with a warning, leaving every column as it
+        was, and the rest of the snapshot is kept.
+
+        Args:
+            positions (dict): The TrainPositions response.
+            now (float, optional): POSIX time of the snapshot. Defaults to the current
+                time.
+
+        Returns:
+            int: Number of rows added.
+
+        Raises:
+            ValueError: If the snapshot is older than the last one appended, or than
+                the store's base time allows.
+        """
+        now = int(time.time() if now is None else now)
+        if self.base_time is None:
+            self.base_time = now
+        offset = now - self.base_time
+        if not -(2**31) <= offset < 2**31:
+            raise ValueError(f"Snapshot time {now} is out of range of the store")
+        if self._last_time is not None and offset < self._last_time:
+            raise ValueError(
+                f"Snapshot time {now} is older than the last snapshot "
+                f"({self.base_time + self._last_time}); snapshots must be appended "
+                "in time order"
+            )
+        self._last_time = offset
+
+        columns = self._columns
+        dictionaries = self._dictionaries
+        train_column = columns["train_id"]
+        added = 0
+        for train in positions.get("TrainPositions") or ():
+            row = len(train_column)
+            try:
+                for name, _, field, dictionary in SCHEMA:
+                    if field is None:
+                        columns[name].append(offset)
+                    elif dictionary is not None:
+                        columns[name].append(
+                            dictionaries[dictionary].encode(train.get(field))
+                        )
+                    else:
+                        value = train.get(field)
+                        columns[name].append(-1 if value is None else value)
+            except (OverflowError, TypeError) as e:
+                # Roll the columns written so far back, so they stay aligned.
+                for values in columns.values():
+                    del values[row:]
+                logger.warning(f"Skipping train position {train!r}|| Error: {e}")
+                continue
+            train_code = train_column[row]
+            rows = self._train_rows.get(train_code)
+            if rows is None:
+                self._train_rows[train_code] = array("I", (row,))
+            else:
+                rows.append(row)
+            added += 1
+
+        if self.spill_dir is not None and len(train_column) >= self.spill_rows:
+            self.spill()
+        return added
+
+    def spill(self) -> None:
+        """Writes the in-memory rows to a new segment and releases them."""
+        if self.spill_dir is None or not len(self._columns["time"]):
+            return
+        name = f"segment_{len(self._segments):06d}"
+        path = os.path.join(self.spill_dir, name)
+        os.makedirs(path, exist_ok=True)
+        for column, values in self._columns.items():
+            with open(os.path.join(path, f"{column}.bin"), "wb") as f:
+                values.tofile(f)
+
+        trains = sorted(self._train_rows)
+        train_rows, train_offsets = array("I"), array("I", (0,))
+        for code in trains:
+            train_rows.extend(self._train_rows[code])
+            train_offsets.append(len(train_rows))
+        with open(os.path.join(path, TRAIN_ROWS_FILE), "wb") as f:
+            train_rows.tofile(f)
+        with open(os.path.join(path, TRAIN_OFFSETS_FILE), "wb") as f:
+            train_offsets.tofile(f)
+
+        times = self._columns["time"]
+        meta = {
+            "rows": len(times),
+            "time_min": times[0],
+            "time_max": times[-1],
+            "trains": trains,
+        }
+        with open(os.path.join(path, SEGMENT_META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        meta["name"] = name
+        self._segments.append(meta)
+        self._write_dictionaries()
+
+        self._columns = {c: array(code) for c, code, _, _ in SCHEMA}
+        self._train_rows = {}
+        logger.debug(f"Spilled {meta['rows']} position rows to {path}")
+
+    def _write_dictionaries(self) -> None:
+        path = os.path.join(self.spill_dir, DICTIONARIES_FILE)  # type: ignore
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "base_time": self.base_time,
+                    "dictionaries": {
+                        name: d.values for name, d in self._dictionaries.items()
+                    },
+                    "segments": [s["name"] for s in self._segments],
+                },
+                f,
+            )
+        os.replace(path + ".tmp", path)
+
+    def _load_segment(self, meta: Dict[str, Any]) -> Dict[str, array]:
+        path = os.path.join(self.spill_dir, meta["name"])  # type: ignore
+        columns = {}
+        for name, code, _, _ in SCHEMA:
+            values = array(code)
+            with open(os.path.join(path, f"{name}.bin"), "rb") as f:
+                values.fromfile(f, meta["rows"])
+            columns[name] = values
+        return columns
+
+    def _read_rows(
+        self,
+        meta: Dict[str, Any],
+        rows: Sequence[int],
+        names: Optional[Sequence[str]] = None,
+    ) -> Dict[str, array]:
+        """
+        Reads the given rows of a spilled segment's columns (all of them by default).
+
+        The column files are memory mapped, so only the pages holding those rows are
+        read from disk.
+        """
+        path = os.path.join(self.spill_dir, meta["name"])  # type: ignore
+        columns = {}
+        for name, code, _, _ in SCHEMA:
+            if names is not None and name not in names:
+                continue
+            with open(os.path.join(path, f"{name}.bin"), "rb") as f, mmap.mmap(
+                f.fileno(), 0, access=mmap.ACCESS_READ
+            ) as mapped:
+                with memoryview(mapped) as raw, raw.cast(code) as values:
+                    columns[name] = array(code, [values[r] for r in rows])
+        return columns
+
+    def _load_train_rows(self, meta: Dict[str, Any], code: int) -> Optional[array]:
+        """Reads a train's rows in a spilled segment, or None if it has none there."""
+        trains = meta["trains"]
+        i = bisect_left(trains, code)
+        if i == len(trains) or trains[i] != code:
+            return None
+        path = os.path.join(self.spill_dir, meta["name"])  # type: ignore
+        offsets = array("I")
+        with open(os.path.join(path, TRAIN_OFFSETS_FILE), "rb") as f:
+            f.seek(i * offsets.itemsize)
+            offsets.fromfile(f, 2)
+        rows = array("I")
+        with open(os.path.join(path, TRAIN_ROWS_FILE), "rb") as f:
+            f.seek(offsets[0] * rows.itemsize)
+            rows.fromfile(f, offsets[1] - offsets[0])
+        return rows
+
+    def _decode(
+        self, parts: Sequence[Tuple[Dict[str, array], Sequence[int]]]
+    ) -> Dict[str, Any]:
+        """Gathers the selected rows of each part into decoded output columns."""
+        base = self.base_time or 0
+        out: Dict[str, Any] = {}
+        for name, code, _, dictionary in SCHEMA:
+            if dictionary is not None:
+                values = self._dictionaries[dictionary].values
+                out[name] = [
+                    values[c]
+                    for columns, rows in parts
+                    for c in _take(columns[name], rows)
+                ]
+            elif name == "time":
+                out[name] = array(
+                    "q",
+                    (
+                        base + t
+                        for columns, rows in parts
+                        for t in _take(columns[name], rows)
+                    ),
+                )
+            else:
+                out[name] = array(code)
+                for columns, rows in parts:
+                    out[name].extend(_take(columns[name], rows))
+        return out
+
+    def trajectory(
+        self, train_id: str, start: Optional[float] = None, end: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Returns every observation of one train, oldest first.
+
+        Args:
+            train_id (str): The TrainId.
+            start (float, optional): Earliest POSIX time to include.
+            end (float, optional): Latest POSIX time to include.
+
+        Returns:
+            dict: Column name -> values. "time" holds POSIX seconds; dictionary
+                encoded columns are decoded back to their original values.
+        """
+        code = self._dictionaries["train_id"].codes.get(train_id)
+        parts = []
+        if code is not None:
+            lo, hi = self._offset_range(start, end)
+            for meta in self._segments:
+                if meta["time_max"] < lo or meta["time_min"] > hi:
+                    continue
+                segment_rows = self._load_train_rows(meta, code)
+                if segment_rows is None:
+                    continue
+                # A train's rows are in time order, so those in range are one run.
+                times = self._read_rows(meta, segment_rows, ("time",))["time"]
+                first, last = bisect_left(times, lo), bisect_right(times, hi)
+                if first == last:
+                    continue
+                others = [name for name, _, _, _ in SCHEMA if name != "time"]
+                columns = self._read_rows(meta, segment_rows[first:last], others)
+                columns["time"] = times[first:last]
+                parts.append((columns, range(last - first)))
+            times = self._columns["time"]
+            rows = [r for r in self._train_rows.get(code, ()) if lo <= times[r] <= hi]
+            parts.append((self._columns, rows))
+        return self._decode(parts)
+
+    def time_slice(self, start: float, end: float) -> Dict[str, Any]:
+        """
+        Returns every observation with start <= time <= end, oldest first.
+
+        Args:
+            start (float): Earliest POSIX time to include.
+            end (float): Latest POSIX time to include.
+
+        Returns:
+            dict: Column name -> values, as for trajectory.
+        """
+        lo, hi = self._offset_range(start, end)
+        parts = []
+        for meta in self._segments:
+            if meta["time_max"] < lo or meta["time_min"] > hi:
+                continue
+            columns = self._load_segment(meta)
+            parts.append((columns, _time_rows(columns["time"], lo, hi)))
+        parts.append((self._columns, _time_rows(self._columns["time"], lo, hi)))
+        return self._decode(parts)
+
+    def _offset_range(
+        self, start: Optional[float], end: Optional[float]
+    ) -> Tuple[int, int]:
+        base = self.base_time or 0
+        lo = -(2**31) if start is None else int(start) - base
+        hi = 2**31 - 1 if end is None else int(end) - base
+        return lo, hi
+
+
+def _time_rows(times: array, lo: int, hi: int) -> range:
+    return range(bisect_left(times, lo), bisect_right(times, hi))
+
+
+def _take(values: array, rows: Sequence[int]):
+    if isinstance(rows, range) and rows.step == 1:
+        return values[rows.start : rows.stop]
+    return (values[r] for r in rows)
@@ -9,9 +9,16 @@ Functions:
         Get standard train routes from WMATA API.
     get_track_circuits(API_KEY: str) -> dict:
         Get track circuits from WMATA API.
+    iter_live_trains_positions(API_KEY: str) -> Iterator[dict]:
+        Iterate live train positions as they are parsed from the response.
+    iter_standard_routes(API_KEY: str) -> Iterator[dict]:
+        Iterate standard train routes as they are parsed from the response.
+    iter_track_circuits(API_KEY: str) -> Iterator[dict]:
+        Iterate track circuits as they are parsed from the response.
 
 """
-from ..utilities import get_json_data
+from typing import Iterator
+from ..utilities import get_json_data, iter_json_items
 
 from logging import getLogger
 
@@ -76,3 +83,66 @@ def get_track_circuits(API_KEY: str) -> dict:
         URL=URL,
         function_desc="Get live train positions",
     )
+
+
+def iter_live_trains_positions(API_KEY: str) -> Iterator[dict]:
+    """Iterate live train positions as they are parsed from the response.
+
+    Args:
+        API_KEY (str): Your API Key.
+
+    Yields:
+        dict: One entry of the TrainPositions list.
+
+    """
+
+    URL = "/TrainPositions/TrainPositions?contentType=json"
+
+    return iter_json_items(
+        API_KEY=API_KEY,
+        URL=URL,
+        key="TrainPositions",
+        function_desc="Iterate live train positions",
+    )
+
+
+def iter_standard_routes(API_KEY: str) -> Iterator[dict]:
+    """Iterate standard train routes as they are parsed from the response.
+
+    Args:
+        API_KEY (str): Your API Key.
+
+    Yields:
+        dict: One entry of the StandardRoutes list.
+
+    """
+
+    URL = "/TrainPositions/StandardRoutes?contentType=json"
+
+    return iter_json_items(
+        API_KEY=API_KEY,
+        URL=URL,
+        key="StandardRoutes",
+        function_desc="Iterate standard routes",
+    )
+
+
+def iter_track_circuits(API_KEY: str) -> Iterator[dict]:
+    """Iterate track circuits as they are parsed from the response.
+
+    Args:
+        API_KEY (str): Your API Key.
+
+    Yields:
+        dict: One entry of the TrackCircuits list.
+
+    """
+
+    URL = "/TrainPositions/TrackCircuits?contentType=json"
+
+    return iter_json_items(
+        API_KEY=API_KEY,
+        URL=URL,
+        key="TrackCircuits",
+        function_desc="Iterate track circuits",
+    )
@@ -1,6 +1,7 @@
 """https://developer.wmata.com/docs/services/547636a6f9182302184cda78/operations/547636a6f918230da855363f"""
-import urllib
-from ..utilities import get_json_data
+import urllib.parse
+from typing import Iterator
+from ..utilities import get_json_data, iter_json_items
 
 
 def get_next_trains(API_KEY: str, STATION_CODE: str = "All") -> dict:
@@ -35,3 +36,30 @@ def get_next_trains(API_KEY: str, STATION_CODE: str = "All") -> dict:
         URL=URL,
         function_desc="Get real time next train predictions",
     )
+
+
+def iter_next_trains(API_KEY: str, STATION_CODE: str = "All") -> Iterator[dict]:
+    """
+    Yields real-time train predictions for the specified Metro station or all stations
+    one at a time as they are parsed from the response, without building the whole
+    document. Useful for the large "All" response.
+
+    Args:
+        API_KEY (str): The API key to use for authentication.
+        STATION_CODE (str, optional): The station code for the station to retrieve train
+            predictions for. Defaults to "All" to retrieve predictions for all stations.
+
+    Yields:
+        dict: One entry of the Trains list.
+
+    Raises:
+        Warning: If the function fails to retrieve the real-time train prediction data
+            from the API.
+    """
+    URL = "/StationPrediction.svc/json/GetPrediction/" + STATION_CODE
+    return iter_json_items(
+        API_KEY=API_KEY,
+        URL=URL,
+        key="Trains",
+        function_desc="Iterate real time next train predictions",
+    )
@@ -9,6 +9,7 @@ Functions:
 - get_station_info(API_KEY: str, STATION_CODE: str) -> dict: Get station information by station code.
 - get_station_list(API_KEY: str, LINE_CODE: str = "") -> dict: Get a list of stations for a specific rail line or all rail lines.
 - get_station_timing(API_KEY: str, STATION_CODE: str = "") -> dict: Get station arrival times by station code.
+- iter_all_station_entrances(API_KEY: str) -> Iterator[dict]: Iterate all station entrances as they are parsed.
 
 Example usage:
     import wmata_api
@@ -18,8 +19,9 @@ Example usage:
     station_timing = wmata_api.get_station_timing(api_key, 'A01')
 """
 
-import urllib
-from ..utilities import get_json_data
+import urllib.parse
+from typing import Iterator
+from ..utilities import get_json_data, iter_json_items
 
 from logging import getLogger
 
@@ -144,6 +146,25 @@ def get_station_entrances(
     )
 
 
+def iter_all_station_entrances(API_KEY: str) -> Iterator[dict]:
+    """
+    Iterate all station entrances as they are parsed from the response, without
+    building the whole document.
+
+    Args:
+        API_KEY (str): WMATA API key.
+
+    Yields:
+        dict: One entry of the Entrances list.
+    """
+    return iter_json_items(
+        API_KEY=API_KEY,
+        URL="/Rail.svc/json/jStationEntrances?",
+        key="Entrances",
+        function_desc="Iterate all station entrances",
+    )
+
+
 def get_station_info(API_KEY: str, STATION_CODE: str) -> dict:
     """Get station information by station code.
 
@@ -0,0 +1,292 @@
+"""
+Which scheduled trips run on a given date, precomputed from the static GTFS calendar.
+
+A GTFS trip runs on a date when its service_id is active: the date falls inside the
+service's calendar.txt range on one of its weekdays and calendar_dates.txt does not
+remove it, or calendar_dates.txt adds it. ServiceCalendar evaluates those rules once
+for every date the feed covers and stores the result as one integer bitset of active
+services per date. From that, the active trips of a date are computed on first request
+(the union of the trip rows of each active service) and cached, so "trips running
+today" and "departures at a stop today" never evaluate per-trip rules.
+
+Dates are service days. GTFS times past 24:00:00 belong to the previous service day,
+so departures() also includes the previous day's trips still running after midnight.
+
+Classes:
+- Departure: One scheduled departure of a trip from a stop.
+- ServiceCalendar: The date -> active services and trips index of a compiled feed.
+
+Example:
+    from wmata2.service_calendar import ServiceCalendar
+    calendar = ServiceCalendar("bus")
+    for departure in calendar.departures("1001234", after_s=8 * 3600)[:5]:
+        print(departure.trip_id, departure.time_s)
+"""
+
+from array import array
+from datetime import date, timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from .gtfs_static import StaticTable, load_table
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+SECONDS_PER_DAY = 24 * 3600
+
+_WEEKDAYS = (
+    "monday",
+    "tuesday",
+    "wednesday",
+    "thursday",
+    "friday",
+    "saturday",
+    "sunday",
+)
+
+# calendar_dates.txt exception types.
+SERVICE_ADDED = 1
+SERVICE_REMOVED = 2
+
+
+def _to_date(value: int) -> date:
+    """Converts a compiled GTFS YYYYMMDD integer to a date."""
+    return date(value // 10000, value // 100 % 100, value % 100)
+
+
+def _load_optional(
+    feed: str, table: str, directory: Optional[str]
+) -> Optional[StaticTable]:
+    try:
+        return load_table(feed, table, directory)
+    except FileNotFoundError:
+        logger.debug(f"No {table} table in the {feed} feed")
+        return None
+
+
+def _empty_table(name: str) -> StaticTable:
+    return StaticTable(name, 0, {}, {}, {})
+
+
+class Departure(NamedTuple):
+    """
+    A scheduled departure. time_s is in seconds after midnight of the requested service
+    day; 86400 and above is after the following midnight.
+    """
+
+    time_s: int
+    trip_id: str
+    route_id: str
+    stop_sequence: int
+
+
+class ServiceCalendar:
+    """
+    Date -> active service_id bitset and date -> active trips for a compiled feed.
+
+    Args:
+        feed (str, optional): "rail" or "bus". Defaults to "rail".
+        directory (str, optional): Compiled feed directory. Defaults to
+            gtfs_static.compiled_feed_dir(feed).
+        max_cached_days (int, optional): Days whose active trip arrays are kept.
+            Defaults to 8.
+
+    Raises:
+        FileNotFoundError: If the feed has not been compiled.
+    """
+
+    def __init__(
+        self,
+        feed: str = "rail",
+        directory: Optional[str] = None,
+        max_cached_days: int = 8,
+    ) -> None:
+        self.feed = feed
+        self.max_cached_days = max_cached_days
+        self.trips = load_table(feed, "trips", directory)
+        self._directory = directory
+        self._stop_times: Optional[StaticTable] = None
+        self._stop_time_trips: Optional[array] = None
+        self._trips_by_day: Dict[date, array] = {}
+        self._masks_by_day: Dict[date, bytearray] = {}
+        self._build(
+            _load_optional(feed, "calendar", directory),
+            _load_optional(feed, "calendar_dates", directory),
+        )
+
+    def _build(
+        self, calendar: Optional[StaticTable], calendar_dates: Optional[StaticTable]
+    ) -> None:
+        """Evaluates the calendar rules for every date the feed covers."""
+        # Either file may be omitted from a GTFS feed.
+        calendar = calendar or _empty_table("calendar")
+        calendar_dates = calendar_dates or _empty_table("calendar_dates")
+
+        service_ids = list(calendar.column("service_id"))
+        service_ids.extend(calendar_dates.column("service_id"))
+        self.service_ids: List[str] = list(dict.fromkeys(service_ids))
+        self._bit = {sid: 1 << i for i, sid in enumerate(self.service_ids)}
+
+        starts = calendar.column("start_date")
+        ends = calendar.column("end_date")
+        exception_dates = calendar_dates.column("date")
+        bounds = [d for d in list(starts) + list(ends) + list(exception_dates) if d > 0]
+        if not bounds:
+            self.first_day = self.last_day = date.today()
+            self._bits: List[int] = [0]
+            return
+        self.first_day = _to_date(min(bounds))
+        self.last_day = _to_date(max(bounds))
+        first = self.first_day.toordinal()
+        bits = [0] * (self.last_day.toordinal() - first + 1)
+
+        flags = [calendar.column(day, 0) for day in _WEEKDAYS]
+        for row, service_id in enumerate(calendar.column("service_id")):
+            if starts[row] <= 0 or ends[row] <= 0:
+                continue
+            bit = self._bit[service_id]
+            start, end = _to_date(starts[row]), _to_date(ends[row])
+            for weekday in range(7):
+                if flags[weekday][row] != 1:
+                    continue
+                day = start + timedelta(days=(weekday - start.weekday()) % 7)
+                for ordinal in range(day.toordinal(), end.toordinal() + 1, 7):
+                    bits[ordinal - first] |= bit
+
+        exception_types = calendar_dates.column("exception_type")
+        for row, service_id in enumerate(calendar_dates.column("service_id")):
+            if exception_dates[row] <= 0:
+                continue
+            i = _to_date(exception_dates[row]).toordinal() - first
+            if exception_types[row] == SERVICE_ADDED:
+                bits[i] |= self._bit[service_id]
+            elif exception_types[row] == SERVICE_REMOVED:
+                bits[i] &= ~self._bit[service_id]
+        self._bits = bits
+
+    def service_bits(self, day: Optional[date] = None) -> int:
+        """
+        Returns the bitset of services active on a day: bit i is set when
+        service_ids[i] runs. 0 outside the feed's date range.
+        """
+        day = date.today() if day is None else day
+        i = day.toordinal() - self.first_day.toordinal()
+        return self._bits[i] if 0 <= i < len(self._bits) else 0
+
+    def active_services(self, day: Optional[date] = None) -> List[str]:
+        """Returns the service_ids active on a day (defaults to today)."""
+        bits = self.service_bits(day)
+        return [sid for sid in self.service_ids if bits & self._bit[sid]]
+
+    def is_active(self, service_id: str, day: Optional[date] = None) -> bool:
+        """True if the service runs on the day (defaults to today)."""
+        return bool(self.service_bits(day) & self._bit.get(service_id, 0))
+
+    def _remember(self, cache: dict, day: date, value) -> None:
+        if len(cache) >= self.max_cached_days:
+            del cache[next(iter(cache))]
+        cache[day] = value
+
+    def active_trip_rows(self, day: Optional[date] = None) -> array:
+        """
+        Returns the sorted row numbers, in the trips table, of the trips running on a
+        service day (defaults to today). Cached per day.
+        """
+        day = date.today() if day is None else day
+        rows = self._trips_by_day.get(day)
+        if rows is None:
+            by_service = self.trips.index["service_id"]
+            collected: List[int] = []
+            for service_id in self.active_services(day):
+                collected.extend(by_service.get(service_id, ()))
+            collected.sort()
+            rows = array("i", collected)
+            self._remember(self._trips_by_day, day, rows)
+        return rows
+
+    def active_trip_ids(self, day: Optional[date] = None) -> List[str]:
+        """Returns the trip_ids running on a service day (defaults to today)."""
+        trip_ids = self.trips.column("trip_id")
+        return [trip_ids[row] for row in self.active_trip_rows(day)]
+
+    def _active_mask(self, day: date) -> bytearray:
+        """Returns a per-trip-row byte mask, 1 where the trip runs on the day."""
+        mask = self._masks_by_day.get(day)
+        if mask is None:
+            mask = bytearray(len(self.trips))
+            for row in self.active_trip_rows(day):
+                mask[row] = 1
+            self._remember(self._masks_by_day, day, mask)
+        return mask
+
+    def _stop_time_trip_rows(self) -> array:
+        """Maps each stop_times row to its trips row, computed once."""
+        if self._stop_time_trips is None:
+            self._stop_times = load_table(self.feed, "stop_times", self._directory)
+            trip_rows = self.trips.unique["trip_id"]
+            self._stop_time_trips = array(
+                "i",
+                (trip_rows.get(t, -1) for t in self._stop_times.column("trip_id")),
+            )
+        return self._stop_time_trips
+
+    def departures(
+        self,
+        stop_id: str,
+        day: Optional[date] = None,
+        after_s: int = 0,
+        before_s: Optional[int] = None,
+    ) -> List[Departure]:
+        """
+        Returns the scheduled departures from a stop on a service day, soonest first.
+
+        Trips of the previous service day that leave the stop after midnight are
+        included, with their times shifted onto the requested day.
+
+        Args:
+            stop_id (str): The GTFS stop_id.
+            day (date, optional): The service day. Defaults to today.
+            after_s (int, optional): Earliest departure, in seconds after midnight.
+                Defaults to 0.
+            before_s (int, optional): Latest departure, in seconds after midnight.
+                Defaults to no limit.
+
+        Returns:
+            List[Departure]: The departures.
+        """
+        day = date.today() if day is None else day
+        stop_time_trips = self._stop_time_trip_rows()
+        stop_times = self._stop_times
+        rows = stop_times.rows_for("stop_id", stop_id)  # type: ignore
+        if not rows:
+            return []
+
+        departure_times = stop_times.column("departure_time")  # type: ignore
+        sequences = stop_times.column("stop_sequence", -1)  # type: ignore
+        trip_ids = self.trips.column("trip_id")
+        route_ids = self.trips.column("route_id")
+        before_s = SECONDS_PER_DAY * 2 if before_s is None else before_s
+
+        today = self._active_mask(day)
+        yesterday = self._active_mask(day - timedelta(days=1))
+        result = []
+        for row in rows:
+            trip = stop_time_trips[row]
+            time_s = departure_times[row]
+            if trip < 0 or time_s < 0:
+                continue
+            if today[trip] and after_s <= time_s <= before_s:
+                result.append(
+                    Departure(time_s, trip_ids[trip], route_ids[trip], sequences[row])
+                )
+            if yesterday[trip] and time_s >= SECONDS_PER_DAY:
+                shifted = time_s - SECONDS_PER_DAY
+                if after_s <= shifted <= before_s:
+                    result.append(
+                        Departure(
+                            shifted, trip_ids[trip], route_ids[trip], sequences[row]
+                        )
+                    )
+        result.sort()
+        return result
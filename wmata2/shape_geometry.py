@@ -0,0 +1,423 @@
+"""
+Distance along route, distance to the next stop and ETA for a whole vehicle-positions
+snapshot, projected onto the static GTFS shapes with NumPy.
+
+ShapeGeometry loads the compiled shapes table once and flattens every polyline into
+segment arrays in a local planar frame (metres, equirectangular around the feed's
+centre): segment start point, direction vector, length, owning shape and the
+cumulative distance along the shape at the segment start. A uniform grid of
+bucket_m-sized cells indexes the segments; each segment is registered in every cell
+within bucket_m of its bounding box, so the segments near a point are those of the
+point's own cell.
+
+project() then works on arrays: for each point it shortlists the segments of its cell
+that belong to its shape, projects the point onto all of them at once and keeps the
+closest, falling back to every segment of the shape for points more than bucket_m off
+route. Stop positions along each trip's shape are computed the same way on first use
+and cached per stop pattern, and project_snapshot() finds each vehicle's next stop
+with one searchsorted over all patterns in the snapshot.
+
+ETAs are deliberately simple: distance to the next stop divided by the vehicle's
+reported speed, or by default_speed_mps when the feed does not report one.
+
+Requires numpy, which is otherwise an optional dependency of wmata2.
+
+Classes:
+- Projection: Points projected onto shapes.
+- SnapshotProjection: Per-vehicle distances and ETAs for a vehicle-positions feed.
+- ShapeGeometry: The segment arrays and bucket index of a compiled feed's shapes.
+
+Example:
+    from wmata2.rail.gtfs_rt import get_rail_rt_vehicle_positions
+    from wmata2.shape_geometry import ShapeGeometry
+
+    geometry = ShapeGeometry("rail")
+    snapshot = geometry.project_snapshot(get_rail_rt_vehicle_positions(API_KEY))
+    for vehicle, eta in zip(snapshot.vehicle_ids, snapshot.eta_s):
+        print(vehicle, eta)
+"""
+
+import math
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .gtfs_static import StaticTable, load_table
+
+from logging import getLogger
+
+logger = getLogger(__name__)
+
+EARTH_RADIUS_M = 6_371_000.0
+
+# Typical average speeds, including dwell time, used when a vehicle reports none.
+DEFAULT_SPEED_MPS = {"rail": 15.0, "bus": 5.0}
+
+# Grid cell coordinates are packed into one int64 key.
+_CELL_BITS = 32
+_CELL_OFFSET = 1 << (_CELL_BITS - 1)
+
+
+class Projection(NamedTuple):
+    """
+    Points projected onto shapes. NaN distances and -1 segments mark points whose
+    shape is unknown.
+    """
+
+    distance_m: np.ndarray  # Distance along the shape.
+    offset_m: np.ndarray  # Distance from the point to the shape.
+    segment: np.ndarray  # Index of the closest segment.
+
+
+class SnapshotProjection(NamedTuple):
+    """
+    One row per vehicle with a position in a vehicle-positions feed. Distances are in
+    metres and NaN where they cannot be computed: the trip or shape is unknown to the
+    static feed, or the vehicle is past its last stop.
+    """
+
+    vehicle_ids: List[Optional[str]]
+    trip_ids: List[Optional[str]]
+    shape_ids: List[Optional[str]]
+    distance_m: np.ndarray  # Distance traveled along the shape.
+    offset_m: np.ndarray  # Distance from the reported position to the shape.
+    next_stop_ids: List[Optional[str]]
+    to_next_stop_m: np.ndarray
+    eta_s: np.ndarray  # Seconds to the next stop.
+
+
+def _expand_ranges(starts: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    Returns (owner, position) for the concatenation of ranges
+    [starts[i], starts[i] + counts[i]): owner is i and position the range element.
+    """
+    owner = np.repeat(np.arange(len(counts)), counts)
+    within = np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+    return owner, np.repeat(starts, counts) + within
+
+
+class ShapeGeometry:
+    """
+    Segment arrays, cumulative distances and a spatial bucket index for every shape of
+    a compiled feed.
+
+    Args:
+        feed (str, optional): "rail" or "bus". Defaults to "rail".
+        directory (str, optional): Compiled feed directory. Defaults to
+            gtfs_static.compiled_feed_dir(feed).
+        bucket_m (float, optional): Grid cell size, which is also how far from a shape
+            a point may be and still be matched through the index. Defaults to 250.
+
+    Raises:
+        FileNotFoundError: If the feed or its shapes table has not been compiled.
+    """
+
+    def __init__(
+        self,
+        feed: str = "rail",
+        directory: Optional[str] = None,
+        bucket_m: float = 250.0,
+    ) -> None:
+        self.feed = feed
+        self.bucket_m = bucket_m
+        self._directory = directory
+        self.trips = load_table(feed, "trips", directory)
+        self._stop_times: Optional[StaticTable] = None
+        self._stops: Optional[StaticTable] = None
+        self._patterns: Dict[Tuple[int, Tuple[str, ...]], np.ndarray] = {}
+        self._trip_patterns: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+        self._build(load_table(feed, "shapes", directory))
+
+    def _build(self, shapes: StaticTable) -> None:
+        by_shape = shapes.index["shape_id"]
+        self.shape_ids: List[str] = list(by_shape)
+        self._shape_index = {sid: i for i, sid in enumerate(self.shape_ids)}
+        num_shapes = len(self.shape_ids)
+
+        rows = (
+            np.concatenate(
+                [np.asarray(by_shape[sid], np.int64) for sid in self.shape_ids]
+            )
+            if num_shapes
+            else np.zeros(0, np.int64)
+        )
+        lat = np.asarray(shapes.column("shape_pt_lat"), np.float64)[rows]
+        lon = np.asarray(shapes.column("shape_pt_lon"), np.float64)[rows]
+        counts = np.fromiter((len(by_shape[sid]) for sid in self.shape_ids), np.int64)
+        point_shape = np.repeat(np.arange(num_shapes), counts)
+
+        # Local planar frame around the feed's centre.
+        self._lat0 = float(lat.mean()) if len(lat) else 0.0
+        self._lon0 = float(lon.mean()) if len(lon) else 0.0
+        self._x_scale = (
+            math.radians(1) * EARTH_RADIUS_M * math.cos(math.radians(self._lat0))
+        )
+        x, y = self._to_xy(lat, lon)
+
+        first = np.flatnonzero(point_shape[1:] == point_shape[:-1])
+        self.seg_x = x[first]
+        self.seg_y = y[first]
+        self.seg_dx = x[first + 1] - self.seg_x
+        self.seg_dy = y[first + 1] - self.seg_y
+        self.seg_len = np.hypot(self.seg_dx, self.seg_dy)
+        self.seg_shape = point_shape[first]
+
+        # Segments are grouped by shape, in shape order.
+        shapes_range = np.arange(num_shapes)
+        self.shape_first_seg = np.searchsorted(self.seg_shape, shapes_range)
+        self.shape_end_seg = np.searchsorted(self.seg_shape, shapes_range, "right")
+        cumulative = np.concatenate(([0.0], np.cumsum(self.seg_len)))
+        shape_base = cumulative[self.shape_first_seg]
+        self.seg_dist = cumulative[:-1] - shape_base[self.seg_shape]
+        self.shape_length = cumulative[self.shape_end_seg] - shape_base
+
+        self._build_buckets()
+        logger.debug(
+            f"Shape geometry for {self.feed}: {num_shapes} shapes, "
+            f"{len(self.seg_len)} segments, {len(self._cell_keys)} cells"
+        )
+
+    def _to_xy(self, lat: np.ndarray, lon: np.ndarray) -> Tuple[np.ndarray, ...]:
+        """Converts degrees to metres in the local planar frame."""
+        y = (lat - self._lat0) * (math.radians(1) * EARTH_RADIUS_M)
+        return (lon - self._lon0) * self._x_scale, y
+
+    def _cell(self, coordinate: np.ndarray) -> np.ndarray:
+        return np.floor(coordinate / self.bucket_m).astype(np.int64)
+
+    def _build_buckets(self) -> None:
+        """Registers each segment in every cell within bucket_m of its bounding box."""
+        x0, x1 = self.seg_x, self.seg_x + self.seg_dx
+        y0, y1 = self.seg_y, self.seg_y + self.seg_dy
+        cx0 = self._cell(np.minimum(x0, x1) - self.bucket_m)
+        cx1 = self._cell(np.maximum(x0, x1) + self.bucket_m)
+        cy0 = self._cell(np.minimum(y0, y1) - self.bucket_m)
+        cy1 = self._cell(np.maximum(y0, y1) + self.bucket_m)
+        width = cx1 - cx0 + 1
+        segment, k = _expand_ranges(np.zeros_like(width), width * (cy1 - cy0 + 1))
+        keys = self._cell_key(
+            cx0[segment] + k % width[segment], cy0[segment] + k // width[segment]
+        )
+
+        order = np.argsort(keys, kind="stable")
+        keys = keys[order]
+        self._cell_segments = segment[order]
+        self._cell_keys, self._cell_starts, cell_counts = np.unique(
+            keys, return_index=True, return_counts=True
+        )
+        self._cell_ends = self._cell_starts + cell_counts
+
+    @staticmethod
+    def _cell_key(cx: np.ndarray, cy: np.ndarray) -> np.ndarray:
+        return ((cx + _CELL_OFFSET) << _CELL_BITS) | (cy + _CELL_OFFSET)
+
+    def shape_index(self, shape_ids: Sequence[Optional[str]]) -> np.ndarray:
+        """Maps shape_ids to shape indexes, -1 for unknown or missing ones."""
+        get = self._shape_index.get
+        return np.fromiter((get(sid, -1) for sid in shape_ids), np.int64)
+
+    def _closest(
+        self, px: np.ndarray, py: np.ndarray, point: np.ndarray, segment: np.ndarray
+    ) -> Tuple[np.ndarray, ...]:
+        """
+        Projects points onto candidate segments, given as (point, segment) pairs, and
+        returns (points, segments, t, squared distance) of the closest pair per point.
+        """
+        dx, dy = self.seg_dx[segment], self.seg_dy[segment]
+        rx, ry = px[point] - self.seg_x[segment], py[point] - self.seg_y[segment]
+        length2 = dx * dx + dy * dy
+        with np.errstate(invalid="ignore", divide="ignore"):
+            t = np.where(length2 > 0, (rx * dx + ry * dy) / length2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        ex, ey = rx - t * dx, ry - t * dy
+        squared = ex * ex + ey * ey
+
+        order = np.lexsort((squared, point))
+        ordered = point[order]
+        first = np.r_[True, ordered[1:] != ordered[:-1]]
+        best = order[first]
+        return ordered[first], segment[best], t[best], squared[best]
+
+    def project(
+        self, lat: Sequence[float], lon: Sequence[float], shapes: Sequence[int]
+    ) -> Projection:
+        """
+        Projects points onto given shapes.
+
+        Args:
+            lat (Sequence[float]): Latitudes, in degrees.
+            lon (Sequence[float]): Longitudes, in degrees.
+            shapes (Sequence[int]): Shape index per point (see shape_index); -1 for
+                points with no known shape.
+
+        Returns:
+            Projection: Distance along the shape, distance off it, closest segment.
+        """
+        px, py = self._to_xy(np.asarray(lat, np.float64), np.asarray(lon, np.float64))
+        shapes = np.asarray(shapes, np.int64)
+        n = len(px)
+        distance = np.full(n, np.nan)
+        offset = np.full(n, np.nan)
+        segments = np.full(n, -1, np.int64)
+        known = np.flatnonzero(shapes >= 0)
+
+        # Candidate segments: those of the point's cell on the point's shape.
+        keys = self._cell_key(self._cell(px[known]), self._cell(py[known]))
+        slot = np.searchsorted(self._cell_keys, keys)
+        slot = np.minimum(slot, max(len(self._cell_keys) - 1, 0))
+        found = (
+            self._cell_keys[slot] == keys
+            if len(self._cell_keys)
+            else np.zeros(len(keys), bool)
+        )
+        counts = np.where(found, self._cell_ends[slot] - self._cell_starts[slot], 0)
+        owner, position = _expand_ranges(
+            np.where(found, self._cell_starts[slot], 0), counts
+        )
+        candidate = self._cell_segments[position]
+        point = known[owner]
+        on_shape = self.seg_shape[candidate] == shapes[point]
+        pairs = [(point[on_shape], candidate[on_shape])]
+
+        # Points far from their shape: every segment of the shape.
+        matched = np.zeros(n, bool)
+        matched[point[on_shape]] = True
+        far = known[~matched[known]]
+        if len(far):
+            first = self.shape_first_seg[shapes[far]]
+            owner, candidate = _expand_ranges(
+                first, self.shape_end_seg[shapes[far]] - first
+            )
+            pairs.append((far[owner], candidate))
+
+        for point, candidate in pairs:
+            if not len(point):
+                continue
+            point, segment, t, squared = self._closest(px, py, point, candidate)
+            distance[point] = self.seg_dist[segment] + t * self.seg_len[segment]
+            offset[point] = np.sqrt(squared)
+            segments[point] = segment
+        return Projection(distance, offset, segments)
+
+    def _trip_pattern(self, trip_id: str) -> Optional[Tuple[int, Tuple[str, ...]]]:
+        """Returns (shape index, stop_ids) of a trip, or None if either is unknown."""
+        pattern = self._trip_patterns.get(trip_id)
+        if pattern is None:
+            row = self.trips.unique["trip_id"].get(trip_id)
+            if row is None:
+                return None
+            shape = self._shape_index.get(self.trips.column("shape_id")[row], -1)
+            if shape < 0:
+                return None
+            if self._stop_times is None:
+                self._stop_times = load_table(self.feed, "stop_times", self._directory)
+                self._stops = load_table(self.feed, "stops", self._directory)
+            stop_ids = self._stop_times.column("stop_id")
+            pattern = (
+                shape,
+                tuple(
+                    stop_ids[i] for i in self._stop_times.rows_for("trip_id", trip_id)
+                ),
+            )
+            self._trip_patterns[trip_id] = pattern
+        return pattern
+
+    def _stop_distances(self, pattern: Tuple[int, Tuple[str, ...]]) -> np.ndarray:
+        """Distance along the shape of each stop of a pattern, computed once."""
+        distances = self._patterns.get(pattern)
+        if distances is None:
+            shape, stop_ids = pattern
+            unique = self._stops.unique["stop_id"]  # type: ignore
+            rows = [unique.get(stop_id, -1) for stop_id in stop_ids]
+            lat = np.asarray(self._stops.column("stop_lat"), np.float64)  # type: ignore
+            lon = np.asarray(self._stops.column("stop_lon"), np.float64)  # type: ignore
+            rows = np.asarray(rows, np.int64)
+            distances = self.project(
+                lat[rows], lon[rows], np.where(rows >= 0, shape, -1)
+            ).distance_m
+            # Stops are in travel order; a stop cannot precede the one before it.
+            # Stops missing from stops.txt take the previous stop's position.
+            distances = np.maximum.accumulate(np.nan_to_num(distances, nan=0.0))
+            self._patterns[pattern] = distances
+        return distances
+
+    def project_snapshot(
+        self, feed: Optional[dict], default_speed_mps: Optional[float] = None
+    ) -> SnapshotProjection:
+        """
+        Projects every vehicle of a vehicle-positions feed onto its trip's shape.
+
+        Args:
+            feed (dict): A VehiclePositions feed in MessageToDict form. None (a failed
+                request) gives an empty result.
+            default_speed_mps (float, optional): Speed used for the ETA of vehicles
+                that report none. Defaults to DEFAULT_SPEED_MPS for the feed.
+
+        Returns:
+            SnapshotProjection: One row per vehicle with a position.
+        """
+        if default_speed_mps is None:
+            default_speed_mps = DEFAULT_SPEED_MPS.get(self.feed, 10.0)
+        vehicle_ids, trip_ids, lat, lon, speed = [], [], [], [], []
+        for entity in (feed or {}).get("entity", ()):
+            vehicle = entity.get("vehicle")
+            position = vehicle and vehicle.get("position")
+            if not position or "latitude" not in position:
+                continue
+            vehicle_ids.append(vehicle.get("vehicle", {}).get("id"))
+            trip_ids.append(vehicle.get("trip", {}).get("tripId"))
+            lat.append(position["latitude"])
+            lon.append(position.get("longitude", math.nan))
+            speed.append(position.get("speed", 0.0))
+
+        patterns = [self._trip_pattern(t) if t else None for t in trip_ids]
+        shapes = np.fromiter(
+            (-1 if p is None else p[0] for p in patterns), np.int64, len(patterns)
+        )
+        projection = self.project(lat, lon, shapes)
+
+        # One sorted key array over all stop patterns in the snapshot: pattern number
+        # times a span longer than any shape, plus the stop's distance along it.
+        span = float(self.shape_length.max()) + 1.0 if len(self.shape_length) else 1.0
+        numbers: Dict[Tuple[int, Tuple[str, ...]], int] = {}
+        stop_keys, stop_ids = [], []
+        for pattern in patterns:
+            if pattern is not None and pattern not in numbers:
+                numbers[pattern] = len(numbers)
+                stop_keys.append(
+                    self._stop_distances(pattern) + numbers[pattern] * span
+                )
+                stop_ids.extend(pattern[1])
+        keys = np.concatenate(stop_keys) if stop_keys else np.zeros(0)
+        bases = np.fromiter(
+            (-1 if p is None else numbers[p] for p in patterns), np.int64, len(patterns)
+        )
+
+        n = len(patterns)
+        to_next = np.full(n, np.nan)
+        next_stop_ids: List[Optional[str]] = [None] * n
+        valid = np.flatnonzero((bases >= 0) & ~np.isnan(projection.distance_m))
+        if len(valid) and len(keys):
+            vehicle_keys = projection.distance_m[valid] + bases[valid] * span
+            nxt = np.searchsorted(keys, vehicle_keys, "right")
+            # Past the last stop of the pattern when the next key is another pattern's.
+            inside = (nxt < len(keys)) & (
+                np.floor(keys[np.minimum(nxt, len(keys) - 1)] / span) == bases[valid]
+            )
+            valid, nxt = valid[inside], nxt[inside]
+            to_next[valid] = keys[nxt] - vehicle_keys[inside]
+            for i, k in zip(valid.tolist(), nxt.tolist()):
+                next_stop_ids[i] = stop_ids[k]
+
+        speed = np.asarray(speed, np.float64)
+        eta = to_next / np.where(speed > 0, speed, default_speed_mps)
+        return SnapshotProjection(
+            vehicle_ids,
+            trip_ids,
+            [None if p is None else self.shape_ids[p[0]] for p in patterns],
+            projection.distance_m,
+            projection.offset_m,
+            next_stop_ids,
+            to_next,
+            eta,
+        )
@@ -5,21 +5,47 @@ This module contains functions for retrieving GTFS Real-Time and JSON data from
 WMATA's API using a GET request with the provided API key and URL.
 
 Functions:
-- get_gtfs_rt_data(API_KEY, URL, function_desc="Get generic GTFS RT data"): 
+- get_gtfs_rt_data(API_KEY, URL, function_desc="Get generic GTFS RT data",
+  decode=None):
   Retrieves GTFS Real-Time data from WMATA's API and returns a dictionary containing
-  the data converted from the protobuf format. Raises a warning if the function fails
-  to retrieve the data or convert it to a dictionary.
+  the data converted from the protobuf format (or decoded by decode). Raises a
+  warning if the function fails to retrieve the data or convert it to a dictionary.
 
 - get_json_data(API_KEY, URL, function_desc="Get generic GTFS RT data"):
   Retrieves JSON data from WMATA's API and returns a dictionary containing the data.
   Raises a warning if the function fails to retrieve the data.
 
+- iter_json_items(API_KEY, URL, key, function_desc="Iterate generic JSON data"):
+  Retrieves JSON data from WMATA's API and yields the items of one of its top-level
+  lists as they are parsed from the response stream.
+
+- download(API_KEY, URL, function_desc="Download file", timeout_s=None) -> bytes:
+  Retrieves a file (e.g. a static GTFS zip) from WMATA's API and returns its bytes.
+  Raises if the request fails.
+
 - get_station_code(station_name: str) -> str:
   Returns the station code for a given station name.
 
 - get_station_name(station_code: str) -> str:
   Returns the station name for a given station code.
 
+- get_station_stop_ids(station_code: str) -> list:
+  Returns the GTFS stop ids (platforms, entrances, ...) belonging to a station.
+
+Requests accept gzip/deflate responses and decompress them as they stream in. JSON is
+parsed straight from the response bytes, with orjson when it is installed (see
+JSON_BACKEND).
+
+Every request made through get_gtfs_rt_data and get_json_data is timed per stage and
+recorded in wmata2.metrics, and follows the endpoint's latency policy from
+wmata2.policies (deadline, hedged duplicate requests, stale-while-revalidate, the
+cross-process disk cache of wmata2.disk_cache). download is timed the same way and
+bounded by the same deadline.
+
+API_KEY may be a single key or a wmata2.key_pool.APIKeyPool, in which case every
+request (and every hedged duplicate) is sent with the pool key that has the most
+budget left, and a throttled request is retried on another key.
+
 Dependencies:
 - http.client: a module that provides a low-level interface for making HTTP requests
 - json: a module that provides methods for working with JSON data
@@ -30,108 +56,722 @@ Dependencies:
 - getLogger: a method from the logging module that returns a logger object for logging
   messages to a file or stream
 
+http.client, protobuf and the csv/difflib station lookup machinery are imported on
+first use rather than at import time, so importing this module (and the rail modules
+built on it) stays cheap for short-lived processes that never touch them.
 """
 
-import http.client, json, csv, os, difflib
-from . import gtfs_realtime_pb2
-from google.protobuf.json_format import MessageToDict
+import json, os, threading, time
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Set,
+    Tuple,
+)
+from . import key_pool, metrics, policies
 
 from logging import getLogger
 
+if TYPE_CHECKING:
+    import http.client, zlib
+    from concurrent.futures import Future, ThreadPoolExecutor
+
 logger = getLogger(__name__)
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 RAIL_DATA_DIR = os.path.join(DATA_DIR, "rail_gtfs_static")
 STOPS_FILE = os.path.join(RAIL_DATA_DIR, "stops.txt")
 
+# Host serving the API. Overridable so the client can be pointed at a mirror or a
+# local stand-in server (see benchmarks/).
+API_HOST = "api.wmata.com"
+API_HTTPS = True
 
-def get_gtfs_rt_data(
-    API_KEY: str, URL: str, function_desc: str = "Get generic GTFS RT data"
-) -> dict:  # type: ignore
+
+_READ_CHUNK_BYTES = 64 * 1024
+
+# Compression accepted from the server. Responses are decompressed while they stream
+# in. Set to "identity" to ask for uncompressed responses.
+ACCEPT_ENCODING = "gzip, deflate"
+
+# JSON backend: "auto" uses orjson when it is installed and the standard library json
+# module otherwise; "json" always uses the standard library.
+JSON_BACKEND = "auto"
+
+# Shared pool for hedged attempts and stale-while-revalidate refreshes.
+_MAX_BACKGROUND_WORKERS = 8
+_executor: Optional["ThreadPoolExecutor"] = None
+_executor_lock = threading.Lock()
+
+# Last good decoded response per URL, for stale-while-revalidate endpoints, and the
+# URLs currently being refreshed in the background.
+_last_good: Dict[str, Tuple[float, Any]] = {}
+_revalidating: Set[str] = set()
+_stale_lock = threading.Lock()
+
+# Parsed station lookup tables, keyed by (stops file path, modification time).
+_station_index_cache: dict = {}
+
+
+def __getattr__(name: str):
+    # Names that used to be imported eagerly at module level, kept reachable for
+    # callers that accessed them through this module.
+    if name == "gtfs_realtime_pb2":
+        from . import gtfs_realtime_pb2
+
+        return gtfs_realtime_pb2
+    if name == "MessageToDict":
+        from google.protobuf.json_format import MessageToDict
+
+        return MessageToDict
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _open_connection(timeout: Optional[float] = None) -> "http.client.HTTPConnection":
+    """Opens a connection to the configured API host."""
+    import http.client
+
+    if API_HTTPS:
+        return http.client.HTTPSConnection(API_HOST, timeout=timeout)
+    return http.client.HTTPConnection(API_HOST, timeout=timeout)
+
+
+def _remaining(deadline: float) -> float:
+    """Returns the seconds left before a monotonic deadline, raising once it passes."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError("Request deadline exceeded")
+    return remaining
+
+
+class _DeflateDecompressor:
+    """
+    Decompresses a deflate body whether it is zlib-wrapped (RFC 1950), as HTTP
+    specifies, or raw (RFC 1951), as some servers send it. The format is detected
+    from the zlib header of the first chunk.
     """
-    Retrieves GTFS Real-Time data from WMATA's API using a GET request with the provided
-    API key and URL.
 
-    Args:
-        API_KEY (str): The API key to use for authentication.
-        URL (str): The URL of the GTFS Real-Time API endpoint to retrieve data from.
-        function_desc (str, optional): A description of the function being performed.
-            Defaults to "Get generic GTFS RT data".
+    def __init__(self) -> None:
+        self._inner: Optional["zlib._Decompress"] = None
 
-    Returns:
-        dict: A dictionary containing the GTFS Real-Time data returned by the API,
-            converted from the protobuf format.
+    def decompress(self, data: bytes) -> bytes:
+        if self._inner is None:
+            import zlib
 
-    Raises:
-        Warning: If the function fails to retrieve the GTFS Real-Time data from the API,
-            or if there is an error converting the data from protobuf to a dictionary.
+            wrapped = (
+                len(data) >= 2
+                and data[0] & 0x0F == 8
+                and ((data[0] << 8) | data[1]) % 31 == 0
+            )
+            self._inner = zlib.decompressobj(
+                zlib.MAX_WBITS if wrapped else -zlib.MAX_WBITS
+            )
+        return self._inner.decompress(data)
+
+    def flush(self) -> bytes:
+        return b"" if self._inner is None else self._inner.flush()
+
+
+def _decompressor(content_encoding: Optional[str]) -> Any:
+    """Returns a streaming decompressor for the response's Content-Encoding."""
+    encoding = (content_encoding or "").strip().lower()
+    if encoding in ("", "identity"):
+        return None
+    if encoding in ("gzip", "x-gzip"):
+        import zlib
 
+        return zlib.decompressobj(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return _DeflateDecompressor()
+    raise ValueError(f"Unsupported Content-Encoding: {content_encoding}")
+
+
+def _stream(
+    API_KEY: key_pool.APIKey,
+    URL: str,
+    record: metrics.RequestRecord,
+    deadline: float,
+) -> Iterator[bytes]:
+    """
+    Sends a GET request and yields the response body in chunks as they arrive,
+    decompressed if the server used gzip or deflate, timing each stage into the given
+    record. Every blocking socket operation is bounded by the time left before the
+    deadline, so the whole request fails with TimeoutError once it passes. With a key
+    pool, a key is taken from it first and its outcome reported back.
     """
+    pool = API_KEY if isinstance(API_KEY, key_pool.APIKeyPool) else None
+    key = pool.acquire(timeout=_remaining(deadline)) if pool else API_KEY
     headers = {
-        "api_key": API_KEY,
+        "api_key": key,
+        "Accept-Encoding": ACCEPT_ENCODING,
     }
 
+    start = time.perf_counter()
+    retry_after = None
+    conn = _open_connection(timeout=_remaining(deadline))
     try:
-        logger.info(function_desc)
-        logger.info("Connecting to GTFS API")
-        conn = http.client.HTTPSConnection("api.wmata.com")
+        conn.connect()
+        sock = conn.sock
+        connected = time.perf_counter()
+        record.connect = connected - start
+
+        sock.settimeout(_remaining(deadline))
         conn.request("GET", URL, "{body}", headers)
+        sock.settimeout(_remaining(deadline))
         response = conn.getresponse()
-        data = response.read()
+        first_byte = time.perf_counter()
+        record.ttfb = first_byte - connected
+        record.status = response.status
+        if response.status >= 400:
+            record.error = f"HTTP {response.status}"
+            retry_after = response.getheader("Retry-After")
+
+        decompressor = _decompressor(response.getheader("Content-Encoding"))
+        received = 0
+        while not response.isclosed():
+            sock.settimeout(_remaining(deadline))
+            chunk = response.read(_READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            received += len(chunk)
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            if chunk:
+                yield chunk
+        if decompressor is not None:
+            tail = decompressor.flush()
+            if tail:
+                yield tail
+        done = time.perf_counter()
+        record.download = done - first_byte
+        record.request = done - start
+        record.bytes = received
+    finally:
         conn.close()
+        if pool:
+            pool.release(key, record.status, retry_after)  # type: ignore
+
+
+def _request(
+    API_KEY: key_pool.APIKey,
+    URL: str,
+    record: metrics.RequestRecord,
+    deadline: float,
+) -> bytes:
+    """
+    Performs the request and returns the whole (decompressed) response body. With a
+    key pool, a throttled (HTTP 429) request is retried on each other available key.
+    """
+    body = b"".join(_stream(API_KEY, URL, record, deadline))
+    if isinstance(API_KEY, key_pool.APIKeyPool):
+        for _ in range(len(API_KEY) - 1):
+            if record.status != 429 or not API_KEY.available():
+                break
+            logger.debug(f"Retrying throttled request to {record.endpoint}")
+            record.status = record.error = None
+            body = b"".join(_stream(API_KEY, URL, record, deadline))
+    return body
+
+
+def _get_executor() -> "ThreadPoolExecutor":
+    """Returns the shared thread pool used for hedged and background requests."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            _executor = ThreadPoolExecutor(
+                max_workers=_MAX_BACKGROUND_WORKERS, thread_name_prefix="wmata2"
+            )
+        return _executor
+
+
+def _hedged_request(
+    API_KEY: key_pool.APIKey,
+    URL: str,
+    record: metrics.RequestRecord,
+    policy: policies.EndpointPolicy,
+    deadline: float,
+) -> bytes:
+    """
+    Performs the request, sending duplicates according to the endpoint's hedging
+    policy and returning the first successful response. An attempt answered with an
+    HTTP error status counts as failed, so a slower good attempt still wins. Stage
+    timings of the attempt that answered (or of the last failed one) are copied into
+    the given record.
+    """
+    hedge_delay = policy.hedge_delay(record.endpoint)
+    if hedge_delay is None:
+        return _request(API_KEY, URL, record, deadline)
+
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    executor = _get_executor()
+    attempts = {}
+
+    def launch() -> "Future":
+        attempt = metrics.RequestRecord(record.endpoint, record.function_desc)
+        future = executor.submit(_request, API_KEY, URL, attempt, deadline)
+        attempts[future] = attempt
+        return future
+
+    def copy_attempt(attempt: metrics.RequestRecord) -> None:
+        for name in ("connect", "ttfb", "download", "request", "bytes", "status"):
+            setattr(record, name, getattr(attempt, name))
+        record.error = attempt.error
+        record.hedges = len(attempts) - 1
+
+    pending = {launch()}
+    next_hedge = time.monotonic() + hedge_delay
+    last_error: Optional[BaseException] = None
+    failed: Optional[metrics.RequestRecord] = None
+
+    while True:
+        can_hedge = len(attempts) <= policy.max_hedges
+        wait_s = _remaining(deadline)
+        if can_hedge:
+            wait_s = min(wait_s, max(0.0, next_hedge - time.monotonic()))
+
+        done, pending = wait(pending, timeout=wait_s, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                data = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            attempt = attempts[future]
+            if attempt.error is not None:
+                last_error = ConnectionError(attempt.error)
+                failed = attempt
+                continue
+            copy_attempt(attempt)
+            return data
+
+        if can_hedge and (not pending or time.monotonic() >= next_hedge):
+            logger.debug(f"Hedging request to {record.endpoint}")
+            pending.add(launch())
+            next_hedge = time.monotonic() + hedge_delay
+        elif not pending:
+            if failed is not None:
+                copy_attempt(failed)
+            record.hedges = len(attempts) - 1
+            raise last_error or TimeoutError("Request deadline exceeded")
+
+
+def _fetch(
+    API_KEY: key_pool.APIKey,
+    URL: str,
+    function_desc: str,
+    source: str,
+    decode: Callable[[bytes], Any],
+) -> Any:
+    """
+    Fetches and decodes a response, applying the endpoint's latency policy.
+
+    With stale-while-revalidate enabled and a recent enough good response on hand,
+    that response is returned immediately, and a refresh is started in the
+    background once it is older than the policy's fresh_s. With the disk cache
+    enabled, a fresh entry there is decoded and returned. Otherwise the request is
+    made synchronously.
+    """
+    endpoint = metrics.endpoint_name(URL)
+    policy = policies.get_endpoint_policy(endpoint)
+    if policy.stale_while_revalidate:
+        entry = _last_good_entry(URL, policy)
+        if entry is not None:
+            age, stale = entry
+            metrics.record_cache_hit(endpoint)
+            if age > policy.fresh_s:
+                _revalidate(API_KEY, URL, function_desc, source, decode, policy)
+            return stale
+
+    if policy.disk_cache_ttl_s is not None:
+        from . import disk_cache
+
+        cached = _decode_cached(disk_cache.get(URL), decode, function_desc)
+        if cached is not None:
+            metrics.record_cache_hit(endpoint)
+            return cached
+
+    return _fetch_now(API_KEY, URL, function_desc, source, decode, policy)
+
+
+def _fetch_now(
+    API_KEY: key_pool.APIKey,
+    URL: str,
+    function_desc: str,
+    source: str,
+    decode: Callable[[bytes], Any],
+    policy: policies.EndpointPolicy,
+) -> Any:
+    """Makes the request, records its metrics and returns the decoded response."""
+    record = metrics.RequestRecord(metrics.endpoint_name(URL), function_desc)
+    start = time.perf_counter()
+    deadline = time.monotonic() + policy.timeout_s
+
+    try:
+        logger.info(function_desc)
+        logger.info(f"Connecting to {source} API")
+        data = _hedged_request(API_KEY, URL, record, policy, deadline)
+        if record.error is not None:
+            # An error status is a failure even when its body decodes, as WMATA's
+            # JSON error bodies do.
+            raise ConnectionError(record.error)
         logger.debug("Data received")
 
-        feed = gtfs_realtime_pb2.FeedMessage()  # type: ignore
-        feed.ParseFromString(data)
+        parse_start = time.perf_counter()
+        result = decode(data)
+        record.parse = time.perf_counter() - parse_start
 
-        data_as_dict = MessageToDict(feed)
+        if policy.stale_while_revalidate:
+            with _stale_lock:
+                _last_good[URL] = (time.monotonic(), result)
+        if policy.disk_cache_ttl_s is not None:
+            from . import disk_cache
 
-        return data_as_dict
+            disk_cache.put(URL, data, policy.disk_cache_ttl_s)
 
+        return result
     except Exception as e:
+        record.error = record.error or type(e).__name__
         logger.warning(f"Failed to {function_desc}|| Error: {e}")
 
+        if policy.stale_while_revalidate:
+            stale = _get_stale(URL, policy)
+            if stale is not None:
+                logger.warning(f"Serving last good response for {function_desc}")
+                metrics.record_cache_hit(record.endpoint)
+                return stale
+        if policy.disk_cache_ttl_s is not None:
+            from . import disk_cache
+
+            stale = _decode_cached(
+                disk_cache.get_stale(URL, policy.max_stale_s), decode, function_desc
+            )
+            if stale is not None:
+                logger.warning(f"Serving disk cached response for {function_desc}")
+                metrics.record_cache_hit(record.endpoint)
+                return stale
+    finally:
+        record.total = time.perf_counter() - start
+        metrics.get_registry().observe(record)
+
+
+def _last_good_entry(
+    URL: str, policy: policies.EndpointPolicy
+) -> Optional[Tuple[float, Any]]:
+    """
+    Returns (age in seconds, response) of the last good response for the URL if it is
+    young enough to be served stale, else None.
+    """
+    with _stale_lock:
+        entry = _last_good.get(URL)
+    if entry is None:
+        return None
+    age = time.monotonic() - entry[0]
+    if age > policy.max_stale_s:
+        return None
+    return age, entry[1]
+
+
+def _get_stale(URL: str, policy: policies.EndpointPolicy) -> Any:
+    """Returns the last good response for the URL if it is young enough, else None."""
+    entry = _last_good_entry(URL, policy)
+    return None if entry is None else entry[1]
+
+
+def _decode_cached(
+    body: Optional[bytes], decode: Callable[[bytes], Any], function_desc: str
+) -> Any:
+    """Decodes a body from the disk cache, returning None if absent or corrupt."""
+    if body is None:
+        return None
+    try:
+        return decode(body)
+    except Exception as e:
+        logger.warning(f"Failed to decode cached {function_desc}|| Error: {e}")
+        return None
+
+
+def _revalidate(
+    API_KEY: key_pool.APIKey,
+    URL: str,
+    function_desc: str,
+    source: str,
+    decode: Callable[[bytes], Any],
+    policy: policies.EndpointPolicy,
+) -> None:
+    """Starts a background refresh of the URL unless one is already running."""
+    with _stale_lock:
+        if URL in _revalidating:
+            return
+        _revalidating.add(URL)
+
+    def refresh() -> None:
+        try:
+            _fetch_now(API_KEY, URL, function_desc, source, decode, policy)
+        finally:
+            with _stale_lock:
+                _revalidating.discard(URL)
+
+    _get_executor().submit(refresh)
+
+
+def _json_loads() -> Callable[[bytes], Any]:
+    """Returns the loads function of the configured JSON backend."""
+    if JSON_BACKEND == "auto":
+        try:
+            import orjson
+
+            return orjson.loads
+        except ImportError:
+            pass
+    return json.loads
+
+
+def _decode_json(data: bytes) -> Any:
+    # Both backends accept bytes. orjson parses them in place; json.loads decodes them
+    # to a str first.
+    return _json_loads()(data)
+
+
+def _decode_gtfs_rt_as_dict(data: bytes) -> dict:
+    from . import gtfs_realtime_pb2
+    from google.protobuf.json_format import MessageToDict
+
+    feed = gtfs_realtime_pb2.FeedMessage()  # type: ignore
+    feed.ParseFromString(data)
+
+    return MessageToDict(feed)
+
+
+def get_gtfs_rt_data(
+    API_KEY: key_pool.APIKey,
+    URL: str,
+    function_desc: str = "Get generic GTFS RT data",
+    decode: Optional[Callable[[bytes], Any]] = None,
+) -> dict:  # type: ignore
+    """
+    Retrieves GTFS Real-Time data from WMATA's API using a GET request with the provided
+    API key and URL.
+
+    The request follows the endpoint's policy in wmata2.policies (deadline, hedging,
+    stale-while-revalidate, disk cache).
+
+    Args:
+        API_KEY (str | APIKeyPool): The API key, or a pool of keys, to use for
+            authentication.
+        URL (str): The URL of the GTFS Real-Time API endpoint to retrieve data from.
+        function_desc (str, optional): A description of the function being performed.
+            Defaults to "Get generic GTFS RT data".
+        decode (Callable[[bytes], Any], optional): Converts the serialized
+            FeedMessage instead of MessageToDict, e.g. into array-backed structures
+            (see wmata2.bus.feeds). Defaults to MessageToDict.
+
+    Returns:
+        dict: A dictionary containing the GTFS Real-Time data returned by the API,
+            converted from the protobuf format (or whatever decode returns). None if
+            the request fails and no stale response is available.
+
+    Raises:
+        Warning: If the function fails to retrieve the GTFS Real-Time data from the API,
+            or if there is an error converting the data from protobuf to a dictionary.
+
+    """
+    return _fetch(
+        API_KEY, URL, function_desc, "GTFS", decode or _decode_gtfs_rt_as_dict
+    )
+
 
 def get_json_data(
-    API_KEY: str, URL: str, function_desc: str = "Get generic GTFS RT data"
+    API_KEY: key_pool.APIKey,
+    URL: str,
+    function_desc: str = "Get generic GTFS RT data",
 ) -> dict:  # type: ignore
     """
     Retrieves JSON data from WMATA's API using a GET request with the provided API key
     and URL.
 
+    The request follows the endpoint's policy in wmata2.policies (deadline, hedging,
+    stale-while-revalidate, disk cache).
+
     Args:
-        API_KEY (str): The API key to use for authentication.
+        API_KEY (str | APIKeyPool): The API key, or a pool of keys, to use for
+            authentication.
         URL (str): The URL of the API endpoint to retrieve data from.
         function_desc (str, optional): A description of the function being performed.
             Defaults to "Get generic GTFS RT data".
 
     Returns:
-        dict: A dictionary containing the JSON data returned by the API.
+        dict: A dictionary containing the JSON data returned by the API. None if the
+            request fails and no stale response is available.
 
     Raises:
         Warning: If the function fails to retrieve the JSON data from the API.
 
     """
-    headers = {
-        "api_key": API_KEY,
-    }
+    return _fetch(API_KEY, URL, function_desc, "JSON", _decode_json)
+
+
+def iter_json_items(
+    API_KEY: key_pool.APIKey,
+    URL: str,
+    key: str,
+    function_desc: str = "Iterate generic JSON data",
+) -> Iterator[Any]:
+    """
+    Retrieves JSON data from WMATA's API and yields the items of one of its top-level
+    lists (e.g. "Trains" or "StandardRoutes") as they are parsed from the response
+    stream, without building the whole document.
+
+    The request is made when iteration starts and is bounded by the endpoint's
+    timeout from wmata2.policies, which includes the time the caller spends between
+    items. It is neither hedged nor served stale.
+
+    Args:
+        API_KEY (str | APIKeyPool): The API key, or a pool of keys, to use for
+            authentication.
+        URL (str): The URL of the API endpoint to retrieve data from.
+        key (str): Name of the list whose items to yield. Its first occurrence in the
+            response is used.
+        function_desc (str, optional): A description of the function being performed.
+            Defaults to "Iterate generic JSON data".
+
+    Yields:
+        Any: The decoded list items, in order.
+
+    Raises:
+        Warning: If the function fails to retrieve or parse the data. Iteration stops
+            at the failure.
+    """
+    endpoint = metrics.endpoint_name(URL)
+    policy = policies.get_endpoint_policy(endpoint)
+    record = metrics.RequestRecord(endpoint, function_desc)
+    start = time.perf_counter()
+    deadline = time.monotonic() + policy.timeout_s
+    stream = _stream(API_KEY, URL, record, deadline)
 
     try:
         logger.info(function_desc)
         logger.info("Connecting to JSON API")
-        conn = http.client.HTTPSConnection("api.wmata.com")
-        conn.request("GET", URL, "{body}", headers)
-        response = conn.getresponse()
-        data_bytes = response.read()
+        yield from _iter_array_items(stream, key)
+    except Exception as e:
+        record.error = record.error or type(e).__name__
+        logger.warning(f"Failed to {function_desc}|| Error: {e}")
+    finally:
+        stream.close()
+        record.total = time.perf_counter() - start
+        metrics.get_registry().observe(record)
+
+
+def download(
+    API_KEY: key_pool.APIKey,
+    URL: str,
+    function_desc: str = "Download file",
+    timeout_s: Optional[float] = None,
+) -> bytes:
+    """
+    Retrieves a file, e.g. a static GTFS zip, from WMATA's API using a GET request with
+    the provided API key and URL.
 
-        conn.close()
-        logger.debug("Data received")
+    The request is timed into wmata2.metrics and bounded by the endpoint's timeout from
+    wmata2.policies. It is neither hedged nor cached.
+
+    Args:
+        API_KEY (str | APIKeyPool): The API key, or a pool of keys, to use for
+            authentication.
+        URL (str): The URL of the file to retrieve.
+        function_desc (str, optional): A description of the function being performed.
+            Defaults to "Download file".
+        timeout_s (float, optional): Deadline for the whole download in seconds.
+            Defaults to the endpoint policy's timeout_s.
 
-        data = json.loads(data_bytes.decode("utf-8"))
+    Returns:
+        bytes: The (decompressed) file contents.
+
+    Raises:
+        ConnectionError: If the API answers with an HTTP error status.
+        TimeoutError: If the download does not complete before the deadline.
+    """
+    endpoint = metrics.endpoint_name(URL)
+    policy = policies.get_endpoint_policy(endpoint)
+    record = metrics.RequestRecord(endpoint, function_desc)
+    start = time.perf_counter()
+    deadline = time.monotonic() + (policy.timeout_s if timeout_s is None else timeout_s)
 
+    try:
+        logger.info(function_desc)
+        data = _request(API_KEY, URL, record, deadline)
+        if record.error is not None:
+            raise ConnectionError(f"Failed to {function_desc}|| Error: {record.error}")
         return data
     except Exception as e:
-        logger.warning(f"Failed to {function_desc}|| Error: {e}")
+        record.error = record.error or type(e).__name__
+        raise
+    finally:
+        record.total = time.perf_counter() - start
+        metrics.get_registry().observe(record)
+
+
+_ITEM_DELIMITERS = frozenset(" \t\r\n,]")
+
+
+def _iter_array_items(chunks: Iterable[bytes], key: str) -> Iterator[Any]:
+    """
+    Incrementally parses the list named key out of a stream of JSON bytes, yielding
+    each item once it is complete. Only the unparsed tail of the stream is buffered.
+    """
+    import codecs, re
+
+    chunks = iter(chunks)
+    text = codecs.getincrementaldecoder("utf-8")()
+    start_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(key))
+    separators = re.compile(r"[\s,]*")
+    decoder = json.JSONDecoder()
+
+    buffer, searched = "", 0
+    for chunk in chunks:
+        buffer += text.decode(chunk)
+        match = start_pattern.search(buffer, max(0, searched - len(key) - 64))
+        if match is not None:
+            pos = match.end()
+            break
+        searched = len(buffer)
+    else:
+        raise ValueError(f"No {key!r} list in response")
+
+    exhausted = False
+    while True:
+        pos = separators.match(buffer, pos).end()  # type: ignore
+        if pos < len(buffer) and buffer[pos] == "]":
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            end = None
+        # A number cut off by a chunk boundary (e.g. "-4." of "-4.5") still decodes,
+        # so an item is only accepted once a delimiter follows it.
+        if end is not None and (
+            exhausted or (end < len(buffer) and buffer[end] in _ITEM_DELIMITERS)
+        ):
+            yield item
+            pos = end
+            continue
+        if exhausted:
+            raise ValueError(f"Truncated {key!r} list in response")
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            exhausted = True
+            buffer += text.decode(b"", final=True)
+        else:
+            buffer = buffer[pos:] + text.decode(chunk)
+            pos = 0
 
 
 def get_station_code(station_name: str) -> str:
@@ -145,26 +785,17 @@ def get_station_code(station_name: str) -> str:
         A string representing the station code.
     """
 
-    # station_code = None
-    closest_match = None
+    index = _load_station_index()
 
-    if not (os.path.exists(STOPS_FILE)):
-        raise FileNotFoundError(
-            "No rail stops file found. Try rebuilding the GTFS static files."
-        )
-
-    with open(STOPS_FILE, newline="", encoding="utf8") as csvfile:
-        reader = csv.DictReader(csvfile)
-        stations = [row for row in reader if row["stop_id"].startswith("STN")]
-
-    station_names = [station["stop_name"].lower() for station in stations]
     try:
-        index = station_names.index(station_name.lower())
-        return stations[index]["stop_id"][-3:]
-    except ValueError:
-        closest_match = difflib.get_close_matches(
-            station_name.lower(), station_names, n=1, cutoff=0.2
-        )[0]
+        return index["code_by_name"][station_name.lower()]
+    except KeyError:
+        import difflib
+
+        matches = difflib.get_close_matches(
+            station_name.lower(), index["names"], n=1, cutoff=0.2
+        )
+        closest_match = matches[0] if matches else None
         if closest_match:
             logger.warning(
                 f"Warning: Could not find station {station_name.upper()}, "
@@ -189,14 +820,76 @@ def get_station_name(station_code: str) -> str:
     Raises:
         ValueError: If the station code is not found.
     """
-    if not (os.path.exists(STOPS_FILE)):
+    try:
+        return _load_station_index()["name_by_code"][station_code]
+    except KeyError:
+        raise ValueError(f"No station found for code: {station_code}") from None
+
+
+def get_station_stop_ids(station_code: str) -> list:
+    """
+    Returns the GTFS stop ids whose parent station is the given station, e.g. the
+    platform stop ids used by the rail GTFS-RT feeds.
+
+    Args:
+        station_code (str): The 3 character station code.
+
+    Returns:
+        list: The child stop ids, in stops file order. Empty if the station has none.
+    """
+    return _load_station_index()["stop_ids_by_code"].get(station_code, [])
+
+
+def _load_station_index() -> dict:
+    """
+    Returns the station lookup tables built from the rail stops file, parsing the file
+    only on first use and again after it changes on disk.
+
+    Returns:
+        dict: "names" (lower-case station names in file order), "code_by_name"
+            (lower-case name -> station code), "name_by_code" (station code ->
+            name) and "stop_ids_by_code" (station code -> child stop ids).
+
+    Raises:
+        FileNotFoundError: If the rail stops file does not exist.
+    """
+    try:
+        key = (STOPS_FILE, os.stat(STOPS_FILE).st_mtime_ns)
+    except FileNotFoundError:
         raise FileNotFoundError(
             "No rail stops file found. Try rebuilding the GTFS static files."
-        )
-
-    with open(STOPS_FILE, "r", encoding="utf-8") as stops_file:
-        reader = csv.DictReader(stops_file)
-        for row in reader:
-            if row["stop_id"].startswith("STN_") and row["stop_id"][4:] == station_code:
-                return row["stop_name"]
-    raise ValueError(f"No station found for code: {station_code}")
+        ) from None
+
+    index = _station_index_cache.get(key)
+    if index is not None:
+        return index
+
+    import csv
+
+    names = []
+    code_by_name = {}
+    name_by_code = {}
+    stop_ids_by_code: dict = {}
+    with open(STOPS_FILE, newline="", encoding="utf-8") as csvfile:
+        for row in csv.DictReader(csvfile):
+            stop_id = row["stop_id"]
+            parent = row.get("parent_station") or ""
+            if parent.startswith("STN_"):
+                stop_ids_by_code.setdefault(parent[4:], []).append(stop_id)
+            if not stop_id.startswith("STN"):
+                continue
+            name = row["stop_name"].lower()
+            names.append(name)
+            code_by_name.setdefault(name, stop_id[-3:])
+            if stop_id.startswith("STN_"):
+                name_by_code.setdefault(stop_id[4:], row["stop_name"])
+
+    index = {
+        "names": names,
+        "code_by_name": code_by_name,
+        "name_by_code": name_by_code,
+        "stop_ids_by_code": stop_ids_by_code,
+    }
+    _station_index_cache.clear()
+    _station_index_cache[key] = index
+    return index
@@ -1,13 +1,19 @@
 """
 This module provides a Python wrapper for the WMATA API that allows a user to get route
 and time information.
+
+gps_time (and NumPy with it) is only imported when departure times are first computed.
 """
 
-from gps_time import GPSTime
 from datetime import datetime
+from logging import getLogger
 
+from .key_pool import APIKey
 from .rail.station_info import get_station2station_info
 from .rail.predictions import get_next_trains
+from .rail.models import Predictions, StationToStationInfos
+
+logger = getLogger(__name__)
 
 
 class WMATA:
@@ -15,12 +21,13 @@ class WMATA:
     A class that provides methods for interacting with the WMATA API.
     """
 
-    def __init__(self, api_key: str) -> None:
+    def __init__(self, api_key: APIKey) -> None:
         """
         Initializes a new instance of the WMATA class with the specified API key.
 
         Args:
-            api_key (str): The API key for accessing the WMATA API.
+            api_key (str | APIKeyPool): The API key for accessing the WMATA API,
+                or a wmata2.key_pool.APIKeyPool to spread requests over several keys.
         """
         self.api_key = api_key
 
@@ -38,8 +45,11 @@ class WMATA:
 
         Returns:
             dict: A dictionary containing the next departures, expected trip durations,
-                and the expected time of arrival.
+                and the expected time of arrival. Empty if the predictions or the
+                station-to-station information could not be retrieved.
         """
+        from gps_time import GPSTime
+
         current_time = GPSTime.from_datetime(datetime.now())
 
         # Get the station-to-station information
@@ -50,16 +60,30 @@ class WMATA:
         # Get the next trains
         next_trains = get_next_trains(self.api_key, start_station)
 
+        # Both calls return None when the request fails or misses its deadline
+        infos = StationToStationInfos.from_response(station_info)
+        if not infos or infos[0].rail_time is None:
+            logger.warning(
+                f"No station to station info for {start_station}->{end_station}"
+            )
+            return {}
+        predictions = Predictions.from_response(next_trains)
+        if not predictions:
+            logger.warning(f"No train predictions for {start_station}")
+            return {}
+
+        trip_duration_min = infos[0].rail_time
+
         # Combine the data into a dictionary
         result = {}
-        for i in range(min(num_trips, len(next_trains["Trains"]))):
-            trip = next_trains["Trains"][i]
+        for trip in predictions:
+            if len(result) >= num_trips:
+                break
 
-            departure_dt_min = float(trip["Min"])
-
-            trip_duration_min = float(
-                station_info["StationToStationInfos"][0]["RailTime"]
-            )
+            # Trains without an estimate ("---" or blank) cannot be scheduled
+            departure_dt_min = trip.minutes
+            if departure_dt_min is None:
+                continue
 
             departure_time = current_time + departure_dt_min * 60.0
             arrival_time = departure_time + trip_duration_min * 60.0
@@ -68,7 +92,7 @@ class WMATA:
             assert isinstance(departure_time, GPSTime)
             assert isinstance(arrival_time, GPSTime)
 
-            result[i] = {
+            result[len(result)] = {
                 "departure_time": departure_time.to_datetime(),
                 "duration_min": trip_duration_min,
                 "arrival_time": arrival_time.to_datetime(),